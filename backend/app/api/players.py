@@ -1,41 +1,33 @@
 # app/api/players.py
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 from fastapi.responses import JSONResponse
-import sqlite3
-import unicodedata
-import re
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
-router = APIRouter()
-
-DB_PATH = "fantacalcio.db"
+from app.db.database import get_db
+from app.crud.players import players_by_ids
+from app.search.player_search import player_search_index
 
-def normalize_name(name: str) -> str:
-    name = unicodedata.normalize('NFKD', name).encode('ASCII','ignore').decode('ASCII')
-    name = re.sub(r'\s+', ' ', name.lower().strip())
-    return name
+router = APIRouter()
 
 @router.get("/search")
-def search_players(name: str = Query(..., min_length=2)):
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    query_norm = f"%{normalize_name(name)}%"
-    cursor.execute("""
-        SELECT id, name, team, role, price
-        FROM players
-    """)
-    players = cursor.fetchall()
-    conn.close()
+def search_players(
+    name: str = Query(..., min_length=2),
+    mode: str = Query("auto", pattern="^(auto|prefix|substring|fuzzy)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+):
+    # l'indice (nomi già normalizzati) viene ricostruito solo se la tabella cambia;
+    # i dati dei giocatori trovati si rileggono dal database
+    index = player_search_index.get(lambda sql: db.execute(text(sql)).all())
 
-    # Ricerca fuzzy semplice
     results = []
-    for p in players:
-        pid, pname, pteam, prole, pprice = p
-        if query_norm.strip('%') in normalize_name(pname):
-            results.append({
-                "id": pid,
-                "name": pname,
-                "team": pteam,
-                "role": prole,
-                "price": pprice
-            })
+    for p in players_by_ids(db, index.search(name, mode=mode, limit=limit)):
+        results.append({
+            "id": p["id"],
+            "name": p["name"],
+            "team": p["team"],
+            "role": p["role"],
+            "price": p["price"]
+        })
     return JSONResponse({"status": "success", "players": results})
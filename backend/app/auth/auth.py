@@ -1,34 +1,59 @@
+import os
 from datetime import datetime, timedelta
-from passlib.context import CryptContext
-from jose import jwt, JWTError
+from functools import lru_cache
 from app.schemas.schemas import TokenData
 
 # 🔥 CAMBIA: usa Argon2 invece di bcrypt (non ha limite di 72 byte)
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Costo configurabile (default di passlib): cambiandolo, gli hash esistenti vengono
+# aggiornati al login successivo (CryptContext.needs_update, vedi app/auth/hashing.py)
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """
+    CryptContext creato al primo hash/verifica: passlib e argon2 non rallentano
+    l'avvio dell'API (né l'import dei moduli che non toccano le password)
+    """
+    from passlib.context import CryptContext
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=ARGON2_TIME_COST,
+        argon2__memory_cost=ARGON2_MEMORY_COST,
+        argon2__parallelism=ARGON2_PARALLELISM,
+    )
 
 SECRET_KEY = "INSERISCI_QUI_UNA_CHIAVE_RANDOM"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    from jose import jwt  # importato al primo token, non all'avvio
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str):
+def decode_token(token: str):
+    """Payload del token se firma e scadenza sono valide, altrimenti None"""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("user_id")
-        if user_id is None:
-            return None
-        return TokenData(user_id=user_id)
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+    return payload if payload.get("user_id") is not None else None
+
+def verify_token(token: str):
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return TokenData(user_id=payload["user_id"])
\ No newline at end of file
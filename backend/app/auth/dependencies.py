@@ -0,0 +1,116 @@
+# app/auth/dependencies.py
+# Dipendenza di autenticazione condivisa dai router: token Bearer (o ?token= per i
+# client vecchi), verificato una volta e poi servito da una cache LRU con scadenza.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import OAuth2PasswordBearer
+
+from app.auth.auth import decode_token
+from app.db.database import AsyncSessionLocal
+from app.db.models import User
+from app.monitoring.metrics import registry
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+# Oltre questo tempo l'utente viene riletto dal database anche se il token è ancora
+# valido, così un utente disattivato perde l'accesso entro TOKEN_CACHE_TTL secondi
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+TOKEN_VERIFY_SECONDS = registry.histogram(
+    "auth_token_verify_seconds", "Verifica del token di accesso", labels=("cache",),
+)
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
+
+
+class CurrentUser:
+    """Utente autenticato: quanto serve ai router senza tornare sulla tabella users"""
+
+    __slots__ = ("user_id", "email")
+
+    def __init__(self, user_id: int, email: str):
+        self.user_id = user_id
+        self.email = email
+
+
+class TokenCache:
+    """LRU di token verificati, indicizzata per hash del token e valida fino a exp"""
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(token: str):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user
+
+    def put(self, key, user: CurrentUser, token_exp: float):
+        expires_at = min(token_exp, time.time() + self.ttl)
+        with self._lock:
+            self._entries[key] = (user, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache()
+
+
+async def _load_user(user_id: int):
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if user is None or not user.is_active:
+            return None
+        return CurrentUser(user.id, user.email)
+
+
+def _unauthorized():
+    return HTTPException(status_code=401, detail="Token non valido", headers={"WWW-Authenticate": "Bearer"})
+
+
+async def get_current_user(
+    bearer: Optional[str] = Depends(oauth2_scheme),
+    token: Optional[str] = Query(None, include_in_schema=False),
+) -> CurrentUser:
+    raw = bearer or token
+    if not raw:
+        raise _unauthorized()
+
+    start = time.perf_counter()
+    key = TokenCache.key(raw)
+    user = token_cache.get(key)
+    if user is not None:
+        TOKEN_VERIFY_SECONDS.observe(time.perf_counter() - start, cache="hit")
+        return user
+
+    payload = decode_token(raw)
+    user = await _load_user(payload["user_id"]) if payload else None
+    TOKEN_VERIFY_SECONDS.observe(time.perf_counter() - start, cache="miss")
+    if user is None:
+        raise _unauthorized()
+    token_cache.put(key, user, float(payload.get("exp", time.time() + token_cache.ttl)))
+    return user
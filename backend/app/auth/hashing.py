@@ -0,0 +1,87 @@
+# app/auth/hashing.py
+# Hashing delle password fuori dal threadpool delle richieste: un executor dedicato e
+# limitato, con controllo di ammissione. Argon2 (argon2-cffi) rilascia il GIL durante
+# il calcolo, quindi i thread lavorano davvero in parallelo.
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.auth.auth import get_pwd_context
+from app.monitoring.metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Richieste in attesa oltre a quelle in esecuzione, poi 429
+HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+# Suggerimento per il client (header Retry-After) quando la coda è piena
+RETRY_AFTER_SECONDS = 1
+
+HASH_SECONDS = registry.histogram(
+    "password_hash_seconds", "Durata di hash/verifica Argon2 (solo calcolo)", labels=("operation",),
+)
+HASH_WAIT_SECONDS = registry.histogram(
+    "password_hash_wait_seconds", "Attesa in coda prima del calcolo", labels=("operation",),
+)
+HASH_REJECTED = registry.counter("password_hash_rejected_total", "Richieste rifiutate con coda piena")
+HASH_PENDING = registry.gauge("password_hash_pending", "Hash in esecuzione o in coda")
+
+
+class HashQueueFull(RuntimeError):
+    """Troppi hash in corso: la richiesta va rifiutata (429) invece di accodarla"""
+
+
+class PasswordHasher:
+    def __init__(self, workers=HASH_WORKERS, queue_size=HASH_QUEUE_SIZE):
+        self.capacity = workers + queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.capacity:
+                HASH_REJECTED.inc()
+                raise HashQueueFull("Troppe richieste di autenticazione, riprova tra poco")
+            self._pending += 1
+            HASH_PENDING.set(self._pending)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            HASH_PENDING.set(self._pending)
+
+    async def _run(self, operation, fn, *args):
+        self._admit()
+        queued = time.perf_counter()
+
+        def timed():
+            start = time.perf_counter()
+            HASH_WAIT_SECONDS.observe(start - queued, operation=operation)
+            try:
+                return fn(*args)
+            finally:
+                HASH_SECONDS.observe(time.perf_counter() - start, operation=operation)
+
+        # il posto in coda si libera quando il calcolo finisce (o viene annullato prima
+        # di partire), anche se nel frattempo il client si è disconnesso
+        future = self._executor.submit(timed)
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", get_pwd_context().hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str):
+        """
+        (valida, nuovo_hash): nuovo_hash non è None quando l'hash salvato usa parametri
+        diversi da quelli attuali (CryptContext.needs_update) e va sostituito
+        """
+        return await self._run("verify", get_pwd_context().verify_and_update, password, hashed)
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,96 @@
+# app/cache/http_response.py
+# Risposte HTTP per lo snapshot dei giocatori: body precompressi (br/gzip), ETag
+# forti derivati dalla versione del dataset, 304 e Cache-Control.
+import hashlib
+import os
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.cache.player_snapshot import COMPRESSORS
+
+# Il dataset cambia solo con l'aggiornamento: i client possono riusarlo per
+# SNAPSHOT_MAX_AGE secondi, poi rivalidano con If-None-Match (304 senza body)
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "300"))
+SNAPSHOT_STALE_WHILE_REVALIDATE = int(os.getenv("SNAPSHOT_STALE_WHILE_REVALIDATE", "3600"))
+
+# Preferenza tra le codifiche disponibili, a parità di q
+ENCODING_PREFERENCE = ("br", "gzip")
+
+
+def cache_control(max_age=None):
+    max_age = SNAPSHOT_MAX_AGE if max_age is None else max_age
+    return f"public, max-age={max_age}, stale-while-revalidate={SNAPSHOT_STALE_WHILE_REVALIDATE}"
+
+
+def choose_encoding(accept_encoding: str):
+    """Miglior codifica precompressa accettata dal client (q > 0), altrimenti identity"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    candidates = [
+        (accepted.get(encoding, accepted.get("*", 0.0)), -rank, encoding)
+        for rank, encoding in enumerate(ENCODING_PREFERENCE)
+        if encoding in COMPRESSORS
+    ]
+    q, _, encoding = max(candidates, default=(0.0, 0, "identity"))
+    return encoding if q > 0 else "identity"
+
+
+def snapshot_etag(version: str, encoding: str = "identity"):
+    """ETag forte: cambia con la versione del dataset e con la codifica del body"""
+    return f'"{version}"' if encoding == "identity" else f'"{version}-{encoding}"'
+
+
+def query_etag(version: str, params: dict):
+    """ETag debole per le query: stesso dataset e stessi parametri, stesso risultato"""
+    key = repr(sorted((k, v) for k, v in params.items() if v is not None)).encode("utf-8")
+    return f'W/"{version}-{hashlib.blake2b(key, digest_size=8).hexdigest()}"'
+
+
+def _opaque(tag: str):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, etags):
+    """If-None-Match (confronto debole, come da RFC 9110) contro le ETag della risorsa"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    current = {_opaque(tag) for tag in etags}
+    return any(_opaque(tag) in current for tag in header.split(","))
+
+
+def cache_headers(etag: str, max_age=None):
+    return {"ETag": etag, "Cache-Control": cache_control(max_age), "Vary": "Accept-Encoding"}
+
+
+def snapshot_response(request: Request, snapshot):
+    """
+    Body dello snapshot nella codifica migliore per il client, o 304 se il client ha già
+    questa versione in una qualsiasi codifica. Il body compresso deve essere già pronto
+    (snapshot.encoded), altrimenti lo calcola qui.
+    """
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    etag = snapshot_etag(snapshot.version, encoding)
+    all_etags = [snapshot_etag(snapshot.version, e) for e in ("identity", *COMPRESSORS)]
+    headers = cache_headers(etag)
+    if not_modified(request, all_etags):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=snapshot.encoded(encoding), media_type="application/json", headers=headers)
@@ -0,0 +1,169 @@
+# app/cache/player_index.py
+import base64
+import bisect
+import json
+import threading
+from collections import defaultdict
+
+# Campi di primo livello di un giocatore nel file JSON unificato
+TOP_LEVEL_FIELDS = {"name", "team", "role", "url", "price", "stats", "fbref_data", "fantacalcio_data"}
+NESTED_FIELDS = ("stats", "fbref_data")
+
+
+class InvalidQuery(ValueError):
+    """Parametro di filtro/ordinamento/paginazione non valido"""
+
+
+def _sort_key(value):
+    # Ordine stabile anche con tipi misti: numeri, poi stringhe, valori mancanti per ultimi
+    if isinstance(value, bool):
+        return (0, int(value), "")
+    if isinstance(value, (int, float)):
+        return (0, value, "")
+    if isinstance(value, str):
+        return (1, 0, value.lower())
+    return (2, 0, "")
+
+
+class PlayerIndex:
+    """
+    Indici in memoria su uno snapshot dei giocatori:
+    insiemi per ruolo/squadra, ordinamento per prezzo e ordinamenti
+    per qualsiasi chiave di stats/fbref_data calcolati alla prima richiesta.
+    """
+
+    def __init__(self, players, version):
+        self.players = players
+        self.version = version
+        self.by_role = defaultdict(set)
+        self.by_team = defaultdict(set)
+        self.stats_keys = set()
+        self.fbref_keys = set()
+        for i, p in enumerate(players):
+            self.by_role[(p.get("role") or "").upper()].add(i)
+            self.by_team[(p.get("team") or "").lower()].add(i)
+            self.stats_keys.update((p.get("stats") or {}).keys())
+            self.fbref_keys.update((p.get("fbref_data") or {}).keys())
+
+        self.prices = [float(p.get("price") or 0.0) for p in players]
+        self._price_order = sorted(range(len(players)), key=self.prices.__getitem__)
+        self._sorted_prices = [self.prices[i] for i in self._price_order]
+
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    # -------------------- Campi -------------------- #
+    def resolve_field(self, field):
+        """Converte 'mfv' / 'stats.mfv' / 'name' in un percorso (sezione, chiave)"""
+        field = field.strip()
+        if "." in field:
+            section, key = field.split(".", 1)
+            if section not in NESTED_FIELDS:
+                raise InvalidQuery(f"Campo non valido: {field}")
+            return (section, key)
+        if field in TOP_LEVEL_FIELDS:
+            return (None, field)
+        if field in self.stats_keys:
+            return ("stats", field)
+        if field in self.fbref_keys:
+            return ("fbref_data", field)
+        raise InvalidQuery(f"Campo non valido: {field}")
+
+    @staticmethod
+    def _value(player, path):
+        section, key = path
+        if section is None:
+            return player.get(key)
+        return (player.get(section) or {}).get(key)
+
+    def _order(self, path, descending):
+        """Indici dei giocatori ordinati sul campo (mancanti in fondo) e posizione di ognuno"""
+        order = self._orders.get((path, descending))
+        if order is None:
+            with self._lock:
+                order = self._orders.get((path, descending))
+                if order is None:
+                    keys = [_sort_key(self._value(p, path)) for p in self.players]
+                    present = [i for i, k in enumerate(keys) if k[0] < 2]
+                    missing = [i for i, k in enumerate(keys) if k[0] == 2]
+                    indices = sorted(present, key=keys.__getitem__, reverse=descending) + missing
+                    rank = [0] * len(indices)
+                    for pos, i in enumerate(indices):
+                        rank[i] = pos
+                    order = (indices, rank)
+                    self._orders[(path, descending)] = order
+        return order
+
+    # -------------------- Filtri -------------------- #
+    def _candidates(self, roles, teams, min_price, max_price):
+        """Insieme degli indici che rispettano i filtri, None se non ci sono filtri"""
+        candidates = None
+        if roles:
+            candidates = set().union(*(self.by_role.get(r.upper(), set()) for r in roles))
+        if teams:
+            team_set = set().union(*(self.by_team.get(t.lower(), set()) for t in teams))
+            candidates = team_set if candidates is None else candidates & team_set
+        if min_price is not None or max_price is not None:
+            lo = 0 if min_price is None else bisect.bisect_left(self._sorted_prices, min_price)
+            hi = len(self._sorted_prices) if max_price is None else bisect.bisect_right(self._sorted_prices, max_price)
+            price_set = set(self._price_order[lo:hi])
+            candidates = price_set if candidates is None else candidates & price_set
+        return candidates
+
+    # -------------------- Proiezione -------------------- #
+    def _project(self, player, paths):
+        if paths is None:
+            return player
+        out = {}
+        for section, key in paths:
+            if section is None:
+                out[key] = player.get(key)
+            else:
+                out.setdefault(section, {})[key] = (player.get(section) or {}).get(key)
+        return out
+
+    # -------------------- Cursore -------------------- #
+    def _encode_cursor(self, sort, position):
+        raw = json.dumps({"v": self.version, "s": sort, "p": position}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, cursor, sort):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            position = int(data["p"])
+        except (ValueError, KeyError, TypeError):
+            raise InvalidQuery("Cursore non valido")
+        if data.get("v") != self.version:
+            raise InvalidQuery("Cursore scaduto: i dati sono stati aggiornati")
+        if data.get("s") != sort:
+            raise InvalidQuery("Il cursore appartiene a un altro ordinamento")
+        return position
+
+    # -------------------- Query -------------------- #
+    def query(self, roles=None, teams=None, min_price=None, max_price=None,
+              sort=None, cursor=None, limit=None, fields=None):
+        sort = sort or "name"
+        descending = sort.startswith("-")
+        indices, rank = self._order(self.resolve_field(sort.lstrip("-")), descending)
+        paths = [self.resolve_field(f) for f in fields] if fields else None
+
+        candidates = self._candidates(roles, teams, min_price, max_price)
+        if candidates is None:
+            positions = range(len(indices))
+        else:
+            positions = sorted(rank[i] for i in candidates)
+
+        start = self._decode_cursor(cursor, sort) if cursor else 0
+        first = bisect.bisect_left(positions, start)
+        stop = len(positions) if limit is None else min(first + limit, len(positions))
+
+        page = []
+        for pos in positions[first:stop]:
+            page.append(self._project(self.players[indices[pos]], paths))
+
+        next_cursor = None
+        if stop < len(positions):
+            next_cursor = self._encode_cursor(sort, positions[stop])
+
+        return {"players": page, "total": len(positions), "next_cursor": next_cursor}
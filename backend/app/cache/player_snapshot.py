@@ -0,0 +1,147 @@
+# app/cache/player_snapshot.py
+import gzip
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+from app.cache.player_index import PlayerIndex
+from app.serialization import json_codec
+
+try:
+    import brotli
+except ImportError:  # brotli è opzionale: senza si servono solo gzip e identity
+    brotli = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 🔹 Percorso del file JSON prodotto da update_and_save_players (PLAYERS_DATA_FILE per
+# usarne un altro, es. i dataset sintetici dei benchmark)
+DATA_FILE = Path(os.getenv("PLAYERS_DATA_FILE", Path(__file__).parent.parent.parent / "players_data.json"))
+
+# Livelli massimi: la compressione si fa una volta per versione del dataset
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+class PlayerSnapshot:
+    """Dataset dei giocatori già parsato e già serializzato per la risposta HTTP"""
+
+    def __init__(self, players, body, signature, version):
+        self.players = players      # lista di dict, da NON modificare
+        self.body = body            # bytes pronti per la risposta {"players": [...]}
+        self.signature = signature  # (inode, mtime_ns, size) del file da cui è stato letto
+        self.version = version      # hash del contenuto, stabile tra processi
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._encoded = {"identity": body}
+        self._encoded_lock = threading.Lock()
+
+    @property
+    def index(self):
+        """Indici per filtri/ordinamenti, costruiti alla prima query su questa versione"""
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self._index = PlayerIndex(self.players, self.version)
+        return self._index
+
+    def encoded(self, encoding):
+        """Body compresso con encoding ("gzip", "br" o "identity"), calcolato una volta sola"""
+        body = self._encoded.get(encoding)
+        if body is None:
+            with self._encoded_lock:
+                body = self._encoded.get(encoding)
+                if body is None:
+                    body = self._encoded[encoding] = COMPRESSORS[encoding](self.body)
+                    logger.info(f"🗜️ Snapshot {self.version[:8]} compresso {encoding}: {len(self.body)} -> {len(body)} byte")
+        return body
+
+    def is_encoded(self, encoding):
+        return encoding in self._encoded
+
+    def precompress(self):
+        for encoding in COMPRESSORS:
+            self.encoded(encoding)
+
+
+class PlayerSnapshotStore:
+    """
+    Cache di processo del file players_data.json.
+    Il file viene riletto solo se cambia mtime/size o dopo invalidate().
+    """
+
+    def __init__(self, path=DATA_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stale = False
+
+    def _signature(self):
+        # l'inode cambia a ogni sostituzione atomica (os.replace) del file: una nuova
+        # generazione del dataset viene vista esattamente una volta
+        st = os.stat(self.path)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def current(self):
+        """Snapshot valido senza I/O bloccante (solo stat), oppure None se va ricaricato"""
+        snapshot = self._snapshot
+        if snapshot is None or self._stale:
+            return None
+        try:
+            if snapshot.signature != self._signature():
+                return None
+        except FileNotFoundError:
+            return None
+        return snapshot
+
+    def get(self):
+        """Restituisce lo snapshot, ricaricandolo dal disco se necessario"""
+        snapshot = self.current()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            # un altro thread potrebbe averlo già ricaricato
+            snapshot = self.current()
+            if snapshot is not None:
+                return snapshot
+
+            signature = self._signature()
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            players = json_codec.loads(raw)
+            body = json_codec.dumps({"players": players})
+            version = hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+            snapshot = PlayerSnapshot(players, body, signature, version)
+            self._snapshot = snapshot
+            self._stale = False
+            logger.info(f"📦 Snapshot giocatori caricato ({len(players)} giocatori, versione {version[:8]})")
+            # le versioni compresse si preparano subito in background, non alla prima richiesta
+            threading.Thread(target=self._precompress, args=(snapshot,), name="snapshot-precompress", daemon=True).start()
+            return snapshot
+
+    def _precompress(self, snapshot):
+        for encoding in COMPRESSORS:
+            # se nel frattempo è arrivata un'altra versione non serve più (brotli 11 è lento)
+            if self._snapshot is not snapshot or self._stale:
+                return
+            snapshot.encoded(encoding)
+
+    def invalidate(self):
+        """Forza il ricaricamento alla prossima richiesta"""
+        self._stale = True
+
+
+player_snapshot = PlayerSnapshotStore()
+
+
+def invalidate_player_snapshot():
+    player_snapshot.invalidate()
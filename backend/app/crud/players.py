@@ -1,20 +1,168 @@
+from sqlalchemy import delete, func, insert, select, text
 from sqlalchemy.orm import Session
+from app.db import fbref_stats
+from app.crud.squads import refresh_squad_summaries, squads_with_players
 from app.db.models import Player, Prediction
 from app.schemas.schemas import PlayerCreate, PredictionCreate
+from app.search.player_search import FINGERPRINT_QUERY, ROWS_QUERY, index_fingerprint, player_search_index, invalidate_search_index
 
 def create_player(db: Session, player: PlayerCreate):
     db_player = Player(**player.dict())
     db.add(db_player)
     db.commit()
     db.refresh(db_player)
+    invalidate_search_index()
     return db_player
 
-def search_players(db: Session, name: str):
-    return db.query(Player).filter(Player.name.ilike(f"%{name}%")).all()
+PLAYER_COLUMNS = (Player.id, Player.name, Player.team, Player.role, Player.price, Player.stats, Player.fantacalcio_data)
+
+def search_players(db: Session, name: str, mode: str = "auto", limit: int = 20):
+    """Giocatori trovati, come dict con i campi dello schema Player, in ordine di rilevanza"""
+    return players_by_ids(db, search_player_ids(*search_index_source(db), name, mode=mode, limit=limit))
+
+def search_index_source(db: Session):
+    """Letture per l'indice di ricerca: impronta della tabella e, se l'indice è vecchio, le righe"""
+    fingerprint = index_fingerprint(db.execute(text(FINGERPRINT_QUERY)).one())
+    rows = None if player_search_index.is_current(fingerprint) else db.execute(text(ROWS_QUERY)).all()
+    return fingerprint, rows
+
+def search_player_ids(fingerprint, rows, name: str, mode: str = "auto", limit: int = 20):
+    """Id trovati in ordine di rilevanza; (ri)costruisce l'indice se serve. Solo CPU, niente sessione"""
+    return player_search_index.load(fingerprint, rows).search(name, mode=mode, limit=limit)
+
+def players_by_ids(db: Session, ids):
+    if not ids:
+        return []
+    by_id = {row.id: row._asdict() for row in db.query(*PLAYER_COLUMNS).filter(Player.id.in_(ids))}
+    return [by_id[i] for i in ids if i in by_id]
+
+def fbref_leaderboard(db: Session, stat: str, limit: int = 20, role: str = None, min_minutes: int = 0):
+    return fbref_stats.leaderboard(db.connection(), stat, limit=limit, role=role, min_minutes=min_minutes)
+
+def compare_players(db: Session, player_ids, stats=None):
+    return fbref_stats.compare(db.connection(), player_ids, stats=stats)
 
 def create_prediction(db: Session, pred: PredictionCreate):
+    latest = db.query(func.max(Prediction.matchday)).scalar()
     db_pred = Prediction(**pred.dict())
     db.add(db_pred)
+    db.flush()
+    # gli aggregati usano l'ultima giornata: una giornata nuova cambia tutte le rose,
+    # una previsione dell'ultima solo quelle con il giocatore, le precedenti nessuna
+    if latest is None or db_pred.matchday > latest:
+        refresh_squad_summaries(db)
+    elif db_pred.matchday == latest:
+        refresh_squad_summaries(db, squads_with_players(db, [db_pred.player_id]))
     db.commit()
     db.refresh(db_pred)
     return db_pred
+
+def player_export_query(roles=None, teams=None, min_price: float = None, max_price: float = None):
+    """Select dei giocatori per l'export, in ordine di id (la chiave primaria)"""
+    query = select(*PLAYER_COLUMNS)
+    if roles:
+        query = query.where(Player.role.in_(roles))
+    if teams:
+        query = query.where(Player.team.in_(teams))
+    if min_price is not None:
+        query = query.where(Player.price >= min_price)
+    if max_price is not None:
+        query = query.where(Player.price <= max_price)
+    return query.order_by(Player.id)
+
+def prediction_export_query(from_matchday: int = None, to_matchday: int = None, roles=None, teams=None, player_ids=None):
+    """Select delle previsioni (tutte le giornate salvate) per l'export, per giornata e id"""
+    query = select(
+        Prediction.id, Prediction.player_id, Player.name, Player.team, Player.role, Prediction.matchday,
+        Prediction.predicted_fantamedia, Prediction.predicted_media_voto, Prediction.created_at,
+    ).join(Player, Player.id == Prediction.player_id)
+    if from_matchday is not None:
+        query = query.where(Prediction.matchday >= from_matchday)
+    if to_matchday is not None:
+        query = query.where(Prediction.matchday <= to_matchday)
+    if roles:
+        query = query.where(Player.role.in_(roles))
+    if teams:
+        query = query.where(Player.team.in_(teams))
+    if player_ids:
+        query = query.where(Prediction.player_id.in_(player_ids))
+    # l'indice su matchday contiene anche l'id: ordinamento senza sort in memoria
+    return query.order_by(Prediction.matchday, Prediction.id)
+
+def player_ids_by_key(db: Session):
+    return {(name, team): pid for pid, name, team in db.query(Player.id, Player.name, Player.team)}
+
+def replace_predictions(db: Session, matchday: int, rows):
+    """Sostituisce tutte le previsioni di una giornata con un unico inserimento in blocco"""
+    db.execute(delete(Prediction).where(Prediction.matchday == matchday))
+    if rows:
+        db.execute(insert(Prediction), rows)
+    refresh_squad_summaries(db)
+    db.commit()
+    return len(rows)
+
+def get_predictions(db: Session, matchday: int, role: str = None, limit: int = None):
+    query = (
+        db.query(
+            Prediction.player_id, Player.name, Player.team, Player.role,
+            Prediction.matchday, Prediction.predicted_fantamedia, Prediction.predicted_media_voto,
+        )
+        .join(Player, Player.id == Prediction.player_id)
+        .filter(Prediction.matchday == matchday)
+    )
+    if role:
+        query = query.filter(Player.role == role)
+    query = query.order_by(Prediction.predicted_fantamedia.desc())
+    if limit:
+        query = query.limit(limit)
+    return [row._asdict() for row in query]
+
+def prediction_source(db: Session, matchday: int = None):
+    """
+    Letture per la fantamedia prevista della giornata indicata (o dell'ultima calcolata):
+    (previsioni salvate, None) oppure, se la giornata non ne ha, (None, id dei giocatori
+    per (name, team)) per calcolarle al volo dallo snapshot con scores_from_source
+    """
+    if matchday is None:
+        matchday = db.query(func.max(Prediction.matchday)).scalar()
+    if matchday is not None:
+        rows = db.query(Prediction.player_id, Prediction.predicted_fantamedia).filter(Prediction.matchday == matchday)
+        scores = {pid: score for pid, score in rows}
+        if scores:
+            return scores, None
+    return None, player_ids_by_key(db)
+
+def scores_from_source(saved, ids):
+    """Fantamedia da prediction_source; il calcolo dallo snapshot (CPU) non usa la sessione"""
+    if saved is not None:
+        return saved
+    from app.cache.player_snapshot import player_snapshot
+    from app.engine.predictor import predict_players
+    try:
+        records = [p for p in player_snapshot.get().players if (p['name'], p['team']) in ids]
+    except FileNotFoundError:
+        return {}
+    fantamedia, _ = predict_players(records)
+    return {ids[(p['name'], p['team'])]: float(fm) for p, fm in zip(records, fantamedia)}
+
+def simulation_source(db: Session, player_ids, matchday: int = None):
+    """Letture per il simulatore: righe dei giocatori indicati e previsioni (vedi prediction_source)"""
+    rows = db.query(Player.id, Player.name, Player.team, Player.role, Player.price).filter(Player.id.in_(player_ids)).all()
+    return rows, prediction_source(db, matchday)
+
+def simulation_players_from(rows, scores_source):
+    """
+    Record unificati (dallo snapshot) e fantamedia prevista dei giocatori letti da
+    simulation_source, più le partite disputate da ogni squadra. I giocatori assenti dallo
+    snapshot hanno solo nome, squadra e ruolo. Senza sessione: gira nel threadpool.
+    """
+    from app.cache.player_snapshot import player_snapshot
+    from app.engine.simulator import team_schedule
+    try:
+        snapshot = player_snapshot.get().players
+    except FileNotFoundError:
+        snapshot = []
+    by_key = {(p['name'], p['team']): p for p in snapshot}
+    scores = scores_from_source(*scores_source)
+    records = [by_key.get((name, team)) or {"name": name, "team": team, "role": role} for _, name, team, _, _ in rows]
+    return rows, records, [scores.get(row[0], float("nan")) for row in rows], team_schedule(snapshot)
@@ -0,0 +1,150 @@
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session, selectinload
+from app.db.models import Player, Prediction, Squad, SquadPlayer, SquadSummary
+
+SUMMARY_ROLES = {"GK": "gk_count", "DEF": "def_count", "MID": "mid_count", "FWD": "fwd_count"}
+
+class RosterError(ValueError):
+    """Rosa non valida: giocatori sconosciuti o duplicati, quote per ruolo o budget superati"""
+
+def refresh_squad_summaries(db: Session, squad_ids=None):
+    """
+    Ricalcola gli aggregati delle rose indicate (tutte se None) con un solo
+    INSERT ... SELECT: prezzo totale, giocatori per ruolo e somma della fantamedia
+    prevista dell'ultima giornata. Non fa commit: va chiamata nella stessa
+    transazione della modifica che rende vecchi gli aggregati.
+    """
+    latest = select(func.max(Prediction.matchday)).scalar_subquery()
+    predicted = (
+        select(Prediction.player_id, func.avg(Prediction.predicted_fantamedia).label("fantamedia"))
+        .where(Prediction.matchday == latest)
+        .group_by(Prediction.player_id)
+        .subquery()
+    )
+    members = select(SquadPlayer.squad_id, SquadPlayer.player_id).distinct().subquery()
+    columns = {
+        "squad_id": Squad.id,
+        "players_count": func.count(Player.id),
+        "total_price": func.coalesce(func.sum(Player.price), 0.0),
+        **{
+            column: func.coalesce(func.sum(case((Player.role == role, 1), else_=0)), 0)
+            for role, column in SUMMARY_ROLES.items()
+        },
+        "predicted_fantamedia": func.coalesce(func.sum(predicted.c.fantamedia), 0.0),
+        "matchday": latest,
+    }
+    aggregate = (
+        select(*columns.values())
+        .select_from(Squad)
+        .outerjoin(members, members.c.squad_id == Squad.id)
+        .outerjoin(Player, Player.id == members.c.player_id)
+        .outerjoin(predicted, predicted.c.player_id == members.c.player_id)
+        .group_by(Squad.id)
+    )
+    stale = delete(SquadSummary)
+    if squad_ids is not None:
+        squad_ids = list(squad_ids)
+        if not squad_ids:
+            return
+        aggregate = aggregate.where(Squad.id.in_(squad_ids))
+        stale = stale.where(SquadSummary.squad_id.in_(squad_ids))
+    db.execute(stale)
+    db.execute(insert(SquadSummary).from_select(list(columns), aggregate))
+
+def _squads_query(db: Session, include_players: bool):
+    query = db.query(Squad)
+    if include_players:
+        # una query per squad_players e una per players, qualunque sia il numero di rose
+        query = query.options(selectinload(Squad.squad_players).selectinload(SquadPlayer.player))
+    return query
+
+def squads_with_players(db: Session, player_ids):
+    """Id delle rose che contengono almeno uno dei giocatori indicati"""
+    player_ids = list(player_ids)
+    if not player_ids:
+        return []
+    return db.execute(
+        select(SquadPlayer.squad_id).where(SquadPlayer.player_id.in_(player_ids)).distinct()
+    ).scalars().all()
+
+def backfill_squad_summaries(db: Session):
+    """Aggregati delle rose che non li hanno (es. create prima della tabella). Non fa commit."""
+    missing = db.execute(
+        select(Squad.id).outerjoin(SquadSummary, SquadSummary.squad_id == Squad.id)
+        .where(SquadSummary.squad_id.is_(None))
+    ).scalars().all()
+    refresh_squad_summaries(db, missing)
+    return len(missing)
+
+def list_squads(db: Session, user_id: int = None, limit: int = 100, offset: int = 0, include_players: bool = False):
+    query = _squads_query(db, include_players)
+    if user_id is not None:
+        query = query.filter(Squad.user_id == user_id)
+    return query.order_by(Squad.id).offset(offset).limit(limit).all()
+
+def get_squad(db: Session, squad_id: int, user_id: int = None):
+    """Rosa con giocatori e aggregati; con user_id solo se appartiene a quell'utente"""
+    query = _squads_query(db, True).filter(Squad.id == squad_id)
+    if user_id is not None:
+        query = query.filter(Squad.user_id == user_id)
+    return query.first()
+
+def squad_to_dict(squad: Squad, include_players: bool = True):
+    summary = squad.summary
+    data = {
+        "id": squad.id,
+        "name": squad.name,
+        "user_id": squad.user_id,
+        "created_at": squad.created_at,
+        "summary": {
+            "players_count": summary.players_count,
+            "total_price": summary.total_price,
+            "roles": {role: getattr(summary, column) for role, column in SUMMARY_ROLES.items()},
+            "predicted_fantamedia": round(summary.predicted_fantamedia, 2),
+            "matchday": summary.matchday,
+        } if summary else None,
+    }
+    if include_players:
+        players = {sp.player.id: sp.player for sp in squad.squad_players if sp.player is not None}
+        data["players"] = [
+            {"id": p.id, "name": p.name, "team": p.team, "role": p.role, "price": p.price}
+            for p in players.values()
+        ]
+    return data
+
+def replace_squad_players(db: Session, squad: Squad, player_ids, budget: float, quotas):
+    """
+    Sostituisce la rosa con i giocatori indicati: valida quote e budget, calcola la
+    differenza con la rosa attuale e applica cancellazioni e inserimenti in blocco,
+    insieme agli aggregati, in un'unica transazione.
+    """
+    wanted = list(player_ids)
+    if len(set(wanted)) != len(wanted):
+        raise RosterError("Giocatori duplicati nella rosa")
+    rows = db.query(Player.id, Player.role, Player.price).filter(Player.id.in_(wanted)).all() if wanted else []
+    unknown = sorted(set(wanted) - {pid for pid, _, _ in rows})
+    if unknown:
+        raise RosterError(f"Giocatori non trovati: {unknown}")
+
+    counts = {}
+    for _, role, _ in rows:
+        counts[role] = counts.get(role, 0) + 1
+    over = {role: n for role, n in counts.items() if n > quotas.get(role, 0)}
+    if over:
+        raise RosterError(f"Quote per ruolo superate: {over} (massimo {quotas})")
+    total_price = sum(price or 0.0 for _, _, price in rows)
+    if total_price > budget:
+        raise RosterError(f"Budget superato: {total_price:g} su {budget:g}")
+
+    current = {pid for (pid,) in db.query(SquadPlayer.player_id).filter(SquadPlayer.squad_id == squad.id)}
+    added = [pid for pid in wanted if pid not in current]
+    removed = sorted(current - set(wanted))
+    if removed:
+        db.execute(delete(SquadPlayer).where(SquadPlayer.squad_id == squad.id, SquadPlayer.player_id.in_(removed)))
+    if added:
+        db.execute(insert(SquadPlayer), [{"squad_id": squad.id, "player_id": pid} for pid in added])
+    if added or removed:
+        squad.updated_at = func.now()
+        refresh_squad_summaries(db, [squad.id])
+    db.commit()
+    return {"squad_id": squad.id, "added": added, "removed": removed, "players_count": len(wanted), "total_price": total_price}
@@ -3,8 +3,9 @@ from app.db.models import User
 from app.schemas.schemas import UserCreate
 from app.auth.auth import hash_password
 
-def create_user(db: Session, user: UserCreate):
-    db_user = User(email=user.email, hashed_password=hash_password(user.password))
+def create_user(db: Session, user: UserCreate, hashed_password: str = None):
+    """hashed_password permette di calcolare l'hash (costoso) fuori dalla sessione"""
+    db_user = User(email=user.email, hashed_password=hashed_password or hash_password(user.password))
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -12,3 +13,7 @@ def create_user(db: Session, user: UserCreate):
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
+
+def update_password_hash(db: Session, user_id: int, hashed_password: str):
+    db.query(User).filter(User.id == user_id).update({User.hashed_password: hashed_password})
+    db.commit()
@@ -0,0 +1,296 @@
+# app/db/fbref_stats.py
+# Statistiche FBref in forma tabellare: una riga per giocatore e una colonna
+# tipizzata per ogni data-stat della tabella stats_standard.
+# Le funzioni ricevono una Connection SQLAlchemy (engine.connect() o session.connection())
+# e usano SQL Core portabile: SQLite e Postgres.
+import logging
+import re
+import weakref
+
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, MetaData, Table, Text, bindparam, column, inspect, table, text
+
+from app.db.upsert import upsert
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FBREF_TABLE = "fbref_player_stats"
+LEGACY_EAV_TABLE = "fbref_stats"
+
+# Colonne della tabella "stats_standard" di FBref (attributo data-stat) e relativo tipo
+FBREF_COLUMNS = {
+    "player": "TEXT",
+    "nationality": "TEXT",
+    "position": "TEXT",
+    "team": "TEXT",
+    "age": "TEXT",  # formato FBref "anni-giorni", es. "27-090"
+    "birth_year": "INTEGER",
+    "games": "INTEGER",
+    "games_starts": "INTEGER",
+    "minutes": "INTEGER",
+    "minutes_90s": "REAL",
+    "goals": "INTEGER",
+    "assists": "INTEGER",
+    "goals_assists": "INTEGER",
+    "goals_pens": "INTEGER",
+    "pens_made": "INTEGER",
+    "pens_att": "INTEGER",
+    "cards_yellow": "INTEGER",
+    "cards_red": "INTEGER",
+    "xg": "REAL",
+    "npxg": "REAL",
+    "xg_assist": "REAL",
+    "npxg_xg_assist": "REAL",
+    "progressive_carries": "INTEGER",
+    "progressive_passes": "INTEGER",
+    "progressive_passes_received": "INTEGER",
+    "goals_per90": "REAL",
+    "assists_per90": "REAL",
+    "goals_assists_per90": "REAL",
+    "goals_pens_per90": "REAL",
+    "goals_assists_pens_per90": "REAL",
+    "xg_per90": "REAL",
+    "xg_assist_per90": "REAL",
+    "xg_xg_assist_per90": "REAL",
+    "npxg_per90": "REAL",
+    "npxg_xg_assist_per90": "REAL",
+}
+
+# Colonne di sola navigazione nella pagina FBref, non salvate
+SKIPPED_COLUMNS = {"matches"}
+
+# Statistiche usate per classifiche e confronti: hanno un indice dedicato
+RANKED_COLUMNS = (
+    "minutes", "goals", "assists", "goals_assists", "xg", "npxg", "xg_assist",
+    "npxg_xg_assist", "progressive_carries", "progressive_passes",
+    "goals_per90", "xg_per90", "xg_assist_per90",
+)
+
+# Tipi SQL delle colonne FBref -> tipi SQLAlchemy (REAL diventa DOUBLE PRECISION su Postgres)
+SQL_TYPES = {"TEXT": Text, "INTEGER": Integer, "REAL": Float}
+
+_COLUMN_NAME = re.compile(r"^[a-z][a-z0-9_]*$")
+
+
+class UnknownStat(ValueError):
+    """Statistica non presente (o non numerica) nella tabella FBref"""
+
+
+def infer_sql_type(values):
+    """Tipo SQL per una colonna FBref non ancora conosciuta, dedotto dai valori"""
+    values = [v for v in values if v is not None]
+    if values and all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "INTEGER"
+    if values and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return "REAL"
+    return "TEXT"
+
+
+def _coerce(value, sql_type):
+    if value is None:
+        return None
+    if sql_type == "TEXT":
+        # lo scraper converte le celle vuote in 0
+        return value if isinstance(value, str) and value else None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if sql_type == "INTEGER":
+        return int(value) if float(value).is_integer() else value
+    return float(value)
+
+
+def _type_name(sql_type):
+    """Tipo SQL (TEXT/INTEGER/REAL) di una colonna letta dall'inspector"""
+    if isinstance(sql_type, Integer):
+        return "INTEGER"
+    if isinstance(sql_type, Float):
+        return "REAL"
+    return "TEXT"
+
+
+# Colonne lette dall'inspector per database (per engine): lo schema cambia solo con
+# ensure_schema/migrate_eav, che svuotano la cache. Le colonne aggiunte da un altro
+# processo (lo script di aggiornamento) si rileggono quando una richiesta ne chiede una
+# che la cache non conosce
+_columns_cache = weakref.WeakKeyDictionary()
+
+
+def get_columns(conn, refresh=False):
+    """Colonne statistiche presenti nella tabella, con il tipo (senza player_id)"""
+    columns = None if refresh else _columns_cache.get(conn.engine)
+    if columns is None:
+        inspector = inspect(conn)
+        if not inspector.has_table(FBREF_TABLE):
+            return {}
+        columns = {
+            c["name"]: _type_name(c["type"])
+            for c in inspector.get_columns(FBREF_TABLE) if c["name"] != "player_id"
+        }
+        _columns_cache[conn.engine] = columns
+    return dict(columns)
+
+
+def invalidate_columns(conn):
+    _columns_cache.pop(conn.engine, None)
+
+
+def _table_definition():
+    from app.db.models import Player
+    return Table(
+        FBREF_TABLE, MetaData(),
+        Column("player_id", Integer, ForeignKey(Player.id), primary_key=True),
+        *(Column(name, SQL_TYPES[sql_type]) for name, sql_type in FBREF_COLUMNS.items()),
+        *(Index(f"ix_{FBREF_TABLE}_{name}", name) for name in RANKED_COLUMNS),
+    )
+
+
+def ensure_schema(conn, extra_columns=None):
+    """
+    Crea la tabella (se manca), aggiunge le colonne nuove e gli indici.
+    extra_columns: {data-stat: tipo SQL} per intestazioni FBref non ancora note.
+    """
+    definition = _table_definition()
+    definition.create(conn, checkfirst=True)
+
+    existing = get_columns(conn, refresh=True)
+    wanted = dict(FBREF_COLUMNS)
+    wanted.update(extra_columns or {})
+    for name, sql_type in wanted.items():
+        if name not in existing:
+            column_type = SQL_TYPES[sql_type]().compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {FBREF_TABLE} ADD COLUMN {name} {column_type}"))
+            existing[name] = sql_type
+            logger.info(f"➕ Nuova colonna FBref: {name} ({sql_type})")
+    # rilette alla prossima richiesta: se la transazione venisse annullata le colonne
+    # aggiunte qui non esisterebbero
+    invalidate_columns(conn)
+
+    for index in definition.indexes:
+        index.create(conn, checkfirst=True)
+    return existing
+
+
+def upsert_stats(conn, rows):
+    """
+    Scrive (o sostituisce) la riga di statistiche di ogni giocatore.
+    rows: lista di (player_id, dict fbref_data). Non esegue commit.
+    """
+    if not rows:
+        return
+
+    # Intestazioni FBref nuove: la colonna viene aggiunta con il tipo dedotto dai valori
+    columns = get_columns(conn)
+    new_values = {}
+    for _, stats in rows:
+        for name, value in stats.items():
+            if name in columns or name in SKIPPED_COLUMNS:
+                continue
+            if not _COLUMN_NAME.match(name):
+                continue
+            new_values.setdefault(name, []).append(value)
+    if new_values or not columns:
+        columns = ensure_schema(conn, {name: infer_sql_type(v) for name, v in new_values.items()})
+
+    names = list(columns)
+    target = table(FBREF_TABLE, column("player_id"), *(column(name) for name in names))
+    conn.execute(upsert(conn, target, ["player_id"]), [
+        {"player_id": player_id, **{name: _coerce(stats.get(name), columns[name]) for name in names}}
+        for player_id, stats in rows
+    ])
+
+
+def delete_stats(conn, player_ids):
+    """Elimina le statistiche dei giocatori indicati. Non esegue commit."""
+    if not player_ids:
+        return
+    conn.execute(
+        text(f"DELETE FROM {FBREF_TABLE} WHERE player_id IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(player_ids)},
+    )
+
+
+def migrate_eav(conn):
+    """
+    Migra la vecchia tabella fbref_stats(player_id, stat_name, stat_value)
+    nella tabella tipizzata ed elimina la tabella originale. Non esegue commit.
+    """
+    if not inspect(conn).has_table(LEGACY_EAV_TABLE):
+        return 0
+
+    # la tabella chiave/valore esiste solo nei database SQLite delle vecchie versioni:
+    # rowid dà l'ordine di inserimento (vince l'ultimo valore)
+    rows = conn.execute(text(f"SELECT player_id, stat_name, stat_value FROM {LEGACY_EAV_TABLE} ORDER BY rowid"))
+    pivot = {}
+    for player_id, stat_name, stat_value in rows:
+        if player_id is None or stat_name is None:
+            continue
+        pivot.setdefault(player_id, {})[stat_name] = stat_value
+
+    upsert_stats(conn, list(pivot.items()))
+    conn.execute(text(f"DROP TABLE {LEGACY_EAV_TABLE}"))
+    invalidate_columns(conn)
+    logger.info(f"🔁 Migrate statistiche FBref di {len(pivot)} giocatori nella tabella {FBREF_TABLE}")
+    return len(pivot)
+
+
+def _numeric_column(conn, stat):
+    columns = get_columns(conn)
+    if stat not in columns:
+        columns = get_columns(conn, refresh=True)
+    if columns.get(stat) not in ("INTEGER", "REAL"):
+        raise UnknownStat(f"Statistica non valida: {stat}")
+    return stat
+
+
+def leaderboard(conn, stat, limit=20, role=None, min_minutes=0):
+    """Classifica dei giocatori per una statistica FBref (lettura sull'indice della colonna)"""
+    column_name = _numeric_column(conn, stat)
+    query = f"""
+        SELECT p.id, p.name, p.team, p.role, s.{column_name}
+        FROM {FBREF_TABLE} s JOIN players p ON p.id = s.player_id
+        WHERE s.{column_name} IS NOT NULL"""
+    params = {"limit": limit}
+    if role:
+        query += " AND p.role = :role"
+        params["role"] = role
+    if min_minutes:
+        query += " AND s.minutes >= :min_minutes"
+        params["min_minutes"] = min_minutes
+    query += f" ORDER BY s.{column_name} DESC LIMIT :limit"
+
+    return [
+        {"id": pid, "name": name, "team": team, "role": prole, stat: value}
+        for pid, name, team, prole, value in conn.execute(text(query), params)
+    ]
+
+
+def compare(conn, player_ids, stats=None):
+    """Statistiche FBref dei giocatori indicati (lettura per chiave primaria)"""
+    columns = get_columns(conn)
+    if not columns or any(s not in columns for s in stats or ()):
+        columns = get_columns(conn, refresh=True)
+    if not columns:
+        raise UnknownStat("Statistiche FBref non ancora caricate")
+    if stats:
+        unknown = [s for s in stats if s not in columns]
+        if unknown:
+            raise UnknownStat(f"Statistiche non valide: {', '.join(unknown)}")
+        names = list(stats)
+    else:
+        names = list(columns)
+
+    query = text(f"""
+        SELECT p.id, p.name, p.team, p.role, {", ".join(f"s.{n}" for n in names)}
+        FROM players p LEFT JOIN {FBREF_TABLE} s ON s.player_id = p.id
+        WHERE p.id IN :ids""").bindparams(bindparam("ids", expanding=True))
+    results = []
+    for row in conn.execute(query, {"ids": list(player_ids)}):
+        pid, name, team, prole = row[:4]
+        results.append({
+            "id": pid, "name": name, "team": team, "role": prole,
+            "fbref_data": dict(zip(names, row[4:])),
+        })
+    return results
@@ -0,0 +1,95 @@
+# app/db/migrations.py
+# Migrazioni idempotenti eseguite all'avvio: create_all crea solo le tabelle mancanti,
+# quindi indici e vincoli aggiunti ai modelli vanno portati anche sui database esistenti.
+import logging
+
+from sqlalchemy import delete, func, select
+
+from app.db import fbref_stats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def dedupe_players(cursor):
+    """
+    Elimina i giocatori duplicati (stesso name/team) lasciati dalle vecchie esecuzioni,
+    spostando i riferimenti sull'id più basso, così da poter creare l'indice univoco.
+    """
+    cursor.execute("DROP TABLE IF EXISTS temp.player_remap")
+    cursor.execute("""
+        CREATE TEMP TABLE player_remap AS
+        SELECT p.id AS old_id, k.keep_id
+        FROM players p
+        JOIN (SELECT name, team, MIN(id) AS keep_id FROM players
+              GROUP BY name, team HAVING COUNT(*) > 1) k
+          ON p.name = k.name AND p.team IS k.team
+        WHERE p.id != k.keep_id""")
+    cursor.execute("SELECT COUNT(*) FROM player_remap")
+    duplicates = cursor.fetchone()[0]
+    if duplicates:
+        for table in ("fantacalcio_stats", fbref_stats.LEGACY_EAV_TABLE, "squad_players", "predictions"):
+            if table_exists(cursor, table):
+                # OR IGNORE: le righe che violerebbero un indice univoco restano sul
+                # vecchio id e vengono eliminate subito dopo
+                cursor.execute(f"""
+                    UPDATE OR IGNORE {table}
+                    SET player_id = (SELECT keep_id FROM player_remap WHERE old_id = {table}.player_id)
+                    WHERE player_id IN (SELECT old_id FROM player_remap)""")
+                cursor.execute(f"DELETE FROM {table} WHERE player_id IN (SELECT old_id FROM player_remap)")
+        if table_exists(cursor, fbref_stats.FBREF_TABLE):
+            cursor.execute(f"""
+                DELETE FROM {fbref_stats.FBREF_TABLE}
+                WHERE player_id IN (SELECT old_id FROM player_remap)""")
+        cursor.execute("DELETE FROM players WHERE id IN (SELECT old_id FROM player_remap)")
+        logger.info(f"🧹 Rimossi {duplicates} giocatori duplicati")
+    cursor.execute("DROP TABLE player_remap")
+
+
+def _dedupe_squad_players(conn):
+    """Tiene una sola riga per (squad_id, player_id), quella con l'id più basso"""
+    from app.db.models import SquadPlayer
+    keep = select(func.min(SquadPlayer.id)).group_by(SquadPlayer.squad_id, SquadPlayer.player_id)
+    removed = conn.execute(delete(SquadPlayer).where(SquadPlayer.id.not_in(keep))).rowcount
+    if removed:
+        logger.info(f"🧹 Rimossi {removed} giocatori duplicati dalle rose")
+
+
+def run_migrations(engine):
+    """
+    Rimuove i duplicati che impedirebbero gli indici univoci, crea gli indici dei
+    modelli mancanti (CREATE INDEX solo se non esiste già) e gli aggregati delle rose
+    mancanti, in un'unica transazione.
+    """
+    from app.db.database import Base
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # la deduplica dei giocatori usa SQL specifico di SQLite
+            dedupe_players(conn.connection.cursor())
+        _dedupe_squad_players(conn)
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+        # gli aggregati si aggiornano solo in scrittura: le rose che non li hanno (create
+        # prima della tabella) li ricevono qui, non alla prima lettura
+        from app.crud.squads import backfill_squad_summaries
+        backfilled = backfill_squad_summaries(conn)
+        if backfilled:
+            logger.info(f"🧮 Calcolati gli aggregati di {backfilled} rose")
+    logger.info("✅ Migrazioni applicate")
+
+
+def init_db(engine):
+    """
+    Schema all'avvio: tabelle mancanti (create_all) e migrazioni. Chiamata dal lifespan
+    dell'app, non all'import, e dagli script e benchmark che usano il database senza API.
+    """
+    from app.db import models  # noqa: F401  registra i modelli su Base.metadata
+    from app.db.database import Base
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
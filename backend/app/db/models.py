@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import Boolean, Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -23,30 +23,49 @@ class Player(Base):
     fantacalcio_data = Column(JSON)
     predictions = relationship("Prediction", back_populates="player")
     squad_players = relationship("SquadPlayer", back_populates="player")
+    # stesso indice creato dallo script di aggiornamento per gli upsert su (name, team)
+    __table_args__ = (Index("ux_players_name_team", "name", "team", unique=True),)
 
 class Squad(Base):
     __tablename__ = "squads"
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"))
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
     name = Column(String)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     owner = relationship("User", back_populates="squads")
     squad_players = relationship("SquadPlayer", back_populates="squad")
+    summary = relationship("SquadSummary", back_populates="squad", uselist=False, lazy="joined")
 
 class SquadPlayer(Base):
     __tablename__ = "squad_players"
     id = Column(Integer, primary_key=True, index=True)
-    squad_id = Column(Integer, ForeignKey("squads.id"))
+    squad_id = Column(Integer, ForeignKey("squads.id"), index=True)
     player_id = Column(Integer, ForeignKey("players.id"))
     squad = relationship("Squad", back_populates="squad_players")
     player = relationship("Player", back_populates="squad_players")
+    # indice univoco invece di UniqueConstraint: si può aggiungere anche alle tabelle esistenti
+    __table_args__ = (Index("ux_squad_players_squad_player", "squad_id", "player_id", unique=True),)
+
+class SquadSummary(Base):
+    """Aggregati denormalizzati di una rosa, aggiornati a ogni modifica (vedi crud.squads)"""
+    __tablename__ = "squad_summaries"
+    squad_id = Column(Integer, ForeignKey("squads.id"), primary_key=True)
+    players_count = Column(Integer, default=0)
+    total_price = Column(Float, default=0.0)
+    gk_count = Column(Integer, default=0)
+    def_count = Column(Integer, default=0)
+    mid_count = Column(Integer, default=0)
+    fwd_count = Column(Integer, default=0)
+    predicted_fantamedia = Column(Float, default=0.0)
+    matchday = Column(Integer)  # giornata delle previsioni sommate
+    squad = relationship("Squad", back_populates="summary")
 
 class Prediction(Base):
     __tablename__ = "predictions"
     id = Column(Integer, primary_key=True, index=True)
     player_id = Column(Integer, ForeignKey("players.id"))
-    matchday = Column(Integer)
+    matchday = Column(Integer, index=True)
     predicted_fantamedia = Column(Float)
     predicted_media_voto = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
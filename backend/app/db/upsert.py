@@ -0,0 +1,22 @@
+# app/db/upsert.py
+# INSERT ... ON CONFLICT DO UPDATE per il dialetto della connessione: SQLite e Postgres
+# hanno la stessa sintassi, ma SQLAlchemy la espone da moduli diversi.
+
+
+def upsert(conn, table, keys, columns=None):
+    """
+    Insert su table che, in conflitto sull'indice univoco di keys, aggiorna columns
+    (default: tutte le altre colonne). table può essere una Table o una table() Core.
+    """
+    if conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f"Upsert non supportato per il database {conn.dialect.name}")
+    statement = insert(table)
+    if columns is None:
+        columns = [c.name for c in table.columns if c.name not in keys]
+    return statement.on_conflict_do_update(
+        index_elements=list(keys), set_={name: statement.excluded[name] for name in columns},
+    )
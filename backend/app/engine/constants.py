@@ -0,0 +1,7 @@
+# app/engine/constants.py
+# Parametri del simulatore usati anche da router e schemi: modulo senza dipendenze, così
+# chi li importa all'avvio non carica NumPy con app.engine.simulator
+DEFAULT_SIMULATIONS = 10_000
+MAX_SIMULATIONS = 200_000
+# Rose al massimo in una richiesta di simulazione (scontro diretto o lega)
+MAX_SIMULATION_SQUADS = 20
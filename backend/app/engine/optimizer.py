@@ -0,0 +1,459 @@
+# app/engine/optimizer.py
+import heapq
+import math
+from collections import Counter
+
+# NumPy viene importato dalle funzioni che lo usano: il modulo (Candidate, quote,
+# errori) è importato dai router all'avvio, i calcoli arrivano solo con le richieste
+ROLES = ("GK", "DEF", "MID", "FWD")
+
+# Rosa classica da 25 giocatori
+DEFAULT_QUOTAS = {"GK": 3, "DEF": 8, "MID": 8, "FWD": 6}
+DEFAULT_BUDGET = 500
+# Budget massimo: le tabelle della programmazione dinamica crescono con budget²
+MAX_BUDGET = 2000
+
+# Moduli ammessi nel fantacalcio classic: (DEF, MID, FWD), più il portiere
+MODULES = {
+    "3-4-3": (3, 4, 3),
+    "3-5-2": (3, 5, 2),
+    "4-3-3": (4, 3, 3),
+    "4-4-2": (4, 4, 2),
+    "4-5-1": (4, 5, 1),
+    "5-3-2": (5, 3, 2),
+    "5-4-1": (5, 4, 1),
+}
+
+# Nodi massimi del branch-and-bound sul limite per squadra: oltre si restituisce la
+# migliore rosa riparata (optimal = False)
+MAX_NODES = 200
+# Tabelle dei ruoli tenute in cache durante il branch-and-bound
+CACHE_SIZE = 64
+
+NEG = -math.inf
+
+
+class OptimizerError(ValueError):
+    """Vincoli impossibili da soddisfare (budget, quote, giocatori bloccati...)"""
+
+
+class Candidate:
+    __slots__ = ("id", "name", "team", "role", "price", "score", "cost")
+
+    def __init__(self, id, name, team, role, price, score):
+        self.id = id
+        self.name = name
+        self.team = team
+        self.role = role
+        self.price = float(price or 0.0)
+        self.score = float(score or 0.0)
+        self.cost = int(math.ceil(self.price))  # crediti interi per la programmazione dinamica
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "team": self.team, "role": self.role,
+                "price": self.price, "score": self.score}
+
+
+def _role_table(candidates, k, budget):
+    """
+    Zaino a cardinalità fissa per un ruolo:
+    value[j, b] = punteggio massimo scegliendo esattamente j giocatori con costo <= b.
+    take[i, j, b] dice se il giocatore i è stato preso per arrivare a (j, b).
+    """
+    import numpy as np
+    n = len(candidates)
+    value = np.full((k + 1, budget + 1), NEG)
+    value[0, :] = 0.0
+    take = np.zeros((n, k + 1, budget + 1), dtype=bool)
+    with_i = np.full((k + 1, budget + 1), NEG)
+    for i, c in enumerate(candidates):
+        if c.cost > budget or k == 0:
+            continue
+        # prendendo il giocatore i si passa da (j-1, b-cost) a (j, b), per tutti i j insieme
+        with_i[1:, c.cost:] = value[:-1, :budget + 1 - c.cost] + c.score
+        with_i[1:, :c.cost] = NEG
+        better = with_i > value
+        np.maximum(value, with_i, out=value)
+        take[i] = better
+    return value[k], take
+
+def _role_pick(candidates, take, k, spent):
+    """Ricostruisce i giocatori scelti in un ruolo con costo <= spent"""
+    chosen = []
+    j, b = k, spent
+    for i in range(len(candidates) - 1, -1, -1):
+        if j == 0:
+            break
+        if take[i, j, b]:
+            chosen.append(candidates[i])
+            b -= candidates[i].cost
+            j -= 1
+    return chosen
+
+
+def _combine(a, b):
+    """Combina due curve budget -> punteggio: out[x] = max_y a[y] + b[x - y]"""
+    import numpy as np
+    size = len(a)
+    x = np.arange(size)
+    split = x[:, None] - x[None, :]  # budget lasciato al secondo gruppo
+    valid = split >= 0
+    totals = np.where(valid, a[None, :] + b[np.clip(split, 0, None)], NEG)
+    arg = totals.argmax(axis=1)
+    return totals[x, arg], arg
+
+
+def _solve(pools, quotas, budget, cache=None):
+    """
+    Ottimo senza limite per squadra; restituisce (punteggio, giocatori) o None.
+    cache riusa le tabelle dei ruoli il cui insieme di candidati non è cambiato.
+    """
+    tables = {}
+    for role in ROLES:
+        k = quotas.get(role, 0)
+        if len(pools[role]) < k:
+            return None
+        key = (role, k, budget, tuple(c.id for c in pools[role]))
+        if cache is not None and key in cache:
+            tables[role] = cache[key]
+        else:
+            tables[role] = _role_table(pools[role], k, budget)
+            if cache is not None:
+                cache[key] = tables[role]
+
+    # combinazione dei ruoli sulla dimensione del budget
+    curve = tables[ROLES[0]][0]
+    splits = []
+    for role in ROLES[1:]:
+        curve, arg = _combine(curve, tables[role][0])
+        splits.append(arg)
+    if not math.isfinite(curve[budget]):
+        return None
+
+    # ricostruzione: a ritroso dall'ultimo ruolo
+    budgets = {}
+    remaining = budget
+    for role, arg in zip(reversed(ROLES[1:]), reversed(splits)):
+        left = int(arg[remaining])
+        budgets[role] = remaining - left
+        remaining = left
+    budgets[ROLES[0]] = remaining
+
+    chosen = []
+    for role in ROLES:
+        chosen += _role_pick(pools[role], tables[role][1], quotas.get(role, 0), budgets[role])
+    return float(curve[budget]), chosen
+
+
+def _prune(pool, k, max_per_team, squad_size):
+    """
+    Scarta i giocatori dominati (costo >= e punteggio <=) da abbastanza altri
+    giocatori dello stesso ruolo: esiste sempre una rosa ottima che non li usa.
+    Senza limite per squadra bastano k dominanti; con il limite servono dominanti
+    di almeno floor((squad_size - 1) / max_per_team) + k squadre diverse.
+    """
+    if max_per_team is None:
+        needed = k
+    else:
+        needed = (squad_size - 1) // max_per_team + k
+    ordered = sorted(pool, key=lambda c: (c.cost, -c.score, c.id))
+    kept = []
+    for i, c in enumerate(ordered):
+        dominators = 0
+        teams = set()
+        for d in ordered[:i]:
+            if d.score < c.score:
+                continue
+            if max_per_team is None:
+                dominators += 1
+                if dominators >= needed:
+                    break
+            else:
+                teams.add(d.team)
+                if len(teams) >= needed:
+                    break
+        else:
+            kept.append(c)
+    return kept
+
+
+def _repair(chosen, by_role, counts, max_per_team, budget):
+    """
+    Rende ammissibile una rosa che supera il limite per squadra con scambi nello stesso
+    ruolo: a ogni passo esce il giocatore della squadra in eccesso il cui miglior
+    sostituto (di una squadra con posti liberi, nel budget) fa perdere meno punti.
+    by_role: candidati per ruolo in ordine di punteggio decrescente. None se non riesce.
+    """
+    squad = list(chosen)
+    counts = counts + Counter(c.team for c in squad)
+    ids = {c.id for c in squad}
+    spent = sum(c.cost for c in squad)
+    while True:
+        team = next((t for t, n in counts.items() if n > max_per_team), None)
+        if team is None:
+            return squad
+        best = None
+        for out in (c for c in squad if c.team == team):
+            room = budget - spent + out.cost
+            for c in by_role[out.role]:
+                if c.id in ids or c.team == team or counts[c.team] >= max_per_team or c.cost > room:
+                    continue
+                if best is None or out.score - c.score < best[0]:
+                    best = (out.score - c.score, out, c)
+                break  # ordine decrescente: il primo valido è il migliore per out
+        if best is None:
+            return None
+        _, out, c = best
+        squad[squad.index(out)] = c
+        ids.discard(out.id)
+        ids.add(c.id)
+        counts[out.team] -= 1
+        counts[c.team] += 1
+        spent += c.cost - out.cost
+
+
+def _improve(squad, by_role, counts, max_per_team, budget):
+    """Ricerca locale: applica lo scambio nello stesso ruolo che guadagna di più finché esiste"""
+    squad = list(squad)
+    counts = counts + Counter(c.team for c in squad)
+    ids = {c.id for c in squad}
+    spent = sum(c.cost for c in squad)
+    for _ in range(4 * len(squad)):
+        best = None
+        for out in squad:
+            room = budget - spent + out.cost
+            for c in by_role[out.role]:
+                if c.score <= out.score:
+                    break
+                if c.id in ids or c.cost > room:
+                    continue
+                if max_per_team is not None and c.team != out.team and counts[c.team] >= max_per_team:
+                    continue
+                if best is None or c.score - out.score > best[0]:
+                    best = (c.score - out.score, out, c)
+                break
+        if best is None:
+            break
+        _, out, c = best
+        squad[squad.index(out)] = c
+        ids.discard(out.id)
+        ids.add(c.id)
+        counts[out.team] -= 1
+        counts[c.team] += 1
+        spent += c.cost - out.cost
+    return squad
+
+
+def _cheapest_squad(pool, quotas, counts, max_per_team):
+    """
+    Rosa di costo minimo che rispetta quote per ruolo e limite per squadra, come flusso
+    di costo minimo: sorgente -> squadra (posti liberi) -> giocatore (costo) -> ruolo
+    (quota) -> pozzo. Decide esattamente se i vincoli sono soddisfacibili;
+    restituisce (costo, giocatori) o None se le quote non si possono riempire.
+    """
+    teams = sorted({c.team for c in pool}, key=str)
+    source, sink = 0, 1
+    team_node = {t: 2 + i for i, t in enumerate(teams)}
+    role_node = {r: 2 + len(teams) + i for i, r in enumerate(ROLES)}
+    player_node = 2 + len(teams) + len(ROLES)
+    graph = [[] for _ in range(player_node + len(pool))]
+
+    def edge(u, v, cap, cost):
+        graph[u].append([v, cap, cost, len(graph[v])])
+        graph[v].append([u, 0, -cost, len(graph[u]) - 1])
+
+    for t in teams:
+        edge(source, team_node[t], max(max_per_team - counts[t], 0), 0)
+    for i, c in enumerate(pool):
+        edge(team_node[c.team], player_node + i, 1, c.cost)
+        edge(player_node + i, role_node[c.role], 1, 0)
+    for r in ROLES:
+        edge(role_node[r], sink, quotas.get(r, 0), 0)
+
+    # cammini minimi successivi (Bellman-Ford a coda: i costi residui possono essere negativi)
+    need, total = sum(quotas.get(r, 0) for r in ROLES), 0
+    for _ in range(need):
+        dist = [math.inf] * len(graph)
+        prev = [None] * len(graph)
+        dist[source] = 0
+        queue, queued = [source], {source}
+        while queue:
+            u = queue.pop(0)
+            queued.discard(u)
+            for k, (v, cap, cost, _) in enumerate(graph[u]):
+                if cap > 0 and dist[u] + cost < dist[v]:
+                    dist[v] = dist[u] + cost
+                    prev[v] = (u, k)
+                    if v not in queued:
+                        queue.append(v)
+                        queued.add(v)
+        if prev[sink] is None:
+            return None
+        v = sink
+        while v != source:
+            u, k = prev[v]
+            graph[u][k][1] -= 1
+            graph[v][graph[u][k][3]][1] += 1
+            v = u
+        total += dist[sink]
+    chosen = [c for i, c in enumerate(pool)
+              if any(e[0] == role_node[c.role] and e[1] == 0 for e in graph[player_node + i])]
+    return total, chosen
+
+
+def optimize_squad(candidates, budget=DEFAULT_BUDGET, quotas=None, locked=(), excluded=(),
+                   max_per_team=None):
+    """
+    Rosa che massimizza il punteggio previsto rispettando budget, quote per ruolo,
+    giocatori bloccati/esclusi e numero massimo di giocatori per squadra.
+    Programmazione dinamica per ruolo + branch-and-bound sul limite per squadra.
+    """
+    if not 0 < budget <= MAX_BUDGET:
+        raise OptimizerError(f"Budget non valido: deve essere positivo e al massimo {MAX_BUDGET}")
+    quotas = dict(DEFAULT_QUOTAS if quotas is None else quotas)
+    locked, excluded = set(locked), set(excluded)
+    if locked & excluded:
+        raise OptimizerError("Un giocatore non può essere sia bloccato che escluso")
+
+    by_id = {c.id: c for c in candidates}
+    missing = locked - by_id.keys()
+    if missing:
+        raise OptimizerError(f"Giocatori bloccati sconosciuti: {sorted(missing)}")
+
+    fixed = [by_id[i] for i in locked]
+    fixed_teams = Counter(c.team for c in fixed)
+    for role in ROLES:
+        quotas[role] = quotas.get(role, 0) - sum(1 for c in fixed if c.role == role)
+        if quotas[role] < 0:
+            raise OptimizerError(f"Troppi giocatori bloccati nel ruolo {role}")
+    if max_per_team is not None and any(n > max_per_team for n in fixed_teams.values()):
+        raise OptimizerError("I giocatori bloccati superano il limite per squadra")
+    free_budget = int(math.floor(budget)) - sum(c.cost for c in fixed)
+    if free_budget < 0:
+        raise OptimizerError("I giocatori bloccati superano il budget")
+
+    squad_size = sum(quotas.values()) + len(fixed)
+    base_pool = []
+    for role in ROLES:
+        pool = [c for c in candidates if c.role == role and c.id not in locked and c.id not in excluded]
+        base_pool += _prune(pool, quotas[role], max_per_team, squad_size)
+    if max_per_team is not None:
+        # ammissibilità esatta prima del branch-and-bound, che per dimostrarla dovrebbe
+        # esplorare tutti i nodi
+        cheapest = _cheapest_squad(base_pool, quotas, fixed_teams, max_per_team)
+        if cheapest is None or cheapest[0] > free_budget:
+            raise OptimizerError("Nessuna rosa possibile entro il limite per squadra")
+    cache = {}
+
+    def solve_node(banned, forced):
+        """Ottimo del nodo: giocatori banned esclusi, giocatori forced obbligatori"""
+        forced_players = [by_id[i] for i in forced]
+        node_quotas = dict(quotas)
+        for c in forced_players:
+            node_quotas[c.role] -= 1
+        node_budget = free_budget - sum(c.cost for c in forced_players)
+        if node_budget < 0 or any(n < 0 for n in node_quotas.values()):
+            return None
+        pools = {role: [] for role in ROLES}
+        for c in base_pool:
+            if c.id not in banned and c.id not in forced and c.role in pools:
+                pools[c.role].append(c)
+        if len(cache) > CACHE_SIZE:
+            cache.clear()
+        result = _solve(pools, node_quotas, node_budget, cache)
+        if result is None:
+            return None
+        return result[0] + sum(c.score for c in forced_players), forced_players + result[1]
+
+    def overflow(chosen):
+        counts = fixed_teams + Counter(c.team for c in chosen)
+        over = [t for t, n in counts.items() if n > max_per_team]
+        return over[0] if over else None
+
+    # Best-first: il valore senza limite per squadra è un limite superiore,
+    # quindi la prima soluzione ammissibile estratta è ottima
+    root = solve_node(frozenset(), ())
+    if root is None:
+        raise OptimizerError("Nessuna rosa possibile con questi vincoli")
+    by_role = {role: sorted((c for c in base_pool if c.role == role), key=lambda c: (-c.score, c.cost))
+               for role in ROLES}
+    heap = [(-root[0], 0, frozenset(), (), root[1])]
+    counter = 1
+    best_feasible = None
+    incumbent = None  # migliore rosa ammissibile ottenuta riparando i nodi: (punteggio, giocatori)
+    optimal = True
+    while heap:
+        bound, _, banned, forced, chosen = heapq.heappop(heap)
+        team = overflow(chosen) if max_per_team is not None else None
+        if team is None:
+            best_feasible = chosen
+            break
+        if incumbent is not None and incumbent[0] >= -bound - 1e-9:
+            # nessun nodo aperto può fare meglio della rosa riparata
+            best_feasible = incumbent[1]
+            break
+        repaired = _repair(chosen, by_role, fixed_teams, max_per_team, free_budget)
+        if repaired is not None:
+            score = sum(c.score for c in repaired)
+            if incumbent is None or score > incumbent[0]:
+                incumbent = (score, repaired)
+        if counter > MAX_NODES:
+            # limite di nodi: la migliore rosa riparata, non dimostrata ottima
+            optimal = False
+            start = incumbent[1] if incumbent is not None else cheapest[1]
+            best_feasible = _improve(start, by_role, fixed_teams, max_per_team, free_budget)
+            break
+        # In ogni rosa ammissibile manca almeno uno dei giocatori scelti di quella squadra:
+        # il figlio i esclude il giocatore i e obbliga i precedenti (partizione senza doppioni)
+        branchable = [c for c in chosen if c.team == team and c.id not in forced]
+        for i, c in enumerate(branchable):
+            child_forced = forced + tuple(b.id for b in branchable[:i])
+            result = solve_node(banned | {c.id}, child_forced)
+            if result is not None:
+                heapq.heappush(heap, (-result[0], counter, banned | {c.id}, child_forced, result[1]))
+                counter += 1
+
+    if best_feasible is None:
+        raise OptimizerError("Nessuna rosa possibile entro il limite per squadra")
+
+    squad = sorted(fixed + best_feasible, key=lambda c: (ROLES.index(c.role), -c.score))
+    return {
+        "players": [c.to_dict() for c in squad],
+        "total_price": sum(c.price for c in squad),
+        "total_score": round(sum(c.score for c in squad), 2),
+        "optimal": optimal,
+    }
+
+
+def best_lineup(candidates, module=None):
+    """
+    Migliore formazione titolare (1 portiere + modulo) tra i giocatori di una rosa.
+    Se module è None prova tutti i moduli e restituisce il migliore.
+    """
+    if module is not None and module not in MODULES:
+        raise OptimizerError(f"Modulo non valido: {module}")
+
+    by_role = {role: sorted((c for c in candidates if c.role == role), key=lambda c: -c.score)
+               for role in ROLES}
+    best = None
+    for name in ([module] if module else MODULES):
+        counts = dict(zip(ROLES, (1,) + MODULES[name]))
+        if any(len(by_role[role]) < n for role, n in counts.items()):
+            continue
+        starters = [c for role in ROLES for c in by_role[role][:counts[role]]]
+        total = sum(c.score for c in starters)
+        if best is None or total > best[1]:
+            best = (name, total, starters)
+
+    if best is None:
+        raise OptimizerError("La rosa non ha abbastanza giocatori per il modulo")
+    name, total, starters = best
+    starter_ids = {c.id for c in starters}
+    bench = sorted((c for c in candidates if c.id not in starter_ids),
+                   key=lambda c: (ROLES.index(c.role) if c.role in ROLES else len(ROLES), -c.score))
+    return {
+        "module": name,
+        "total_score": round(total, 2),
+        "starters": [c.to_dict() for c in starters],
+        "bench": [c.to_dict() for c in bench],
+    }
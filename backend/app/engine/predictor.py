@@ -0,0 +1,142 @@
+# app/engine/predictor.py
+import numpy as np
+
+# Colonne della matrice delle feature: (sezione del record unificato, chiave)
+FEATURES = (
+    ("stats", "pg"),
+    ("stats", "mv"),
+    ("stats", "mfv"),
+    ("stats", "gol"),
+    ("stats", "ass"),
+    ("stats", "gs"),
+    ("stats", "rp"),
+    ("stats", "amm"),
+    ("stats", "esp"),
+    ("fbref_data", "games"),
+    ("fbref_data", "minutes"),
+    ("fbref_data", "xg"),
+    ("fbref_data", "xg_assist"),
+    ("fbref_data", "cards_yellow"),
+    ("fbref_data", "cards_red"),
+)
+COL = {key: i for i, (_, key) in enumerate(FEATURES)}
+
+ROLES = ("GK", "DEF", "MID", "FWD")
+
+# Bonus/malus del regolamento classic
+BONUS_GOAL = 3.0
+BONUS_ASSIST = 1.0
+MALUS_YELLOW = 0.5
+MALUS_RED = 1.0
+MALUS_CONCEDED = 1.0  # solo portieri
+BONUS_PENALTY_SAVED = 3.0  # solo portieri
+
+# Voto medio atteso quando ci sono poche presenze (per ruolo) e peso del prior in presenze
+PRIOR_MEDIA_VOTO = {"GK": 6.0, "DEF": 6.0, "MID": 6.0, "FWD": 6.0}
+PRIOR_WEIGHT = 3.0
+
+# Partite "virtuali" a zero bonus aggiunte ai tassi per partita: un gol in una
+# sola presenza non vale +3 di fantamedia
+RATE_PRIOR_GAMES = 2.0
+# Gol subiti per partita attesi per un portiere senza presenze
+PRIOR_CONCEDED_PER_GAME = 1.3
+
+# Peso dei dati reali (gol/assist per partita) rispetto a quelli attesi (xG/xAG per partita)
+OBSERVED_WEIGHT = 0.5
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    return 0.0
+
+
+def build_feature_matrix(players):
+    """Matrice N x len(FEATURES) dai campi stats/fbref_data e vettore dei ruoli"""
+    X = np.zeros((len(players), len(FEATURES)), dtype=np.float64)
+    for i, p in enumerate(players):
+        sections = {"stats": p.get("stats") or {}, "fbref_data": p.get("fbref_data") or {}}
+        X[i] = [_number(sections[section].get(key)) for section, key in FEATURES]
+    roles = np.array([p.get("role") or "MID" for p in players])
+    return X, roles
+
+
+def _per_game(total, games):
+    return np.divide(total, games, out=np.zeros_like(total), where=games > 0)
+
+
+def _shrunk_rate(total, games):
+    return total / (games + RATE_PRIOR_GAMES)
+
+
+def _blend(observed, expected, has_observed, has_expected):
+    """Media pesata tra valore osservato e atteso, usando solo quelli disponibili"""
+    both = has_observed & has_expected
+    return np.where(
+        both, OBSERVED_WEIGHT * observed + (1 - OBSERVED_WEIGHT) * expected,
+        np.where(has_observed, observed, expected),
+    )
+
+
+def expected_rates(X, roles):
+    """
+    Parametri per partita giocata di tutti i giocatori, come array:
+    media voto ridotta verso il prior di ruolo se le presenze sono poche, e tassi
+    attesi di gol, assist, cartellini e (per i portieri) gol subiti e rigori parati,
+    ridotti verso il prior quando le partite giocate sono poche.
+    """
+    pg = X[:, COL["pg"]]
+    fb_games = X[:, COL["games"]]
+
+    prior = np.array([PRIOR_MEDIA_VOTO.get(r, 6.0) for r in roles])
+    mv = X[:, COL["mv"]]
+    media_voto = (pg * mv + PRIOR_WEIGHT * prior) / (pg + PRIOR_WEIGHT)
+
+    has_fanta = pg > 0
+    has_fbref = fb_games > 0
+    goals = _blend(_shrunk_rate(X[:, COL["gol"]], pg), _shrunk_rate(X[:, COL["xg"]], fb_games), has_fanta, has_fbref)
+    assists = _blend(_shrunk_rate(X[:, COL["ass"]], pg), _shrunk_rate(X[:, COL["xg_assist"]], fb_games), has_fanta, has_fbref)
+    yellows = _blend(_per_game(X[:, COL["amm"]], pg), _per_game(X[:, COL["cards_yellow"]], fb_games), has_fanta, has_fbref)
+    reds = _blend(_per_game(X[:, COL["esp"]], pg), _per_game(X[:, COL["cards_red"]], fb_games), has_fanta, has_fbref)
+
+    is_gk = roles == "GK"
+    conceded_rate = (X[:, COL["gs"]] + PRIOR_WEIGHT * PRIOR_CONCEDED_PER_GAME) / (pg + PRIOR_WEIGHT)
+    conceded = np.where(is_gk, conceded_rate, 0.0)
+    saved = np.where(is_gk, _per_game(X[:, COL["rp"]], pg), 0.0)
+
+    return {
+        "media_voto": media_voto,
+        "goals": goals,
+        "assists": assists,
+        "yellows": yellows,
+        "reds": reds,
+        "conceded": conceded,
+        "saved": saved,
+    }
+
+
+def predict(X, roles):
+    """
+    Previsione di fantamedia e media voto per tutti i giocatori in un solo passaggio.
+    Fantamedia: media voto + bonus/malus attesi per partita (gol, assist, cartellini,
+    e per i portieri gol subiti e rigori parati), vedi expected_rates.
+    """
+    r = expected_rates(X, roles)
+    fantamedia = (
+        r["media_voto"]
+        + BONUS_GOAL * r["goals"]
+        + BONUS_ASSIST * r["assists"]
+        - MALUS_YELLOW * r["yellows"]
+        - MALUS_RED * r["reds"]
+        - MALUS_CONCEDED * r["conceded"]
+        + BONUS_PENALTY_SAVED * r["saved"]
+    )
+    return np.round(fantamedia, 2), np.round(r["media_voto"], 2)
+
+
+def predict_players(players):
+    """Scorciatoia: lista di record unificati -> (fantamedia, media voto) come array"""
+    X, roles = build_feature_matrix(players)
+    return predict(X, roles)
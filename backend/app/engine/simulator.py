@@ -0,0 +1,316 @@
+# app/engine/simulator.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.engine.constants import DEFAULT_SIMULATIONS, MAX_SIMULATIONS
+from app.engine.predictor import (
+    BONUS_ASSIST,
+    BONUS_GOAL,
+    BONUS_PENALTY_SAVED,
+    COL,
+    MALUS_CONCEDED,
+    MALUS_RED,
+    MALUS_YELLOW,
+    _number,
+    build_feature_matrix,
+    expected_rates,
+)
+
+ROLES = ("GK", "DEF", "MID", "FWD")
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Deviazione standard del voto in pagella per ruolo (i portieri oscillano di più)
+VOTE_SD = {"GK": 0.75, "DEF": 0.55, "MID": 0.55, "FWD": 0.65}
+VOTE_MIN, VOTE_MAX = 3.0, 10.0
+
+# Probabilità di giocare: presenze sulle partite della squadra, ridotte verso il prior
+PLAY_PRIOR = 0.5
+PLAY_PRIOR_GAMES = 2.0
+PLAY_MIN, PLAY_MAX = 0.02, 0.97
+
+# Sostituzioni dalla panchina nel classic
+MAX_SUBSTITUTIONS = 3
+
+# Conversione punti -> gol: 66 punti per il primo gol, poi uno ogni 6
+GOAL_THRESHOLD = 66.0
+GOAL_STEP = 6.0
+
+# Simulazioni minime per processo prima di usare il pool
+MIN_SIMS_PER_WORKER = 2_000
+# Processi del pool condiviso da tutte le simulazioni del processo (API compresa):
+# 1 = nessun pool, si simula nel thread chiamante. Il pool nasce alla prima
+# simulazione che lo usa e resta fino all'uscita del processo
+SIMULATION_WORKERS = max(1, int(os.getenv("SIMULATION_WORKERS", "1")))
+# Celle giocatori x simulazioni campionate per blocco: le simulazioni sono generate a
+# blocchi e ne restano solo i totali delle formazioni, così la memoria di picco non
+# cresce con giocatori x simulazioni (circa 10 matrici float64 da CHUNK celle)
+SIMULATION_CHUNK_CELLS = max(1, int(os.getenv("SIMULATION_CHUNK_CELLS", "1000000")))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _shared_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=SIMULATION_WORKERS)
+        return _pool
+
+
+class SimulationError(ValueError):
+    """Formazione o parametri non simulabili"""
+
+
+class PlayerDistributions:
+    """
+    Parametri per giocatore (array allineati) da cui campionare il fantavoto:
+    probabilità di giocare, media del voto, tassi di bonus/malus per partita giocata.
+    """
+
+    __slots__ = ("ids", "roles", "play", "vote", "vote_sd", "goals", "assists",
+                 "yellows", "reds", "conceded", "saved")
+
+    def __init__(self, ids, roles, play, vote, goals, assists, yellows, reds, conceded, saved):
+        self.ids = list(ids)
+        self.roles = np.asarray(roles)
+        self.play = play
+        self.vote = vote
+        self.vote_sd = np.array([VOTE_SD.get(r, 0.6) for r in self.roles])
+        self.goals = goals
+        self.assists = assists
+        self.yellows = np.clip(yellows, 0.0, 1.0)
+        self.reds = np.clip(reds, 0.0, 1.0)
+        self.conceded = conceded
+        self.saved = np.clip(saved, 0.0, 1.0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def expected_bonus(self):
+        return (
+            BONUS_GOAL * self.goals
+            + BONUS_ASSIST * self.assists
+            - MALUS_YELLOW * self.yellows
+            - MALUS_RED * self.reds
+            - MALUS_CONCEDED * self.conceded
+            + BONUS_PENALTY_SAVED * self.saved
+        )
+
+
+def team_schedule(players):
+    """
+    Partite disputate da ogni squadra, stimate come la presenza massima tra i suoi
+    giocatori: (presenze Fantacalcio, presenze fbref)
+    """
+    schedule = {}
+    for p in players:
+        stats, fbref = p.get("stats") or {}, p.get("fbref_data") or {}
+        pg, games = schedule.get(p.get("team") or "", (0.0, 0.0))
+        schedule[p.get("team") or ""] = (max(pg, _number(stats.get("pg"))), max(games, _number(fbref.get("games"))))
+    return schedule
+
+
+def _play_probability(X, players, schedule):
+    """
+    Presenze del giocatore sulle partite disputate dalla sua squadra, con le fbref
+    "games" quando mancano i dati Fantacalcio, ridotte verso il prior
+    """
+    pg = X[:, COL["pg"]]
+    fb_games = X[:, COL["games"]]
+    team_pg, team_fb = np.array(
+        [schedule.get(p.get("team") or "", (0.0, 0.0)) for p in players], dtype=np.float64
+    ).reshape(-1, 2).T
+    played = np.where(pg > 0, pg, fb_games)
+    games = np.maximum(played, np.where(pg > 0, team_pg, team_fb))
+    share = (played + PLAY_PRIOR_GAMES * PLAY_PRIOR) / (games + PLAY_PRIOR_GAMES)
+    return np.clip(share, PLAY_MIN, PLAY_MAX)
+
+
+def build_distributions(players, ids=None, fantamedia=None, schedule=None):
+    """
+    Distribuzioni dai record unificati (sezioni stats e fbref_data).
+    schedule (vedi team_schedule) va calcolato su tutti i giocatori del campionato
+    quando players è solo una parte, altrimenti viene stimato da players stessi.
+    Se è data una fantamedia prevista (es. dalla tabella predictions) la media del
+    voto viene spostata in modo che voto + bonus attesi la riproducano.
+    """
+    X, roles = build_feature_matrix(players)
+    rates = expected_rates(X, roles)
+    dist = PlayerDistributions(
+        ids if ids is not None else range(len(players)),
+        roles,
+        _play_probability(X, players, schedule if schedule is not None else team_schedule(players)),
+        rates["media_voto"],
+        rates["goals"],
+        rates["assists"],
+        rates["yellows"],
+        rates["reds"],
+        rates["conceded"],
+        rates["saved"],
+    )
+    if fantamedia is not None:
+        fantamedia = np.asarray(fantamedia, dtype=np.float64)
+        known = ~np.isnan(fantamedia)
+        dist.vote = np.where(known, fantamedia - dist.expected_bonus(), dist.vote)
+    return dist
+
+
+def sample_fantavoti(dist, n_sims, rng):
+    """
+    Fantavoti simulati, matrice giocatori x simulazioni, e maschera di chi ha giocato.
+    Tutto campionato in blocco: voto normale arrotondato al mezzo punto, gol/assist/gol
+    subiti Poisson, cartellini e rigori parati Bernoulli.
+    """
+    shape = (len(dist), n_sims)
+    played = rng.random(shape) < dist.play[:, None]
+    vote = rng.normal(dist.vote[:, None], dist.vote_sd[:, None], shape)
+    vote = np.clip(np.round(vote * 2.0) / 2.0, VOTE_MIN, VOTE_MAX)
+    points = (
+        vote
+        + BONUS_GOAL * rng.poisson(np.broadcast_to(dist.goals[:, None], shape))
+        + BONUS_ASSIST * rng.poisson(np.broadcast_to(dist.assists[:, None], shape))
+        - MALUS_YELLOW * (rng.random(shape) < dist.yellows[:, None])
+        - MALUS_RED * (rng.random(shape) < dist.reds[:, None])
+        - MALUS_CONCEDED * rng.poisson(np.broadcast_to(dist.conceded[:, None], shape))
+        + BONUS_PENALTY_SAVED * (rng.random(shape) < dist.saved[:, None])
+    )
+    return np.where(played, points, 0.0), played
+
+
+class Lineup:
+    """Titolari e panchina (in ordine di ingresso) come posizioni in una PlayerDistributions"""
+
+    __slots__ = ("starters", "bench")
+
+    def __init__(self, starters, bench):
+        self.starters = np.asarray(starters, dtype=np.intp)
+        self.bench = np.asarray(bench, dtype=np.intp)
+
+
+def lineup_totals(points, played, roles, lineup):
+    """
+    Punteggio di squadra per simulazione con le sostituzioni del classic: ogni titolare
+    che non gioca è rimpiazzato dal primo panchinaro dello stesso ruolo che ha giocato,
+    al massimo MAX_SUBSTITUTIONS cambi seguendo l'ordine della panchina.
+    """
+    total = points[lineup.starters].sum(axis=0)
+    if not len(lineup.bench):
+        return total
+
+    bench_points = points[lineup.bench]
+    bench_played = played[lineup.bench]
+    bench_roles = roles[lineup.bench]
+    starter_roles = roles[lineup.starters]
+    enters = np.zeros_like(bench_played)
+    for role in ROLES:
+        on_bench = bench_roles == role
+        if not on_bench.any():
+            continue
+        missing = (~played[lineup.starters[starter_roles == role]]).sum(axis=0)
+        available = bench_played[on_bench]
+        rank = np.cumsum(available, axis=0)
+        enters[on_bench] = available & (rank <= missing)
+    enters &= np.cumsum(enters, axis=0) <= MAX_SUBSTITUTIONS
+    return total + (bench_points * enters).sum(axis=0)
+
+
+def to_goals(totals):
+    return np.where(totals < GOAL_THRESHOLD, 0, np.floor((totals - GOAL_THRESHOLD) / GOAL_STEP) + 1).astype(np.int64)
+
+
+def summarize(totals):
+    percentiles = np.percentile(totals, PERCENTILES)
+    return {
+        "expected_points": float(totals.mean()),
+        "variance": float(totals.var()),
+        "std": float(totals.std()),
+        "percentiles": {f"p{q}": float(v) for q, v in zip(PERCENTILES, percentiles)},
+        "expected_goals": float(to_goals(totals).mean()),
+    }
+
+
+def head_to_head(totals_a, totals_b):
+    goals_a, goals_b = to_goals(totals_a), to_goals(totals_b)
+    return {
+        "win": float((goals_a > goals_b).mean()),
+        "draw": float((goals_a == goals_b).mean()),
+        "loss": float((goals_a < goals_b).mean()),
+    }
+
+
+def _simulate_totals(dist, lineups, n_sims, seed):
+    """
+    Totali di tutte le formazioni (formazioni x simulazioni): ogni blocco di simulazioni
+    è campionato una volta per tutte le formazioni, a blocchi di SIMULATION_CHUNK_CELLS
+    """
+    rng = np.random.default_rng(seed)
+    totals = np.empty((len(lineups), n_sims))
+    step = max(1, SIMULATION_CHUNK_CELLS // max(1, len(dist)))
+    for start in range(0, n_sims, step):
+        stop = min(n_sims, start + step)
+        points, played = sample_fantavoti(dist, stop - start, rng)
+        for i, lineup in enumerate(lineups):
+            totals[i, start:stop] = lineup_totals(points, played, dist.roles, lineup)
+    return totals
+
+
+def simulate(dist, lineups, n_sims=DEFAULT_SIMULATIONS, seed=None, workers=1):
+    """
+    Simula n_sims giornate per tutte le formazioni (che condividono i giocatori di dist).
+    Con workers > 1 le simulazioni sono divise tra i processi del pool condiviso (al
+    massimo SIMULATION_WORKERS) con semi indipendenti.
+    """
+    if not 1 <= n_sims <= MAX_SIMULATIONS:
+        raise SimulationError(f"Numero di simulazioni fuori dai limiti (1-{MAX_SIMULATIONS})")
+    if not lineups:
+        raise SimulationError("Nessuna formazione da simulare")
+
+    workers = max(1, min(workers or 1, SIMULATION_WORKERS, n_sims // MIN_SIMS_PER_WORKER))
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    if workers == 1:
+        return _simulate_totals(dist, lineups, n_sims, seeds[0])
+
+    chunks = np.full(workers, n_sims // workers)
+    chunks[: n_sims % workers] += 1
+    parts = _shared_pool().map(_simulate_totals, [dist] * workers, [lineups] * workers, chunks.tolist(), seeds)
+    return np.concatenate(list(parts), axis=1)
+
+
+def simulate_squad(dist, lineup, n_sims=DEFAULT_SIMULATIONS, seed=None):
+    return summarize(simulate(dist, [lineup], n_sims, seed)[0])
+
+
+def simulate_match(dist, lineup_a, lineup_b, n_sims=DEFAULT_SIMULATIONS, seed=None):
+    """Scontro diretto: statistiche delle due squadre e probabilità di vittoria/pareggio/sconfitta di A"""
+    totals = simulate(dist, [lineup_a, lineup_b], n_sims, seed)
+    return {"home": summarize(totals[0]), "away": summarize(totals[1]), "outcome": head_to_head(totals[0], totals[1])}
+
+
+def simulate_league(dist, lineups, n_sims=DEFAULT_SIMULATIONS, seed=None, workers=None):
+    """
+    Tutte le squadre di una lega sulla stessa giornata simulata: per ognuna le statistiche
+    di punteggio, la probabilità di battere ciascuna avversaria e i punti in classifica
+    attesi (3 vittoria, 1 pareggio) in media contro il resto della lega.
+    """
+    if workers is None:
+        workers = SIMULATION_WORKERS
+    totals = simulate(dist, lineups, n_sims, seed, workers=workers)
+    goals = to_goals(totals)
+    n = len(lineups)
+    # Una riga alla volta: le matrici squadre x squadre x simulazioni non servono intere
+    wins = np.stack([(goals[i] > goals).mean(axis=1) for i in range(n)])
+    draws = np.stack([(goals[i] == goals).mean(axis=1) for i in range(n)])
+    table = []
+    for i in range(n):
+        others = [j for j in range(n) if j != i]
+        table.append({
+            **summarize(totals[i]),
+            "win_probability": {j: float(wins[i, j]) for j in others},
+            "expected_league_points": float(np.mean([3 * wins[i, j] + draws[i, j] for j in others])) if others else 0.0,
+        })
+    return table
@@ -0,0 +1,169 @@
+# app/monitoring/middleware.py
+# Middleware ASGI (puri: non bufferizzano le risposte in streaming) per le metriche
+# delle richieste e per la profilazione su richiesta.
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+
+from app.monitoring.metrics import registry
+from app.monitoring.sql import QueryStats, current_query_stats
+
+try:
+    from pyinstrument import Profiler
+except ImportError:  # pyinstrument è opzionale: senza si usa cProfile
+    Profiler = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Oltre questo numero di query in una richiesta viene scritto un warning (N+1)
+QUERY_WARNING_THRESHOLD = int(os.getenv("QUERY_WARNING_THRESHOLD", "50"))
+# Profilazione: disattivata per default, poi solo per le richieste con l'header X-Profile
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_HEADER = b"x-profile"
+
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Durata delle richieste HTTP", labels=("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = registry.gauge("http_requests_in_flight", "Richieste HTTP in corso")
+RESPONSE_BYTES = registry.histogram(
+    "http_response_size_bytes", "Dimensione del body delle risposte (dopo la compressione)",
+    labels=("method", "route"), buckets=SIZE_BUCKETS,
+)
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries", "Query SQL per richiesta", labels=("method", "route"), buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_SECONDS = registry.histogram(
+    "http_request_db_seconds", "Tempo speso nel database per richiesta", labels=("method", "route"),
+)
+
+
+def route_template(scope):
+    """
+    Percorso della route (es. /api/squads/{squad_id}), non quello richiesto: cardinalità
+    limitata. La route dei router inclusi può non contenere il prefisso (/api/squads),
+    che si ricava dal percorso richiesto togliendo la parte corrispondente alla route.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path_format", None) or getattr(route, "path", None)
+    if not template:
+        return "<unmatched>"
+    concrete = template
+    for name, value in (scope.get("path_params") or {}).items():
+        concrete = concrete.replace("{" + name + "}", str(value))
+    path = scope["path"]
+    if concrete != path and path.endswith(concrete):
+        return path[:-len(concrete)] + template
+    return template
+
+
+class MetricsMiddleware:
+    def __init__(self, app, exclude=("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            current_query_stats.reset(token)
+            method, route = scope["method"], route_template(scope)
+            REQUEST_SECONDS.observe(elapsed, method=method, route=route, status=status)
+            RESPONSE_BYTES.observe(size, method=method, route=route)
+            REQUEST_QUERIES.observe(stats.queries, method=method, route=route)
+            REQUEST_DB_SECONDS.observe(stats.seconds, method=method, route=route)
+            if stats.queries >= QUERY_WARNING_THRESHOLD:
+                logger.warning(
+                    f"🐢 {method} {route}: {stats.queries} query SQL ({stats.seconds * 1000:.1f} ms) in una richiesta"
+                )
+
+
+class ProfilingMiddleware:
+    """
+    Con PROFILING_ENABLED=1, una richiesta con header X-Profile viene eseguita sotto
+    profiler e la risposta è il report testuale al posto del body (status originale in
+    X-Profiled-Status). pyinstrument se installato (segue le coroutine), altrimenti
+    cProfile ordinato per X-Profile: cumulative (default) o tottime. Una richiesta
+    profilata alla volta: cProfile misura tutto il thread, anche le altre richieste.
+    """
+
+    def __init__(self, app, limit=60):
+        self.app = app
+        self.limit = limit
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope.get("headers") or ()) if scope["type"] == "http" else {}
+        if PROFILE_HEADER not in headers:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        async with self._lock:
+            if Profiler is not None:
+                profiler = Profiler(async_mode="enabled")
+                profiler.start()
+                try:
+                    await self.app(scope, receive, capture)
+                finally:
+                    profiler.stop()
+                report = profiler.output_text(unicode=True)
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    await self.app(scope, receive, capture)
+                finally:
+                    profiler.disable()
+                sort = headers[PROFILE_HEADER].decode("latin-1")
+                out = io.StringIO()
+                stats = pstats.Stats(profiler, stream=out)
+                stats.sort_stats(sort if sort in ("cumulative", "tottime", "calls") else "cumulative")
+                stats.print_stats(self.limit)
+                report = out.getvalue()
+
+        body = report.encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-profiled-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,42 @@
+# app/monitoring/prometheus.py
+# Esposizione del registro di metriche nel formato testuale di Prometheus (0.0.4).
+from app.monitoring.metrics import registry as default_registry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(registry=default_registry):
+    lines = []
+    for metric in sorted(registry.metrics(), key=lambda m: m.name):
+        description = metric.description.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {metric.name} {description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(metric.samples().items()):
+            if metric.kind != "histogram":
+                lines.append(f"{metric.name}{_labels(metric.labels, key)} {_number(value)}")
+                continue
+            cumulative, total = value
+            for bound, count in zip(metric.buckets + (float("inf"),), cumulative):
+                le = (("le", _number(bound)),)
+                lines.append(f"{metric.name}_bucket{_labels(metric.labels, key, le)} {count}")
+            lines.append(f"{metric.name}_sum{_labels(metric.labels, key)} {_number(total)}")
+            lines.append(f"{metric.name}_count{_labels(metric.labels, key)} {cumulative[-1]}")
+    return "\n".join(lines) + "\n"
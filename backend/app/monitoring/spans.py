@@ -0,0 +1,29 @@
+# app/monitoring/spans.py
+# Span di durata per le fasi dei processi batch (scraping -> merge -> caricamento):
+# ogni fase finisce nel log e nell'istogramma refresh_stage_seconds.
+import logging
+import time
+from contextlib import contextmanager
+
+from app.monitoring.metrics import registry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_SECONDS = registry.histogram(
+    "refresh_stage_seconds", "Durata delle fasi di aggiornamento dei giocatori",
+    labels=("stage",), buckets=STAGE_BUCKETS,
+)
+
+
+@contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.info(f"⏱️ {stage}: {elapsed:.3f}s")
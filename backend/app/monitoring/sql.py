@@ -0,0 +1,59 @@
+# app/monitoring/sql.py
+# Conteggio e durata delle query SQL tramite gli eventi di SQLAlchemy, in totale e per
+# richiesta HTTP: il middleware apre un QueryStats nel contesto della richiesta e ogni
+# query eseguita in quel contesto (event loop, db.run_sync o threadpool) lo aggiorna.
+# Molte query per una sola richiesta = probabile N+1.
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.monitoring.metrics import registry
+
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+DB_QUERIES = registry.counter("db_queries_total", "Query SQL eseguite")
+DB_QUERY_SECONDS = registry.histogram("db_query_seconds", "Durata delle singole query SQL", buckets=QUERY_BUCKETS)
+
+
+class QueryStats:
+    """Query eseguite e tempo speso nel database durante una richiesta"""
+
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+current_query_stats: ContextVar = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERIES.inc()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += elapsed
+
+
+def _handle_error(context):
+    # la query fallita non arriva ad after_cursor_execute
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine):
+    """Registra gli eventi sull'engine sincrono (per l'asincrono: async_engine.sync_engine)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -0,0 +1,128 @@
+# app/refresh/changeset.py
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from app.cache.player_snapshot import DATA_FILE
+from app.serialization import json_codec
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Ultimo changeset prodotto, per i consumatori in altri processi, con il numero di
+# generazione del dataset: cresce di uno a ogni aggiornamento che cambia i dati
+CHANGES_FILE = DATA_FILE.with_name("players_changes.json")
+
+_listeners = []
+
+
+def player_key(player):
+    return (player['name'], player['team'])
+
+
+def unique_players(players):
+    """Un solo record per chiave (name, team): vale il primo, come in diff_players"""
+    unique = {}
+    for p in players:
+        unique.setdefault(player_key(p), p)
+    return list(unique.values())
+
+
+def record_hash(player):
+    """Hash stabile del record unificato di un giocatore"""
+    raw = json_codec.dumps(player, sort_keys=True)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class Changeset:
+    """Differenze tra due snapshot dei giocatori, identificati da (name, team)"""
+
+    def __init__(self, added, changed, removed, unchanged):
+        self.added = added        # record nuovi
+        self.changed = changed    # record modificati (nuova versione)
+        self.removed = removed    # chiavi (name, team) non più presenti
+        self.unchanged = unchanged
+        self.generated_at = datetime.now(timezone.utc)
+        self.generation = None    # assegnata da publish()
+
+    @property
+    def upserts(self):
+        return self.added + self.changed
+
+    def is_empty(self):
+        return not (self.added or self.changed or self.removed)
+
+    def to_dict(self):
+        return {
+            "generation": self.generation,
+            "generated_at": self.generated_at.isoformat(),
+            "added": [list(player_key(p)) for p in self.added],
+            "changed": [list(player_key(p)) for p in self.changed],
+            "removed": [list(k) for k in self.removed],
+            "unchanged": self.unchanged,
+        }
+
+    def __repr__(self):
+        return (f"<Changeset +{len(self.added)} ~{len(self.changed)} "
+                f"-{len(self.removed)} ={self.unchanged}>")
+
+
+def diff_players(previous, current):
+    """Confronta lo snapshot precedente con quello nuovo tramite l'hash di ogni record"""
+    previous_hashes = {player_key(p): record_hash(p) for p in previous}
+    added, changed = [], []
+    seen = set()
+    for p in current:
+        key = player_key(p)
+        if key in seen:
+            continue
+        seen.add(key)
+        old_hash = previous_hashes.get(key)
+        if old_hash is None:
+            added.append(p)
+        elif old_hash != record_hash(p):
+            changed.append(p)
+    removed = [key for key in previous_hashes if key not in seen]
+    unchanged = len(seen) - len(added) - len(changed)
+    return Changeset(added, changed, removed, unchanged)
+
+
+def load_players(path=DATA_FILE):
+    """Snapshot salvato in precedenza, lista vuota se non esiste"""
+    try:
+        return json_codec.load_file(path)
+    except (FileNotFoundError, json_codec.JSONDecodeError):
+        return []
+
+
+def current_generation(path=CHANGES_FILE):
+    """Generazione del dataset pubblicata per ultima (0 se non ce n'è ancora una)"""
+    try:
+        return int(json_codec.load_file(path).get("generation") or 0)
+    except (FileNotFoundError, json_codec.JSONDecodeError):
+        return 0
+
+
+def subscribe(listener):
+    """
+    Registra una funzione chiamata con ogni changeset pubblicato (stesso processo).
+    Un changeset vuoto non apre una nuova generazione: chi tiene cache può usare
+    changeset.generation per invalidarle una volta sola per generazione.
+    """
+    _listeners.append(listener)
+    return listener
+
+
+def publish(changeset, path=CHANGES_FILE):
+    """
+    Salva il changeset su file (in modo atomico) e lo notifica ai consumatori registrati.
+    Va chiamata dopo che database e file dei giocatori sono stati sostituiti.
+    """
+    changeset.generation = current_generation(path) + (0 if changeset.is_empty() else 1)
+    json_codec.dump_file(changeset.to_dict(), path, indent=False)
+    for listener in list(_listeners):
+        try:
+            listener(changeset)
+        except Exception as e:
+            logger.error(f"Errore nel consumatore del changeset {listener!r}: {e}")
+    logger.info(f"📣 Changeset pubblicato (generazione {changeset.generation}): {changeset!r}")
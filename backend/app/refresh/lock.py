@@ -0,0 +1,39 @@
+# app/refresh/lock.py
+# Un solo aggiornamento dei dati alla volta, tra processi: lo script lanciato a mano, lo
+# scheduler di ogni worker dell'API e un eventuale sidecar prendono lo stesso lock su
+# file. Chi lo trova occupato rinuncia invece di aspettare (l'aggiornamento in corso
+# produrrà comunque i dati nuovi).
+import os
+from contextlib import contextmanager
+
+from app.cache.player_snapshot import DATA_FILE
+
+try:
+    import fcntl
+except ImportError:  # Windows: nessun lock tra processi, solo quello dello scheduler
+    fcntl = None
+
+LOCK_FILE = DATA_FILE.with_name("players_refresh.lock")
+# Codice di uscita dello script se un altro aggiornamento è già in corso (EX_TEMPFAIL)
+EXIT_IN_PROGRESS = 75
+
+
+class RefreshInProgress(RuntimeError):
+    """Un altro processo sta già aggiornando i dati"""
+
+
+@contextmanager
+def refresh_lock(path=LOCK_FILE):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise RefreshInProgress(f"Aggiornamento già in corso ({path})") from None
+        # pid di chi tiene il lock, solo informativo (il lock si libera con il processo)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        yield
+    finally:
+        os.close(fd)
@@ -0,0 +1,192 @@
+# app/refresh/scheduler.py
+# Aggiornamento periodico dei dati (scrape -> merge -> load) senza lanciarlo a mano:
+# nel lifespan dell'API con REFRESH_ENABLED=1, oppure come sidecar con
+#
+#   cd backend && python -m app.refresh.scheduler [--now]
+#
+# Ogni esecuzione è un processo separato (python -m app.scripts.update_and_save_players):
+# lo stack di scraping e il merge (CPU) restano fuori dall'API. Lo script prepara il
+# dataset a parte, carica il database in un'unica transazione e sostituisce il file con
+# os.replace; l'API vede la nuova generazione al cambio del file, una volta sola.
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.monitoring.metrics import registry
+from app.refresh.changeset import current_generation
+from app.refresh.lock import EXIT_IN_PROGRESS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).parent.parent.parent
+
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "0") == "1"
+# Orari settimanali (ora locale), "giorno HH:MM" separati da virgola, "*" = ogni giorno.
+# Default: la mattina dopo ogni giornata di Serie A (venerdì-lunedì), quando voti e
+# statistiche sono pubblicati.
+REFRESH_SCHEDULE = os.getenv("REFRESH_SCHEDULE", "sat 06:00, sun 06:00, mon 06:00, tue 06:00")
+# Un aggiornamento bloccato (es. un sito che non risponde) viene interrotto
+REFRESH_TIMEOUT = int(os.getenv("REFRESH_TIMEOUT", "1800"))
+REFRESH_COMMAND = (sys.executable, "-m", "app.scripts.update_and_save_players")
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+REFRESH_BUCKETS = (1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+REFRESH_RUNS = registry.counter("players_refresh_runs_total", "Aggiornamenti dei dati eseguiti", labels=("status",))
+REFRESH_SECONDS = registry.histogram(
+    "players_refresh_seconds", "Durata degli aggiornamenti dei dati", buckets=REFRESH_BUCKETS,
+)
+DATA_GENERATION = registry.gauge("players_data_generation", "Generazione del dataset dei giocatori pubblicata")
+
+
+class ScheduleError(ValueError):
+    """REFRESH_SCHEDULE non valido"""
+
+
+def parse_schedule(spec: str):
+    """Lista ordinata di (giorno della settimana o None per ogni giorno, ora, minuto)"""
+    slots = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            day, hhmm = item.split()
+            hour, minute = (int(x) for x in hhmm.split(":"))
+        except ValueError:
+            raise ScheduleError(f"Orario non valido: {item!r} (atteso 'giorno HH:MM')") from None
+        if day != "*" and day.lower() not in WEEKDAYS:
+            raise ScheduleError(f"Giorno non valido: {day!r} (uno tra {', '.join(WEEKDAYS)} o *)")
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ScheduleError(f"Ora non valida: {hhmm!r}")
+        slots.append((None if day == "*" else WEEKDAYS.index(day.lower()), hour, minute))
+    if not slots:
+        raise ScheduleError("Nessun orario in REFRESH_SCHEDULE")
+    return sorted(slots, key=lambda s: (-1 if s[0] is None else s[0], s[1], s[2]))
+
+
+def next_run(slots, now: datetime):
+    """Primo orario della programmazione strettamente successivo a now"""
+    candidates = []
+    for weekday, hour, minute in slots:
+        at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        days = 0 if weekday is None else (weekday - now.weekday()) % 7
+        at += timedelta(days=days)
+        if at <= now:
+            at += timedelta(days=1 if weekday is None else 7)
+        candidates.append(at)
+    return min(candidates)
+
+
+class RefreshScheduler:
+    """
+    Task asyncio che lancia l'aggiornamento agli orari di REFRESH_SCHEDULE, uno alla
+    volta. Con più worker (o un sidecar) ognuno ha il suo scheduler: il lock su file
+    dello script fa partire un solo aggiornamento, gli altri terminano subito.
+    """
+
+    def __init__(self, schedule=REFRESH_SCHEDULE, command=REFRESH_COMMAND, timeout=REFRESH_TIMEOUT):
+        self.schedule = schedule
+        self.slots = parse_schedule(schedule)
+        self.command = tuple(command)
+        self.timeout = timeout
+        self.generation = current_generation()
+        self._lock = asyncio.Lock()
+        self._task = None
+        DATA_GENERATION.set(self.generation)
+
+    def start(self):
+        self._task = asyncio.create_task(self.run_forever(), name="players-refresh")
+        logger.info(f"🗓️ Aggiornamento dei dati programmato: {self.schedule}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_forever(self):
+        while True:
+            when = next_run(self.slots, datetime.now())
+            logger.info(f"🗓️ Prossimo aggiornamento dei dati: {when:%a %d/%m %H:%M}")
+            # sveglie brevi: un cambio d'ora o un sistema sospeso non spostano l'orario
+            while (delay := (when - datetime.now()).total_seconds()) > 0:
+                await asyncio.sleep(min(delay, 300))
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"❌ Aggiornamento dei dati fallito: {e}")
+
+    def _env(self):
+        # lo script va trovato anche se l'API è avviata da un'altra cartella
+        path = os.pathsep.join(filter(None, (str(BACKEND_DIR), os.environ.get("PYTHONPATH"))))
+        return {**os.environ, "PYTHONPATH": path}
+
+    async def run_once(self):
+        """
+        Esegue subito un aggiornamento (se non ne è già in corso uno in questo processo) e
+        restituisce lo stato: "ok", "in_progress", "timeout" o "error"
+        """
+        if self._lock.locked():
+            return "in_progress"
+        async with self._lock:
+            start = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(*self.command, env=self._env())
+            try:
+                code = await asyncio.wait_for(proc.wait(), self.timeout)
+            except asyncio.TimeoutError:
+                code = None
+            finally:
+                # timeout o cancellazione (arresto dell'API): il processo non resta orfano.
+                # Il database non cambia (transazione annullata), il file neppure
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+            elapsed = time.perf_counter() - start
+
+            if code == 0:
+                status = "ok"
+                REFRESH_SECONDS.observe(elapsed)
+            elif code == EXIT_IN_PROGRESS:
+                status = "in_progress"
+            else:
+                status = "timeout" if code is None else "error"
+            REFRESH_RUNS.inc(status=status)
+
+            generation = current_generation()
+            if generation != self.generation:
+                # lo snapshot dell'API si ricarica da solo al cambio del file (una volta)
+                logger.info(f"🔄 Dati aggiornati: generazione {self.generation} -> {generation}")
+                self.generation = generation
+                DATA_GENERATION.set(generation)
+            log = logger.info if status in ("ok", "in_progress") else logger.error
+            log(f"🗓️ Aggiornamento dei dati: {status} in {elapsed:.1f}s (codice {code})")
+            return status
+
+
+async def _run_sidecar(now):
+    scheduler = RefreshScheduler()
+    if now:
+        await scheduler.run_once()
+    await scheduler.run_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggiornamento periodico dei dati dei giocatori (sidecar)")
+    parser.add_argument("--now", action="store_true", help="Esegue subito un aggiornamento, poi segue la programmazione")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_run_sidecar(args.now))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
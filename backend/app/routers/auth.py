@@ -1,29 +1,41 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.schemas import UserCreate, UserOut, Token
 from app.crud import users
-from app.auth.auth import create_access_token, verify_password
-from app.db.database import SessionLocal
+from app.auth.auth import create_access_token
+from app.auth.hashing import RETRY_AFTER_SECONDS, HashQueueFull, password_hasher
+from app.db.database import get_async_db
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _too_many(e: HashQueueFull):
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
 
 @router.post("/register", response_model=UserOut)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    if users.get_user_by_email(db, user.email):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await db.run_sync(users.get_user_by_email, user.email):
         raise HTTPException(status_code=400, detail="Email già registrata")
-    return users.create_user(db, user)
+    # Argon2 è volutamente lento: l'hash si calcola nel pool dedicato, non nel
+    # threadpool delle richieste, e con la coda piena si risponde subito 429
+    try:
+        hashed = await password_hasher.hash(user.password)
+    except HashQueueFull as e:
+        raise _too_many(e)
+    return await db.run_sync(users.create_user, user, hashed)
 
 @router.post("/login", response_model=Token)
-def login(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = users.get_user_by_email(db, user.email)
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+async def login(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(users.get_user_by_email, user.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Email o password errati")
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(user.password, db_user.hashed_password)
+    except HashQueueFull as e:
+        raise _too_many(e)
+    if not valid:
         raise HTTPException(status_code=401, detail="Email o password errati")
+    if new_hash:
+        # parametri Argon2 cambiati: si salva l'hash ricalcolato con quelli nuovi
+        await db.run_sync(users.update_password_hash, db_user.id, new_hash)
     token = create_access_token({"user_id": db_user.id})
     return {"access_token": token, "token_type": "bearer"}
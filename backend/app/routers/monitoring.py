@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+from typing import Optional
+import os
+
+from app.monitoring.metrics import registry
+from app.monitoring.prometheus import CONTENT_TYPE, render
+
+router = APIRouter()
+
+# Se impostato, Prometheus deve inviare "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """
+    Metriche di processo in formato Prometheus: latenze, richieste in corso, dimensioni
+    delle risposte e query SQL per route, più quelle dei singoli moduli (auth, hashing...)
+    """
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Token non valido")
+    return Response(content=render(registry), media_type=CONTENT_TYPE)
@@ -1,59 +1,165 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import json
-from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from app.db.database import SessionLocal
+from app.db.database import get_async_db
+from app.cache.player_snapshot import player_snapshot
+from app.cache.http_response import cache_headers, choose_encoding, not_modified, query_etag, snapshot_response
+from app.cache.player_index import InvalidQuery
+from app.db.fbref_stats import UnknownStat
 from app.crud import players as crud_players
 from app.schemas.schemas import Player, PlayerCreate
-from app.auth.auth import verify_token
+from app.serialization import json_codec
+from app.serialization.export import FORMAT_PATTERN, export_response
+from app.auth.dependencies import CurrentUser, get_current_user
 
 router = APIRouter()
 
-# 🔹 Percorso corretto al file JSON
-DATA_FILE = Path(__file__).parent.parent.parent / "players_data.json"
-
 # -------------------- Public Endpoint -------------------- #
+def _split(value: Optional[str]):
+    return [v for v in (x.strip() for x in value.split(",")) if v] if value else None
+
+def _query_players(snapshot, params: dict):
+    return json_codec.dumps(snapshot.index.query(**params))
+
+async def _snapshot():
+    snapshot = player_snapshot.current()
+    if snapshot is None:
+        # il caricamento fa I/O e parsing: fuori dall'event loop
+        snapshot = await run_in_threadpool(player_snapshot.get)
+    return snapshot
+
 @router.get("/", tags=["Players"])
-async def get_all_players():
+async def get_all_players(
+    request: Request,
+    role: Optional[str] = Query(None, description="Ruoli separati da virgola, es. DEF,MID"),
+    team: Optional[str] = Query(None, description="Squadre separate da virgola"),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    sort: Optional[str] = Query(None, description="Campo di ordinamento (es. mfv, stats.mv, fbref_data.xg), '-' per decrescente"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Campi da restituire, es. name,team,role,mfv"),
+):
     """
-    Restituisce tutti i giocatori dal file JSON (pubblico)
+    Restituisce i giocatori dal file JSON (pubblico).
+    Senza parametri restituisce l'intero dataset, letto, serializzato e compresso
+    (br/gzip) una sola volta per versione. Con filtri/ordinamento/paginazione la query
+    gira sugli indici in memoria dello snapshot e restituisce solo i campi richiesti.
+    In entrambi i casi l'ETag deriva dalla versione del dataset: If-None-Match -> 304.
     """
+    params = {
+        "roles": _split(role),
+        "teams": _split(team),
+        "min_price": min_price,
+        "max_price": max_price,
+        "sort": sort,
+        "cursor": cursor,
+        "limit": limit,
+        "fields": _split(fields),
+    }
     try:
-        with open(DATA_FILE, encoding="utf-8") as f:
-            data = json.load(f)
-        return {"players": data}
+        snapshot = await _snapshot()
+        if any(v is not None for v in params.values()):
+            etag = query_etag(snapshot.version, params)
+            if not_modified(request, [etag]):
+                return Response(status_code=304, headers=cache_headers(etag))
+            body = await run_in_threadpool(_query_players, snapshot, params)
+            return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if not snapshot.is_encoded(encoding):
+            # la prima compressione di una versione (brotli al massimo livello) è lenta
+            await run_in_threadpool(snapshot.encoded, encoding)
+        return snapshot_response(request, snapshot)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File JSON non trovato")
-    except json.JSONDecodeError:
+    except json_codec.JSONDecodeError:
         raise HTTPException(status_code=500, detail="Errore nel parsing del JSON")
 
 
 # -------------------- Database / Auth Endpoints -------------------- #
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-def get_current_user(token: str):
-    user_data = verify_token(token)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Token non valido")
-    return user_data
-
 @router.get("/search", response_model=List[Player], tags=["Players"])
-def search_players(name: str, db: Session = Depends(get_db), token: str = Depends(get_current_user)):
+async def search_players(
+    name: str = Query(..., min_length=2),
+    mode: str = Query("auto", pattern="^(auto|prefix|substring|fuzzy)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Ricerca giocatori nel database tramite nome (protetto da token).
+    Ignora accenti e maiuscole; mode sceglie tra prefisso, sottostringa e fuzzy.
+    """
+    # dict con i campi di Player (stats e fantacalcio_data arbitrari): niente rivalidazione
+    # solo le query nella sessione (thread dell'event loop): indice e ricerca nel threadpool
+    fingerprint, rows = await db.run_sync(crud_players.search_index_source)
+    ids = await run_in_threadpool(crud_players.search_player_ids, fingerprint, rows, name, mode=mode, limit=limit)
+    return json_codec.JSONResponse(await db.run_sync(crud_players.players_by_ids, ids))
+
+@router.get("/export", tags=["Players"])
+async def export_players(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN),
+    role: Optional[str] = Query(None, description="Ruoli separati da virgola, es. DEF,MID"),
+    team: Optional[str] = Query(None, description="Squadre separate da virgola"),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    user: CurrentUser = Depends(get_current_user),
+):
     """
-    Ricerca giocatori nel database tramite nome (protetto da token)
+    Tutti i giocatori del database in NDJSON (un oggetto per riga) o CSV, in streaming
+    da un cursore lato server (protetto da token). In CSV stats e fantacalcio_data
+    sono celle JSON.
     """
-    return crud_players.search_players(db, name)
+    query = crud_players.player_export_query(_split(role), _split(team), min_price, max_price)
+    return export_response(query, format, "players")
 
 @router.post("/add", response_model=Player, tags=["Players"])
-def add_player(player: PlayerCreate, db: Session = Depends(get_db), token: str = Depends(get_current_user)):
+async def add_player(player: PlayerCreate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
     """
     Aggiunge un nuovo giocatore nel database (protetto da token)
     """
-    return crud_players.create_player(db, player)
+    return await db.run_sync(crud_players.create_player, player)
+
+@router.get("/leaderboard", tags=["Players"])
+async def fbref_leaderboard(
+    stat: str,
+    limit: int = Query(20, ge=1, le=200),
+    role: Optional[str] = None,
+    min_minutes: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Classifica dei giocatori per una statistica FBref, es. xg (protetto da token)
+    """
+    try:
+        return {"stat": stat, "players": await db.run_sync(crud_players.fbref_leaderboard, stat, limit, role, min_minutes)}
+    except UnknownStat as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/compare", tags=["Players"])
+async def compare_players(
+    ids: str = Query(..., description="Id dei giocatori separati da virgola"),
+    stats: Optional[str] = Query(None, description="Statistiche FBref separate da virgola"),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Confronta le statistiche FBref di più giocatori (protetto da token)
+    """
+    values = _split(ids)
+    if not values:
+        raise HTTPException(status_code=400, detail="Nessun id indicato")
+    try:
+        player_ids = [int(i) for i in values]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Id non validi")
+    try:
+        return {"players": await db.run_sync(crud_players.compare_players, player_ids, _split(stats))}
+    except UnknownStat as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,26 +1,85 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import time
+from app.db.database import get_async_db
 from app.crud import players
-from app.schemas.schemas import Prediction, PredictionCreate
-from app.auth.auth import verify_token
+from app.cache.player_snapshot import player_snapshot
+from app.schemas.schemas import Prediction, PredictionCreate, PlayerPrediction, PredictionRun
+from app.auth.dependencies import CurrentUser, get_current_user
+from app.serialization.json_codec import JSONResponse
+from app.serialization.export import FORMAT_PATTERN, export_response
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+@router.post("/add", response_model=Prediction)
+async def add_prediction(pred: PredictionCreate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await db.run_sync(players.create_prediction, pred)
+
+def _prediction_rows(matchday: int, ids: dict):
+    """Previsioni di tutti i giocatori noti al database, calcolate in blocco dallo snapshot"""
+    from app.engine.predictor import predict_players  # NumPy al primo calcolo, non all'avvio
+    records = player_snapshot.get().players
+    known = [p for p in records if (p['name'], p['team']) in ids]
+    fantamedia, media_voto = predict_players(known)
+    return [
+        {
+            "player_id": ids[(p['name'], p['team'])],
+            "matchday": matchday,
+            "predicted_fantamedia": float(fm),
+            "predicted_media_voto": float(mv),
+        }
+        for p, fm, mv in zip(known, fantamedia, media_voto)
+    ]
+
+@router.post("/run/{matchday}", response_model=PredictionRun)
+async def run_predictions(matchday: int, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Calcola le previsioni di tutti i giocatori per una giornata e le salva in blocco.
+    Lettura dello snapshot e calcolo NumPy girano nel threadpool, fuori dall'event loop.
+    """
+    start = time.perf_counter()
+    ids = await db.run_sync(players.player_ids_by_key)
     try:
-        yield db
-    finally:
-        db.close()
+        rows = await run_in_threadpool(_prediction_rows, matchday, ids)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File JSON non trovato")
+    count = await db.run_sync(players.replace_predictions, matchday, rows)
+    return {"matchday": matchday, "predicted": count, "elapsed_ms": (time.perf_counter() - start) * 1000}
 
-def get_current_user(token: str):
-    user_data = verify_token(token)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Token non valido")
-    return user_data
+def _split(value: Optional[str]):
+    return [v for v in (x.strip() for x in value.split(",")) if v] if value else None
 
-@router.post("/add", response_model=Prediction)
-def add_prediction(pred: PredictionCreate, db: Session = Depends(get_db), token: str = Depends(get_current_user)):
-    return players.create_prediction(db, pred)
+@router.get("/export")
+async def export_predictions(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN),
+    from_matchday: Optional[int] = Query(None, ge=1),
+    to_matchday: Optional[int] = Query(None, ge=1),
+    role: Optional[str] = Query(None, description="Ruoli separati da virgola, es. DEF,MID"),
+    team: Optional[str] = Query(None, description="Squadre separate da virgola"),
+    player_ids: Optional[str] = Query(None, description="Id dei giocatori separati da virgola"),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Previsioni di tutte le giornate salvate (o dell'intervallo indicato) in NDJSON o CSV,
+    in streaming da un cursore lato server: la memoria resta costante anche con più
+    stagioni di previsioni accumulate
+    """
+    try:
+        ids = [int(i) for i in _split(player_ids)] if player_ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Id non validi")
+    query = players.prediction_export_query(from_matchday, to_matchday, _split(role), _split(team), ids)
+    return export_response(query, format, "predictions")
+
+@router.get("/{matchday}", response_model=List[PlayerPrediction])
+async def get_predictions(
+    matchday: int,
+    role: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    # righe già nella forma di PlayerPrediction: serializzate senza rivalidarle
+    return JSONResponse(await db.run_sync(players.get_predictions, matchday, role=role, limit=limit))
@@ -1,37 +1,269 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-from app.db.database import SessionLocal
+from typing import List, Optional
+import math
+import time
+from app.db.database import get_async_db
 from app.db.models import Squad, SquadPlayer, Player
-from app.schemas.schemas import PlayerCreate
-from app.auth.auth import verify_token
+from app.crud import players as crud_players
+from app.crud import squads as crud_squads
+from app.engine.constants import DEFAULT_SIMULATIONS
+from app.engine.optimizer import DEFAULT_QUOTAS, Candidate, OptimizerError, best_lineup, optimize_squad
+from app.schemas.schemas import PlayerCreate, Squad as SquadOut, SquadOptimizeRequest, SquadRosterUpdate, SimulationRequest
+from app.auth.dependencies import CurrentUser, get_current_user
+from app.serialization.json_codec import JSONResponse
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+# Gli endpoint sono asincroni. db.run_sync esegue le funzioni sul thread dell'event loop
+# (con la connessione asincrona): lì vanno solo le query. Tutto il calcolo (candidati,
+# ottimizzatore, formazione migliore, distribuzioni, simulazioni) gira nel threadpool
+# su dati già letti, senza la sessione.
+
+def _simulator():
+    """Simulatore (e NumPy) importato alla prima simulazione, non all'avvio dell'API"""
+    from app.engine import simulator
+    return simulator
+
+@router.get("/", response_model=List[SquadOut])
+async def list_squads(
+    all_users: bool = False,
+    include_players: bool = False,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    user: CurrentUser = Depends(get_current_user),
+):
+    """
+    Rose dell'utente (o di tutti gli utenti, per la classifica di lega) con gli aggregati
+    precalcolati; con include_players anche i giocatori, sempre in un numero fisso di query.
+    I dict costruiti da squad_to_dict hanno già la forma di SquadOut: la risposta non
+    viene rivalidata riga per riga (response_model resta per la documentazione).
+    """
+    def load(session: Session):
+        squads = crud_squads.list_squads(
+            session, user_id=None if all_users else user.user_id,
+            limit=limit, offset=offset, include_players=include_players,
+        )
+        return [crud_squads.squad_to_dict(s, include_players=include_players) for s in squads]
+    return JSONResponse(await db.run_sync(load))
+
+def _owns_squad(db: Session, squad_id: int, user_id: int):
+    return db.query(Squad.id).filter(Squad.id == squad_id, Squad.user_id == user_id).first() is not None
+
+def _all_players(db: Session, matchday: Optional[int] = None):
+    rows = db.query(Player.id, Player.name, Player.team, Player.role, Player.price).all()
+    return rows, crud_players.prediction_source(db, matchday)
+
+def _candidates(rows, scores_source):
+    scores = crud_players.scores_from_source(*scores_source)
+    return [
+        Candidate(pid, name, team, role, price, scores.get(pid, 0.0))
+        for pid, name, team, role, price in rows
+    ]
+
+def _optimize(rows, scores_source, request: SquadOptimizeRequest):
+    return optimize_squad(
+        _candidates(rows, scores_source),
+        budget=request.budget,
+        quotas=request.quotas,
+        locked=request.locked,
+        excluded=request.excluded,
+        max_per_team=request.max_per_team,
+    )
+
+@router.post("/optimize", response_model=dict)
+async def optimize(request: SquadOptimizeRequest, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Rosa che massimizza la fantamedia prevista entro budget, quote per ruolo,
+    giocatori bloccati/esclusi e limite di giocatori per squadra
+    """
+    start = time.perf_counter()
+    rows, scores_source = await db.run_sync(_all_players, request.matchday)
     try:
-        yield db
-    finally:
-        db.close()
+        result = await run_in_threadpool(_optimize, rows, scores_source, request)
+    except OptimizerError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    result["elapsed_ms"] = (time.perf_counter() - start) * 1000
+    return result
 
-def get_current_user(token: str):
-    user_data = verify_token(token)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Token non valido")
-    return user_data
+def _squad_players(db: Session, squad_id: int, user_id: int, matchday: Optional[int]):
+    squad = db.query(Squad).filter(Squad.id == squad_id, Squad.user_id == user_id).first()
+    if not squad:
+        raise HTTPException(status_code=404, detail="Squadra non trovata")
+    rows = (
+        db.query(Player.id, Player.name, Player.team, Player.role, Player.price)
+        .join(SquadPlayer, SquadPlayer.player_id == Player.id)
+        .filter(SquadPlayer.squad_id == squad_id)
+        .distinct()
+        .all()
+    )
+    return rows, crud_players.prediction_source(db, matchday)
 
-@router.post("/create", response_model=dict)
-def create_squad(name: str, db: Session = Depends(get_db), token: str = Depends(get_current_user)):
-    squad = Squad(name=name, user_id=token.user_id)
+def _best_xi(rows, scores_source, module: Optional[str]):
+    try:
+        return best_lineup(_candidates(rows, scores_source), module)
+    except OptimizerError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/{squad_id}/best-xi", response_model=dict)
+async def best_xi(squad_id: int, module: Optional[str] = None, matchday: Optional[int] = None,
+                  db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Migliore formazione titolare della rosa per il modulo indicato (o il migliore tra tutti)
+    """
+    rows, scores_source = await db.run_sync(_squad_players, squad_id, user.user_id, matchday)
+    return await run_in_threadpool(_best_xi, rows, scores_source, module)
+
+def _simulation_source(db: Session, squad_ids: List[int], matchday: Optional[int], user_id: int):
+    """
+    Letture per _simulation_setup: giocatori delle rose indicate e previsioni. Come
+    GET /squads/{id}, le rose di altri utenti risultano non trovate
+    """
+    found = {sid for (sid,) in db.query(Squad.id).filter(Squad.id.in_(squad_ids), Squad.user_id == user_id)}
+    missing = [sid for sid in squad_ids if sid not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Squadre non trovate: {missing}")
+    members = db.query(SquadPlayer.squad_id, SquadPlayer.player_id).filter(SquadPlayer.squad_id.in_(squad_ids)).all()
+    return members, crud_players.simulation_source(db, {pid for _, pid in members}, matchday)
+
+def _simulation_setup(members, source, squad_ids: List[int], module: Optional[str]):
+    """
+    Distribuzioni di tutti i giocatori delle rose indicate (campionati una volta sola
+    anche se condivisi) e formazione migliore di ogni rosa, titolari e panchina
+    """
+    rows, records, scores, schedule = crud_players.simulation_players_from(*source)
+    simulator = _simulator()
+    dist = simulator.build_distributions(records, ids=[row[0] for row in rows], fantamedia=scores, schedule=schedule)
+    position = {pid: i for i, pid in enumerate(dist.ids)}
+    candidates = {
+        pid: Candidate(pid, name, team, role, price, 0.0 if math.isnan(score) else dist.play[position[pid]] * score)
+        for (pid, name, team, role, price), score in zip(rows, scores)
+    }
+
+    lineups, formations = [], []
+    for sid in squad_ids:
+        roster = [candidates[pid] for squad_id, pid in dict.fromkeys(members) if squad_id == sid and pid in candidates]
+        try:
+            formation = best_lineup(roster, module)
+        except OptimizerError as e:
+            raise HTTPException(status_code=422, detail=f"Squadra {sid}: {e}")
+        lineups.append(simulator.Lineup(
+            [position[p["id"]] for p in formation["starters"]],
+            [position[p["id"]] for p in formation["bench"]],
+        ))
+        formations.append({"squad_id": sid, "module": formation["module"]})
+    return dist, lineups, formations
+
+async def _simulation(db: AsyncSession, squad_ids: List[int], matchday: Optional[int], module: Optional[str], user_id: int):
+    members, source = await db.run_sync(_simulation_source, squad_ids, matchday, user_id)
+    return await run_in_threadpool(_simulation_setup, members, source, squad_ids, module)
+
+@router.get("/{squad_id}/simulate", response_model=dict)
+async def simulate_squad(squad_id: int, simulations: int = DEFAULT_SIMULATIONS, module: Optional[str] = None,
+                         matchday: Optional[int] = None, seed: Optional[int] = None,
+                         db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Distribuzione Monte Carlo del punteggio della rosa in una giornata:
+    punti attesi, varianza, percentili e gol attesi
+    """
+    if not await db.run_sync(_owns_squad, squad_id, user.user_id):
+        raise HTTPException(status_code=404, detail="Squadra non trovata")
+    start = time.perf_counter()
+    dist, lineups, formations = await _simulation(db, [squad_id], matchday, module, user.user_id)
+    simulator = _simulator()
+    try:
+        result = await run_in_threadpool(simulator.simulate_squad, dist, lineups[0], simulations, seed)
+    except simulator.SimulationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {**formations[0], **result, "simulations": simulations, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+@router.post("/simulate/match", response_model=dict)
+async def simulate_match(request: SimulationRequest, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Scontro diretto tra due rose: statistiche di entrambe e probabilità di vittoria,
+    pareggio e sconfitta della prima con la conversione punti -> gol
+    """
+    if len(request.squad_ids) != 2 or request.squad_ids[0] == request.squad_ids[1]:
+        raise HTTPException(status_code=422, detail="Servono esattamente due squadre diverse")
+    start = time.perf_counter()
+    dist, lineups, formations = await _simulation(db, request.squad_ids, request.matchday, request.module, user.user_id)
+    simulator = _simulator()
+    try:
+        result = await run_in_threadpool(simulator.simulate_match, dist, lineups[0], lineups[1], request.simulations, request.seed)
+    except simulator.SimulationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    result["home"].update(formations[0])
+    result["away"].update(formations[1])
+    return {**result, "simulations": request.simulations, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+@router.post("/simulate/league", response_model=dict)
+async def simulate_league(request: SimulationRequest, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Giornata simulata per tutte le rose di una lega: punteggi, probabilità di battere
+    ogni avversaria e punti in classifica attesi
+    """
+    squad_ids = list(dict.fromkeys(request.squad_ids))
+    if len(squad_ids) < 2:
+        raise HTTPException(status_code=422, detail="Servono almeno due squadre")
+    start = time.perf_counter()
+    dist, lineups, formations = await _simulation(db, squad_ids, request.matchday, request.module, user.user_id)
+    simulator = _simulator()
+    try:
+        table = await run_in_threadpool(simulator.simulate_league, dist, lineups, request.simulations, request.seed)
+    except simulator.SimulationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    for row, formation in zip(table, formations):
+        row["win_probability"] = {squad_ids[j]: p for j, p in row["win_probability"].items()}
+        row.update(formation)
+    return {"squads": table, "simulations": request.simulations, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+def _get_squad(db: Session, squad_id: int, user_id: int):
+    squad = crud_squads.get_squad(db, squad_id, user_id=user_id)
+    if not squad:
+        raise HTTPException(status_code=404, detail="Squadra non trovata")
+    return crud_squads.squad_to_dict(squad)
+
+@router.get("/{squad_id}", response_model=SquadOut)
+async def get_squad(squad_id: int, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await db.run_sync(_get_squad, squad_id, user.user_id)
+
+def _replace_squad_players(db: Session, squad_id: int, user_id: int, roster: SquadRosterUpdate):
+    squad = db.query(Squad).filter(Squad.id == squad_id, Squad.user_id == user_id).first()
+    if not squad:
+        raise HTTPException(status_code=404, detail="Squadra non trovata")
+    try:
+        return crud_squads.replace_squad_players(
+            db, squad, roster.player_ids, budget=roster.budget, quotas=roster.quotas or DEFAULT_QUOTAS,
+        )
+    except crud_squads.RosterError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.put("/{squad_id}/players", response_model=dict)
+async def replace_squad_players(squad_id: int, roster: SquadRosterUpdate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    """
+    Imposta l'intera rosa in una sola chiamata, per id dei giocatori: quote per ruolo e
+    budget vengono validati e solo le differenze con la rosa attuale vengono scritte
+    """
+    return await db.run_sync(_replace_squad_players, squad_id, user.user_id, roster)
+
+def _create_squad(db: Session, name: str, user_id: int):
+    squad = Squad(name=name, user_id=user_id)
     db.add(squad)
+    db.flush()
+    crud_squads.refresh_squad_summaries(db, [squad.id])
     db.commit()
     db.refresh(squad)
     return {"id": squad.id, "name": squad.name}
 
-@router.post("/{squad_id}/add-player", response_model=dict)
-def add_player_to_squad(squad_id: int, player: PlayerCreate, db: Session = Depends(get_db), token: str = Depends(get_current_user)):
-    squad = db.query(Squad).filter(Squad.id == squad_id, Squad.user_id == token.user_id).first()
+@router.post("/create", response_model=dict)
+async def create_squad(name: str, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await db.run_sync(_create_squad, name, user.user_id)
+
+def _add_player_to_squad(db: Session, squad_id: int, user_id: int, player: PlayerCreate):
+    squad = db.query(Squad).filter(Squad.id == squad_id, Squad.user_id == user_id).first()
     if not squad:
         raise HTTPException(status_code=404, detail="Squadra non trovata")
     
@@ -42,7 +274,17 @@ def add_player_to_squad(squad_id: int, player: PlayerCreate, db: Session = Depen
         db.commit()
         db.refresh(db_player)
     
+    already = db.query(SquadPlayer.id).filter(SquadPlayer.squad_id == squad.id, SquadPlayer.player_id == db_player.id).first()
+    if already:
+        raise HTTPException(status_code=409, detail="Giocatore già presente nella rosa")
+
     squad_player = SquadPlayer(squad_id=squad.id, player_id=db_player.id)
     db.add(squad_player)
+    db.flush()
+    crud_squads.refresh_squad_summaries(db, [squad.id])
     db.commit()
     return {"squad_id": squad.id, "player_id": db_player.id}
+
+@router.post("/{squad_id}/add-player", response_model=dict)
+async def add_player_to_squad(squad_id: int, player: PlayerCreate, db: AsyncSession = Depends(get_async_db), user: CurrentUser = Depends(get_current_user)):
+    return await db.run_sync(_add_player_to_squad, squad_id, user.user_id, player)
@@ -1,5 +1,8 @@
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import BaseModel, EmailStr, Field, validator
 from typing import List, Optional, Dict
+from datetime import datetime
+from app.engine.constants import DEFAULT_SIMULATIONS, MAX_SIMULATION_SQUADS
+from app.engine.optimizer import MAX_BUDGET
 
 # ---------- Player ----------
 class PlayerBase(BaseModel):
@@ -30,6 +33,63 @@ class Prediction(PredictionCreate):
     class Config:
         from_attributes = True
 
+class PlayerPrediction(BaseModel):
+    player_id: int
+    name: str
+    team: Optional[str] = None
+    role: Optional[str] = None
+    matchday: int
+    predicted_fantamedia: float
+    predicted_media_voto: float
+
+class PredictionRun(BaseModel):
+    matchday: int
+    predicted: int
+    elapsed_ms: float
+
+# ---------- Squad ----------
+class SquadSummary(BaseModel):
+    players_count: int
+    total_price: float
+    roles: Dict[str, int]
+    predicted_fantamedia: float
+    matchday: Optional[int] = None  # giornata delle previsioni sommate
+
+class SquadPlayer(BaseModel):
+    id: int
+    name: str
+    team: Optional[str] = None
+    role: Optional[str] = None
+    price: Optional[float] = None
+
+class Squad(BaseModel):
+    id: int
+    name: Optional[str] = None
+    user_id: int
+    created_at: Optional[datetime] = None
+    summary: Optional[SquadSummary] = None
+    players: Optional[List[SquadPlayer]] = None
+
+class SquadOptimizeRequest(BaseModel):
+    budget: float = Field(500, gt=0, le=MAX_BUDGET)
+    quotas: Optional[Dict[str, int]] = None  # default 3 GK, 8 DEF, 8 MID, 6 FWD
+    locked: List[int] = []
+    excluded: List[int] = []
+    max_per_team: Optional[int] = None
+    matchday: Optional[int] = None  # previsioni da usare, default l'ultima giornata
+
+class SquadRosterUpdate(BaseModel):
+    player_ids: List[int]
+    budget: float = 500
+    quotas: Optional[Dict[str, int]] = None  # massimo per ruolo, default 3 GK, 8 DEF, 8 MID, 6 FWD
+
+class SimulationRequest(BaseModel):
+    squad_ids: List[int] = Field(..., max_length=MAX_SIMULATION_SQUADS)
+    simulations: int = DEFAULT_SIMULATIONS
+    matchday: Optional[int] = None
+    module: Optional[str] = None  # default il modulo migliore per ogni rosa
+    seed: Optional[int] = None
+
 # ---------- User ----------
 class UserCreate(BaseModel):
     email: EmailStr
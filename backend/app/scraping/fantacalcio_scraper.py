@@ -1,15 +1,25 @@
 # app/scraping/fantacalcio_scraper.py
-import requests
 from bs4 import BeautifulSoup
 import logging
-import json
+
+from app.scraping.http_client import ScraperHttpClient
+from app.serialization import json_codec
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # lxml è opzionale: senza si usa html.parser
+    lxml_html = None
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class FantacalcioScraper:
-    def __init__(self):
-        self.url = "https://www.fantacalcio.it/statistiche-serie-a"
+    def __init__(self, url=None, http=None, parser=None):
+        # url e http sono sostituibili, es. per puntare al server locale di benchmarks/scraper_standin.py
+        self.url = url or "https://www.fantacalcio.it/statistiche-serie-a"
+        self.http = http or ScraperHttpClient()
+        # "lxml" (veloce) o "html.parser" (BeautifulSoup); stesso risultato
+        self.parser = parser or ("lxml" if lxml_html is not None else "html.parser")
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -35,11 +45,65 @@ class FantacalcioScraper:
         except:
             return value
 
+    def fetch(self):
+        return self.http.fetch(self.url, headers=self.headers)
+
     def scrape_players(self):
         logger.info(f"🔎 Scraping da: {self.url}")
-        response = requests.get(self.url, headers=self.headers, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        return self.parse_players(self.fetch().text)
+
+    def parse_players(self, html):
+        if self.parser == "lxml":
+            players = self._parse_players_lxml(html)
+        else:
+            players = self._parse_players_bs4(html)
+        if players:
+            logger.info(f"✅ Estratti {len(players)} giocatori da Fantacalcio.it")
+        return players
+
+    def _role(self, value):
+        val = (value or "").lower()
+        if val == "p":
+            return "GK"
+        elif val == "d":
+            return "DEF"
+        elif val == "a":
+            return "FWD"
+        return "MID"  # default, anche per "c"
+
+    def _build_player(self, name, player_url, team, role, stats):
+        # FBref-style data (per unione futura)
+        fbref_data = {
+            "player": name,
+            "xg": stats.get("xg", 0),
+            "xg_assist": stats.get("xg_assist", 0),
+            "progressive_passes": stats.get("progressive_passes", 0),
+            "clean_sheets": stats.get("cs", 0),
+            "rigori_parati": stats.get("rp", 0)
+        }
+
+        return {
+            "name": name,
+            "team": team,
+            "role": role,
+            "url": player_url,
+            "stats": {
+                "pg": stats.get("pg", 0),
+                "mv": stats.get("mv", 0),
+                "mfv": stats.get("mfv", 0),
+                "gol": stats.get("gol", 0),
+                "ass": stats.get("ass", 0),
+                "gs": stats.get("gs", 0),
+                "rig": stats.get("rig", 0),
+                "rp": stats.get("rp", 0),
+                "amm": stats.get("amm", 0),
+                "esp": stats.get("esp", 0)
+            },
+            "fbref_data": fbref_data
+        }
+
+    def _parse_players_bs4(self, html):
+        soup = BeautifulSoup(html, "html.parser")
 
         rows = soup.select("table tbody tr")
         if not rows:
@@ -59,17 +123,7 @@ class FantacalcioScraper:
 
             # Ruolo classic
             role_tag = row.select_one("th.player-role-classic span.role")
-            role = "MID"  # default
-            if role_tag:
-                val = role_tag.get("data-value", "").lower()
-                if val == "p":
-                    role = "GK"
-                elif val == "d":
-                    role = "DEF"
-                elif val == "c":
-                    role = "MID"
-                elif val == "a":
-                    role = "FWD"
+            role = self._role(role_tag.get("data-value", "")) if role_tag else "MID"
 
             # Statistiche principali
             stats = {}
@@ -78,43 +132,51 @@ class FantacalcioScraper:
                 if data_key:
                     stats[data_key] = self._clean_value(td.get_text())
 
-            # FBref-style data (per unione futura)
-            fbref_data = {
-                "player": name,
-                "xg": stats.get("xg", 0),
-                "xg_assist": stats.get("xg_assist", 0),
-                "progressive_passes": stats.get("progressive_passes", 0),
-                "clean_sheets": stats.get("cs", 0),
-                "rigori_parati": stats.get("rp", 0)
-            }
-
-            players.append({
-                "name": name,
-                "team": team,
-                "role": role,
-                "url": player_url,
-                "stats": {
-                    "pg": stats.get("pg", 0),
-                    "mv": stats.get("mv", 0),
-                    "mfv": stats.get("mfv", 0),
-                    "gol": stats.get("gol", 0),
-                    "ass": stats.get("ass", 0),
-                    "gs": stats.get("gs", 0),
-                    "rig": stats.get("rig", 0),
-                    "rp": stats.get("rp", 0),
-                    "amm": stats.get("amm", 0),
-                    "esp": stats.get("esp", 0)
-                },
-                "fbref_data": fbref_data
-            })
-
-        logger.info(f"✅ Estratti {len(players)} giocatori da Fantacalcio.it")
+            players.append(self._build_player(name, player_url, team, role, stats))
+
+        return players
+
+    def _parse_players_lxml(self, html):
+        doc = lxml_html.fromstring(html)
+
+        rows = doc.xpath("//table//tbody//tr")
+        if not rows:
+            logger.warning("⚠️ Nessuna riga giocatore trovata")
+            return []
+
+        players = []
+        for row in rows:
+            name_tag = team_tag = role_tag = None
+            stats = {}
+            # Un solo passaggio sulle celle della riga
+            for cell in row.iterdescendants("th", "td"):
+                classes = (cell.get("class") or "").split()
+                if cell.tag == "th":
+                    if name_tag is None and "player-name" in classes:
+                        spans = cell.xpath(".//a//span")
+                        name_tag = spans[0] if spans else None
+                    if role_tag is None and "player-role-classic" in classes:
+                        spans = cell.xpath(".//span[contains(concat(' ', normalize-space(@class), ' '), ' role ')]")
+                        role_tag = spans[0] if spans else None
+                    continue
+                if team_tag is None and "player-team" in classes:
+                    team_tag = cell
+                data_key = cell.get("data-col-key")
+                if data_key:
+                    stats[data_key] = self._clean_value(cell.text_content())
+
+            name = "".join(t.strip() for t in name_tag.itertext()) if name_tag is not None else ""
+            player_url = name_tag.getparent().get("href") if name_tag is not None else None
+            team = "".join(t.strip() for t in team_tag.itertext()) if team_tag is not None else ""
+            role = self._role(role_tag.get("data-value", "")) if role_tag is not None else "MID"
+
+            players.append(self._build_player(name, player_url, team, role, stats))
+
         return players
 
     def save_to_json(self, players, filename="fantacalcio_players.json"):
         try:
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(players, f, ensure_ascii=False, indent=2)
+            json_codec.dump_file(players, filename)
             logger.info(f"✅ Dati salvati in {filename}")
         except Exception as e:
             logger.error(f"Errore salvataggio JSON: {e}")
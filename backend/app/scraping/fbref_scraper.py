@@ -1,15 +1,27 @@
-import requests
 from bs4 import BeautifulSoup, Comment
-import json
 import logging
 
+from app.scraping.http_client import ScraperHttpClient
+from app.serialization import json_codec
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # lxml è opzionale: senza si usa html.parser
+    lxml_html = None
+
+TABLE_MARKER = 'id="stats_standard"'
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class FBrefScraper:
-    def __init__(self):
+    def __init__(self, url=None, http=None, parser=None):
+        # url e http sono sostituibili, es. per puntare al server locale di benchmarks/scraper_standin.py
         self.base_url = "https://fbref.com"
-        self.url = "https://fbref.com/en/comps/11/stats/Serie-A-Stats"
+        self.url = url or "https://fbref.com/en/comps/11/stats/Serie-A-Stats"
+        self.http = http or ScraperHttpClient()
+        # "lxml" (veloce, analizza solo la tabella) o "html.parser" (BeautifulSoup); stesso risultato
+        self.parser = parser or ("lxml" if lxml_html is not None else "html.parser")
         self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -36,7 +48,7 @@ class FBrefScraper:
         # Se è dentro un commento HTML (FBref lo fa spesso)
         comments = soup.find_all(string=lambda text: isinstance(text, Comment))
         for comment in comments:
-            if 'id="stats_standard"' in comment:
+            if TABLE_MARKER in comment:
                 comment_soup = BeautifulSoup(comment, "html.parser")
                 table = comment_soup.find("table", id="stats_standard")
                 if table:
@@ -44,16 +56,40 @@ class FBrefScraper:
                     return table
         return None
 
+    def fetch(self):
+        return self.http.fetch(self.url, headers=self.headers)
+
     def scrape_players(self):
         logger.info(f"🔎 Scraping da: {self.url}")
-        response = requests.get(self.url, headers=self.headers, timeout=20)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
+        return self.parse_players(self.fetch().text)
+
+    def parse_players(self, html):
+        if self.parser == "lxml":
+            players = self._parse_players_lxml(html)
+        else:
+            players = self._parse_players_bs4(html)
+        if players is None:
+            logger.warning("⚠️ Nessuna tabella trovata (id='stats_standard')")
+            return []
+        logger.info(f"✅ Estratti {len(players)} giocatori da FBref")
+        return players
+
+    def _role(self, position):
+        # Ruolo dedotto
+        if "GK" in position:
+            return "GK"
+        elif "DF" in position:
+            return "DEF"
+        elif any(x in position for x in ["FW", "ST", "CF"]):
+            return "FWD"
+        return "MID"
+
+    def _parse_players_bs4(self, html):
+        soup = BeautifulSoup(html, "html.parser")
 
         table = self._get_table(soup)
         if not table:
-            logger.warning("⚠️ Nessuna tabella trovata (id='stats_standard')")
-            return []
+            return None
 
         headers = [th.get("data-stat") for th in table.select("thead tr th") if th.get("data-stat")]
         rows = table.select("tbody tr")
@@ -83,15 +119,6 @@ class FBrefScraper:
             pos_cell = row.find("td", {"data-stat": "position"})
             position = pos_cell.text.strip() if pos_cell else ""
 
-            # Ruolo dedotto
-            role = "MID"
-            if "GK" in position:
-                role = "GK"
-            elif "DF" in position:
-                role = "DEF"
-            elif any(x in position for x in ["FW", "ST", "CF"]):
-                role = "FWD"
-
             stats = {}
             for cell in row.find_all("td"):
                 stat_name = cell.get("data-stat")
@@ -102,18 +129,95 @@ class FBrefScraper:
             players.append({
                 "name": name,
                 "team": team,
-                "role": role,
+                "role": self._role(position),
+                "position": position,
+                "url": player_url,
+                "stats": stats
+            })
+
+        return players
+
+    def _table_fragment(self, html):
+        """
+        Estrae dal testo solo l'HTML della tabella stats_standard,
+        preferendo quella visibile a quella dentro un commento (come _get_table).
+        """
+        commented = None
+        pos = html.find(TABLE_MARKER)
+        while pos != -1:
+            start = html.rfind("<table", 0, pos)
+            end = html.find("</table>", pos)
+            if start != -1 and end != -1:
+                fragment = html[start:end + len("</table>")]
+                in_comment = html.rfind("<!--", 0, pos) > html.rfind("-->", 0, pos)
+                if not in_comment:
+                    return fragment
+                if commented is None:
+                    commented = fragment
+            pos = html.find(TABLE_MARKER, pos + 1)
+        if commented is not None:
+            logger.info("✅ Tabella trovata dentro un commento HTML")
+        return commented
+
+    def _parse_players_lxml(self, html):
+        fragment = self._table_fragment(html)
+        if fragment is not None:
+            table = lxml_html.fragment_fromstring(fragment)
+        else:
+            # id scritto in modo diverso: analisi dell'intera pagina
+            tables = lxml_html.fromstring(html).xpath("//table[@id='stats_standard']")
+            if not tables:
+                return None
+            table = tables[0]
+
+        headers = table.xpath(".//thead//tr//th[@data-stat]")
+        rows = table.xpath(".//tbody//tr")
+
+        logger.info(f"📊 Colonne trovate: {len(headers)}")
+        logger.info(f"🔢 Righe totali: {len(rows)}")
+
+        players = []
+        for row in rows:
+            if "thead" in (row.get("class") or "").split():
+                continue
+
+            # Un solo passaggio sulle celle della riga
+            cells = {}
+            stats = {}
+            for cell in row.iter("td"):
+                stat_name = cell.get("data-stat")
+                if not stat_name:
+                    continue
+                text = cell.text_content()
+                cells.setdefault(stat_name, (cell, text))
+                stats[stat_name] = self._clean_value(text)
+
+            if "player" not in cells:
+                continue
+            player_cell, player_text = cells["player"]
+            name = player_text.strip()
+            if not name:
+                continue
+
+            links = player_cell.xpath(".//a")
+            player_url = f"{self.base_url}{links[0].get('href')}" if links else None
+
+            team = cells["team"][1].strip() if "team" in cells else ""
+            position = cells["position"][1].strip() if "position" in cells else ""
+
+            players.append({
+                "name": name,
+                "team": team,
+                "role": self._role(position),
                 "position": position,
                 "url": player_url,
                 "stats": stats
             })
 
-        logger.info(f"✅ Estratti {len(players)} giocatori da FBref")
         return players
 
     def save_to_json(self, players, filename="fbref_players.json"):
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(players, f, ensure_ascii=False, indent=2)
+        json_codec.dump_file(players, filename)
         logger.info(f"✅ Dati salvati in {filename}")
 
 
@@ -0,0 +1,184 @@
+# app/scraping/http_client.py
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent.parent.parent / ".http_cache"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Intervallo minimo tra due richieste allo stesso host (secondi)
+DEFAULT_MIN_INTERVAL = 1.0
+HOST_MIN_INTERVALS = {
+    "fbref.com": 6.0,  # FBref blocca chi supera ~10 richieste al minuto
+}
+
+
+class FetchResult:
+    def __init__(self, url, status_code, text, not_modified=False, elapsed=0.0):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.not_modified = not_modified  # 304: pagina invariata, testo preso dalla cache
+        self.elapsed = elapsed
+
+
+class HostRateLimiter:
+    """Distanzia le richieste verso lo stesso host (thread-safe)"""
+
+    def __init__(self, intervals=None, default_interval=DEFAULT_MIN_INTERVAL):
+        self.intervals = dict(HOST_MIN_INTERVALS if intervals is None else intervals)
+        self.default_interval = default_interval
+        self._next_allowed = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        interval = self.intervals.get(host, self.default_interval)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class ConditionalCache:
+    """ETag / Last-Modified e ultimo corpo ricevuto per ogni URL, salvati su disco"""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = Path(directory)
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.directory / f"{key}.json", self.directory / f"{key}.html"
+
+    def load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, encoding="utf-8") as f:
+                return meta, f.read()
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+
+    def store(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(body_path, "w", encoding="utf-8") as f:
+            f.write(response.text)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f)
+
+
+class ScraperHttpClient:
+    """
+    Client HTTP condiviso dagli scraper:
+    sessioni con pool di connessioni per host, limite di frequenza per host,
+    retry con backoff esponenziale e jitter, richieste condizionali.
+    """
+
+    def __init__(self, timeout=20, max_retries=4, backoff_base=1.0, backoff_max=30.0,
+                 rate_limiter=None, cache=None, pool_size=4):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.cache = cache if cache is not None else ConditionalCache()
+        self.pool_size = pool_size
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, host):
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # full jitter: attesa casuale tra 0 e base * 2^tentativo
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def fetch(self, url, headers=None):
+        host = urlparse(url).hostname or ""
+        session = self._session(host)
+        request_headers = dict(headers or {})
+
+        meta, cached_body = self.cache.load(url) if self.cache else (None, None)
+        if meta and cached_body is not None:
+            if meta.get("etag"):
+                request_headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request_headers["If-Modified-Since"] = meta["last_modified"]
+
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.wait(host)
+            try:
+                response = session.get(url, headers=request_headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"⚠️ {url}: {e.__class__.__name__}, nuovo tentativo tra {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            if response.status_code == 304 and cached_body is not None:
+                logger.info(f"♻️ {url} invariata (304), uso la copia in cache")
+                return FetchResult(url, 304, cached_body, not_modified=True,
+                                   elapsed=time.perf_counter() - start)
+
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                delay = self._backoff(attempt, response)
+                logger.warning(f"⚠️ {url}: HTTP {response.status_code}, nuovo tentativo tra {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            response.raise_for_status()
+            if self.cache:
+                self.cache.store(url, response)
+            return FetchResult(url, response.status_code, response.text,
+                               elapsed=time.perf_counter() - start)
+
+    def fetch_many(self, requests_list):
+        """
+        Scarica più pagine in parallelo.
+        requests_list: lista di (url, headers); i risultati hanno lo stesso ordine.
+        """
+        if not requests_list:
+            return []
+        with ThreadPoolExecutor(max_workers=len(requests_list)) as executor:
+            futures = [executor.submit(self.fetch, url, headers) for url, headers in requests_list]
+            return [future.result() for future in futures]
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
@@ -1,24 +1,42 @@
 # app/scripts/update_and_save_players.py
 import logging
-import json
-import sqlite3
+import os
+import sys
+import time
 from app.scraping.fantacalcio_scraper import FantacalcioScraper
 from app.scraping.fbref_scraper import FBrefScraper
+from app.scraping.http_client import ScraperHttpClient
+from app.cache.player_snapshot import DATA_FILE
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, MetaData, Table, delete, select, text, tuple_
+from app.db import fbref_stats, migrations
+from app.db.database import Base, engine
+from app.crud.squads import refresh_squad_summaries, squads_with_players
+from app.db.models import Player, Prediction, SquadPlayer
+from app.db.upsert import upsert
+from app.monitoring.spans import span
+from app.refresh import changeset as changes
+from app.refresh.lock import EXIT_IN_PROGRESS, RefreshInProgress, refresh_lock
+from app.serialization import json_codec
 import unicodedata
 import re
-from rapidfuzz import fuzz
+from collections import defaultdict
+import numpy as np
+from rapidfuzz import fuzz, process
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-DB_PATH = "fantacalcio.db"
-JSON_FILE = "players_data.json"
+JSON_FILE = DATA_FILE
+# Nuovo dataset preparato a parte e sostituito a JSON_FILE solo a database aggiornato
+STAGED_FILE = JSON_FILE.with_name(JSON_FILE.name + ".staged")
 
 # --- Classe per unire i dati ---
 class UnifiedPlayerScraper:
-    def __init__(self):
-        self.fanta_scraper = FantacalcioScraper()
-        self.fbref_scraper = FBrefScraper()
+    def __init__(self, fanta_url=None, fbref_url=None, http=None):
+        # un solo client HTTP: sessioni, limiti per host e cache condizionale condivisi
+        self.http = http or ScraperHttpClient()
+        self.fanta_scraper = FantacalcioScraper(url=fanta_url, http=self.http)
+        self.fbref_scraper = FBrefScraper(url=fbref_url, http=self.http)
         self.team_mapping = {
             'Inter': ['Inter', 'Internazionale', 'Inter Milan', 'INT'],
             'Milan': ['Milan', 'AC Milan', 'MIL'],
@@ -65,35 +83,81 @@ class UnifiedPlayerScraper:
         return "MID"
 
     def merge_data(self, threshold=80):
-        # Scrape Fantacalcio
-        logger.info("🔎 Scraping Fantacalcio.it...")
-        fanta_players = self.fanta_scraper.scrape_players()
-        fanta_dict = {(self.normalize_name(p['name']), self.normalize_team(p['team'])): p for p in fanta_players}
-
-        # Scrape FBref
-        logger.info("🔎 Scraping FBref.com...")
-        fbref_players = self.fbref_scraper.scrape_players()
+        # Scarica Fantacalcio.it e FBref.com in parallelo: il tempo è quello della fonte più lenta
+        logger.info("🔎 Scraping Fantacalcio.it e FBref.com...")
+        with span("scrape"):
+            fanta_page, fbref_page = self.http.fetch_many([
+                (self.fanta_scraper.url, self.fanta_scraper.headers),
+                (self.fbref_scraper.url, self.fbref_scraper.headers),
+            ])
+        for page in (fanta_page, fbref_page):
+            state = "invariata" if page.not_modified else f"HTTP {page.status_code}"
+            logger.info(f"📥 {page.url}: {state} in {page.elapsed:.2f}s")
+
+        with span("parse"):
+            fanta_players = self.fanta_scraper.parse_players(fanta_page.text)
+            fbref_players = self.fbref_scraper.parse_players(fbref_page.text)
+
+        with span("merge"):
+            return self.merge_players(fanta_players, fbref_players, threshold)
+
+    def merge_players(self, fanta_players, fbref_players, threshold=80):
+        """
+        Unisce i giocatori delle due fonti squadra per squadra.
+        I nomi vengono normalizzati una sola volta, i punteggi di ogni squadra
+        calcolati in blocco con rapidfuzz.process.cdist e l'assegnazione è
+        uno-a-uno: una riga FBref non può essere presa da due giocatori Fantacalcio.
+        Le righe senza nome (intestazioni o separatori delle tabelle) vengono scartate e
+        il risultato ha un solo record per (name, team), la chiave del database.
+        """
+        fanta_players = [p for p in fanta_players if (p.get('name') or '').strip()]
+        fbref_players = [p for p in fbref_players if (p.get('name') or '').strip()]
+
+        # Blocchi per squadra: team -> [(nome normalizzato, giocatore)]
+        fanta_blocks = defaultdict(list)
+        for p in fanta_players:
+            fanta_blocks[self.normalize_team(p['team'])].append((self.normalize_name(p['name']), p))
+
         fbref_dict = {}
         for p in fbref_players:
             p['role'] = self.normalize_role(p.get('role', 'MID'))
             fbref_dict[(self.normalize_team(p['team']), p['name'])] = p
+        fbref_blocks = defaultdict(list)
+        for (fb_team, fb_name), fb in fbref_dict.items():
+            fbref_blocks[fb_team].append((self.normalize_name(fb_name), fb))
+
+        # Merge dati con fuzzy matching, una matrice di punteggi per squadra
+        matches = {}  # id(giocatore fantacalcio) -> giocatore fbref
+        matched_fbref = set()
+        for team, fanta_block in fanta_blocks.items():
+            fbref_block = fbref_blocks.get(team)
+            if not fbref_block:
+                continue
+            scores = process.cdist(
+                [name for name, _ in fanta_block],
+                [name for name, _ in fbref_block],
+                scorer=fuzz.ratio,
+                score_cutoff=threshold,
+            )
+            rows, cols = np.nonzero(scores >= threshold)
+            # punteggio decrescente, a parità l'ordine originale delle due liste
+            order = np.lexsort((cols, rows, -scores[rows, cols]))
+            taken_rows, taken_cols = set(), set()
+            for k in order:
+                r, c = int(rows[k]), int(cols[k])
+                if r in taken_rows or c in taken_cols:
+                    continue
+                taken_rows.add(r)
+                taken_cols.add(c)
+                fb = fbref_block[c][1]
+                matches[id(fanta_block[r][1])] = fb
+                matched_fbref.add(id(fb))
 
-        # Merge dati con fuzzy matching
         merged_players = []
-        for f_key, fanta in fanta_dict.items():
-            f_name, f_team = f_key
+        for fanta in fanta_players:
             merged = fanta.copy()
-            best_match = None
-            best_score = 0
-            for fb_key, fb in fbref_dict.items():
-                fb_team, fb_name = fb_key
-                if fb_team != f_team:
-                    continue
-                score = fuzz.ratio(f_name, self.normalize_name(fb_name))
-                if score > best_score:
-                    best_score = score
-                    best_match = fb
-            if best_score >= threshold:
+            best_match = matches.get(id(fanta))
+            if best_match is not None:
                 merged['fbref_data'] = best_match['stats']
                 if merged['role'] == 'MID' and best_match['role'] != 'MID':
                     merged['role'] = best_match['role']
@@ -102,119 +166,265 @@ class UnifiedPlayerScraper:
             merged_players.append(merged)
 
         # Aggiungi giocatori presenti solo su FBref
-        for fb_key, fb in fbref_dict.items():
-            fb_team, fb_name = fb_key
-            found = False
-            for mp in merged_players:
-                if self.normalize_name(mp['name']) == self.normalize_name(fb_name) and self.normalize_team(mp['team']) == fb_team:
-                    found = True
-                    break
-            if not found:
+        for team, fbref_block in fbref_blocks.items():
+            fanta_names = {name for name, _ in fanta_blocks.get(team, [])}
+            for fb_name, fb in fbref_block:
+                if id(fb) in matched_fbref or fb_name in fanta_names:
+                    continue
                 merged_players.append({
                     'name': fb['name'],
-                    'team': fb_team,
+                    'team': team,
                     'role': fb['role'],
                     'price': 0.0,
                     'fantacalcio_data': {},
                     'fbref_data': fb['stats']
                 })
 
+        merged_players = changes.unique_players(merged_players)
         logger.info(f"✅ Merged data for {len(merged_players)} players")
         return merged_players
 
-    def save_to_json(self, players):
-        with open(JSON_FILE, 'w', encoding='utf-8') as f:
-            json.dump(players, f, ensure_ascii=False, indent=2)
-        logger.info(f"✅ Dati salvati in {JSON_FILE}")
+    def save_to_json(self, players, path=JSON_FILE):
+        # scrittura atomica: l'API (che controlla il file a ogni richiesta) ricarica lo
+        # snapshot una volta sola, quando il file nuovo prende il posto del vecchio
+        json_codec.dump_file(players, path)
+        logger.info(f"✅ Dati salvati in {path}")
 
 
 # --- Funzioni DB ---
+# Le funzioni ricevono una Connection SQLAlchemy dall'engine condiviso e usano SQL Core:
+# lo stesso script carica SQLite e Postgres (upsert con ON CONFLICT per dialetto).
+# Impostazioni per il caricamento massivo su SQLite: WAL, busy_timeout e mmap arrivano
+# già dall'engine condiviso (app.db.database)
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+)
+
+# Statistiche Fantacalcio: tabella dello script, senza modello ORM
+fantacalcio_stats = Table(
+    "fantacalcio_stats", MetaData(),
+    Column("player_id", Integer, ForeignKey(Player.id)),
+    Column("matches_played", Integer),
+    Column("avg_grade", Float),
+    Column("avg_fanta_grade", Float),
+    Column("goals", Integer),
+    Column("assists", Integer),
+    Column("penalty_made", Float),
+    Column("penalty_attempted", Float),
+    Column("yellow_cards", Integer),
+    Column("red_cards", Integer),
+    Index("ux_fantacalcio_stats_player", "player_id", unique=True),
+)
+
+def _transaction(conn):
+    """Transazione di una scrittura: chiude prima quella implicita aperta dalle letture"""
+    if conn.in_transaction():
+        conn.commit()
+    return conn.begin()
+
+def apply_bulk_pragmas(conn):
+    if conn.dialect.name == "sqlite":
+        for pragma in BULK_LOAD_PRAGMAS:
+            conn.exec_driver_sql(pragma)
+
 def create_tables(conn):
-    cursor = conn.cursor()
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS players (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        team TEXT,
-        role TEXT,
-        price REAL,
-        UNIQUE(name, team)
-    )""")
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS fantacalcio_stats (
-        player_id INTEGER,
-        matches_played INTEGER,
-        avg_grade REAL,
-        avg_fanta_grade REAL,
-        goals INTEGER,
-        assists INTEGER,
-        penalty_made REAL,
-        penalty_attempted REAL,
-        yellow_cards INTEGER,
-        red_cards INTEGER,
-        FOREIGN KEY(player_id) REFERENCES players(id)
-    )""")
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS fbref_stats (
-        player_id INTEGER,
-        stat_name TEXT,
-        stat_value REAL,
-        FOREIGN KEY(player_id) REFERENCES players(id)
-    )""")
-    conn.commit()
+    """
+    Tabelle dei modelli (players con l'indice univoco su name/team, rose, previsioni) e
+    tabelle delle statistiche, in un'unica transazione
+    """
+    with _transaction(conn):
+        Base.metadata.create_all(bind=conn)
+        fantacalcio_stats.create(conn, checkfirst=True)
+        if conn.dialect.name == "sqlite":
+            # Vincoli univoci necessari per gli upsert su database creati da versioni
+            # precedenti (solo SQLite) che accumulavano righe duplicate
+            migrations.dedupe_players(conn.connection.cursor())
+            conn.execute(text("""
+                DELETE FROM fantacalcio_stats WHERE rowid NOT IN
+                (SELECT MAX(rowid) FROM fantacalcio_stats GROUP BY player_id)"""))
+        for table in (Player.__table__, fantacalcio_stats):
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+        # Statistiche FBref: tabella tipizzata, migrando i dati della vecchia tabella chiave/valore
+        fbref_stats.ensure_schema(conn)
+        fbref_stats.migrate_eav(conn)
     logger.info("✅ Tabelle create o già presenti")
 
+def _resolve_ids(conn, players, chunk_size=400):
+    """Id dei giocatori indicati, cercati per (name, team) a blocchi sull'indice univoco"""
+    keys = list({(p['name'], p['team']) for p in players})
+    ids = {}
+    for i in range(0, len(keys), chunk_size):
+        rows = conn.execute(
+            select(Player.id, Player.name, Player.team)
+            .where(tuple_(Player.name, Player.team).in_(keys[i:i + chunk_size])))
+        ids.update({(name, team): pid for pid, name, team in rows})
+    return ids
+
+def _refresh_squad_summaries(conn, player_ids, chunk_size=400):
+    """Prezzi e ruoli cambiati: ricalcola gli aggregati delle rose con quei giocatori"""
+    squad_ids = set()
+    for i in range(0, len(player_ids), chunk_size):
+        squad_ids.update(squads_with_players(conn, player_ids[i:i + chunk_size]))
+    refresh_squad_summaries(conn, sorted(squad_ids))
+
+def _write_players(conn, players):
+    """Upsert di giocatori e statistiche, senza commit (chiamato dentro una transazione)"""
+    # ON CONFLICT DO UPDATE non può toccare due volte la stessa riga (errore su Postgres)
+    players = changes.unique_players(players)
+    conn.execute(upsert(conn, Player.__table__, ["name", "team"], ["role", "price"]), [
+        {"name": p['name'], "team": p['team'], "role": p['role'], "price": p.get('price', 0.0)}
+        for p in players
+    ])
+
+    ids = _resolve_ids(conn, players)
+    player_ids = [ids[(p['name'], p['team'])] for p in players]
+
+    fanta_rows = []
+    for player_id, p in zip(player_ids, players):
+        # i giocatori Fantacalcio hanno le statistiche in 'stats'
+        f_stats = p.get('fantacalcio_data') or p.get('stats') or {}
+        fanta_rows.append({
+            "player_id": player_id,
+            "matches_played": f_stats.get('pg', 0),
+            "avg_grade": f_stats.get('mv', 0.0),
+            "avg_fanta_grade": f_stats.get('mfv', 0.0),
+            "goals": f_stats.get('gol', 0),
+            "assists": f_stats.get('ass', 0),
+            "penalty_made": f_stats.get('rig', 0),
+            "penalty_attempted": f_stats.get('rp', 0),
+            "yellow_cards": f_stats.get('amm', 0),
+            "red_cards": f_stats.get('esp', 0),
+        })
+    conn.execute(upsert(conn, fantacalcio_stats, ["player_id"]), fanta_rows)
+
+    fbref_stats.upsert_stats(conn, [
+        (player_id, p.get('fbref_data') or {}) for player_id, p in zip(player_ids, players)
+    ])
+    _refresh_squad_summaries(conn, player_ids)
+
+def _remove_players(conn, keys, chunk_size=400):
+    """
+    Elimina le statistiche dei giocatori non più presenti e il giocatore stesso,
+    a meno che non sia ancora usato in una rosa o in una previsione.
+    A blocchi, come _resolve_ids: le liste IN restano sotto il limite di parametri di SQLite.
+    """
+    ids = list(_resolve_ids(conn, [{'name': name, 'team': team} for name, team in keys]).values())
+    for i in range(0, len(ids), chunk_size):
+        chunk = ids[i:i + chunk_size]
+        conn.execute(delete(fantacalcio_stats).where(fantacalcio_stats.c.player_id.in_(chunk)))
+        fbref_stats.delete_stats(conn, chunk)
+
+        referenced = set()
+        for model in (SquadPlayer, Prediction):
+            referenced.update(conn.execute(select(model.player_id).where(model.player_id.in_(chunk)).distinct()).scalars())
+        removable = [pid for pid in chunk if pid not in referenced]
+        if removable:
+            conn.execute(delete(Player).where(Player.id.in_(removable)))
+
 def insert_data(conn, players):
-    cursor = conn.cursor()
-    for p in players:
-        cursor.execute("""
-            INSERT OR IGNORE INTO players(name, team, role, price)
-            VALUES (?, ?, ?, ?)""", (p['name'], p['team'], p['role'], p.get('price', 0.0)))
-        cursor.execute("SELECT id FROM players WHERE name = ? AND team = ?", (p['name'], p['team']))
-        player_id = cursor.fetchone()[0]
-
-        f_stats = p.get('fantacalcio_data', {})
-        cursor.execute("""
-            INSERT INTO fantacalcio_stats(
-                player_id, matches_played, avg_grade, avg_fanta_grade,
-                goals, assists, penalty_made, penalty_attempted,
-                yellow_cards, red_cards
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            player_id,
-            f_stats.get('pg', 0),
-            f_stats.get('mv', 0.0),
-            f_stats.get('mfv', 0.0),
-            f_stats.get('gol', 0),
-            f_stats.get('ass', 0),
-            f_stats.get('rig', 0),
-            f_stats.get('rp', 0),
-            f_stats.get('amm', 0),
-            f_stats.get('esp', 0)
-        ))
-
-        fb_stats = p.get('fbref_data', {})
-        for stat_name, stat_value in fb_stats.items():
-            cursor.execute("""
-                INSERT INTO fbref_stats(player_id, stat_name, stat_value)
-                VALUES (?, ?, ?)""", (player_id, stat_name, stat_value))
-    conn.commit()
-    logger.info(f"✅ Inseriti {len(players)} giocatori nel database")
+    """
+    Carica tutti i giocatori in un'unica transazione:
+    upsert dei giocatori, risoluzione degli id in blocco,
+    upsert delle statistiche Fantacalcio e della riga di statistiche FBref.
+    """
+    start = time.perf_counter()
+    with _transaction(conn):
+        _write_players(conn, players)
+    elapsed = time.perf_counter() - start
+    logger.info(f"✅ Inseriti {len(players)} giocatori nel database in {elapsed:.3f}s")
+
+def apply_changeset(conn, changeset):
+    """Scrive nel database solo i giocatori aggiunti/modificati/rimossi, in un'unica transazione"""
+    start = time.perf_counter()
+    with _transaction(conn):
+        if changeset.upserts:
+            _write_players(conn, changeset.upserts)
+        if changeset.removed:
+            _remove_players(conn, changeset.removed)
+    elapsed = time.perf_counter() - start
+    logger.info(f"✅ Database aggiornato ({changeset!r}) in {elapsed:.3f}s")
+
+def _missing_keys(conn, keys):
+    """
+    Chiavi (name, team) dello snapshot precedente assenti dal database. Il confronto per
+    chiave (non sul numero di righe) ignora i giocatori rimossi dallo snapshot ma
+    tenuti perché ancora in una rosa o in una previsione.
+    """
+    found = _resolve_ids(conn, [{'name': name, 'team': team} for name, team in keys])
+    return [key for key in keys if key not in found]
+
+def _full_changeset(conn, players):
+    """
+    Changeset per riallineare tutto il database al nuovo snapshot: tutti i giocatori come
+    upsert e come rimozioni quelli del database assenti dallo snapshot (chi è ancora
+    referenziato resta, vedi _remove_players)
+    """
+    players = changes.unique_players(players)
+    keys = {changes.player_key(p) for p in players}
+    removed = [(name, team) for name, team in conn.execute(select(Player.name, Player.team)) if (name, team) not in keys]
+    return changes.Changeset(players, [], removed, 0)
 
 
 # --- Main ---
-def main():
+def _update():
     scraper = UnifiedPlayerScraper()
     players = scraper.merge_data()
-    scraper.save_to_json(players)
 
-    conn = sqlite3.connect(DB_PATH)
-    create_tables(conn)
-    insert_data(conn, players)
-    conn.close()
+    # Confronto con lo snapshot precedente: si scrive solo ciò che è cambiato
+    with span("diff"):
+        previous = changes.load_players(JSON_FILE)
+        changeset = changes.diff_players(previous, players)
+    logger.info(f"🔍 Modifiche rispetto allo snapshot precedente: {changeset!r}")
+    # Il nuovo dataset viene preparato a parte: JSON_FILE resta quello vecchio finché il
+    # database non è aggiornato, poi la sostituzione (os.replace) è atomica
+    if not changeset.is_empty():
+        with span("save"):
+            scraper.save_to_json(players, STAGED_FILE)
+
+    # Connessione dal pool dell'engine condiviso: stesse pragma (WAL) delle API, così
+    # la scrittura in un'unica transazione non blocca le letture
+    with span("load"):
+        conn = engine.connect()
+        try:
+            apply_bulk_pragmas(conn)
+            create_tables(conn)
+            # Se il database non contiene tutto lo snapshot precedente (es. primo avvio) si
+            # riallinea tutto, rimozioni comprese
+            previous_keys = list({changes.player_key(p) for p in previous})
+            missing = _missing_keys(conn, previous_keys)
+            full = _full_changeset(conn, players) if missing or not previous_keys else None
+            if full is not None:
+                logger.info(f"🔁 Database non allineato allo snapshot precedente ({len(missing)} giocatori mancanti): caricamento completo")
+                apply_changeset(conn, full)
+            elif not changeset.is_empty():
+                apply_changeset(conn, changeset)
+        except BaseException:
+            # database invariato (transazione annullata): il dataset preparato non serve
+            STAGED_FILE.unlink(missing_ok=True)
+            raise
+        finally:
+            conn.close()
+
+    with span("publish"):
+        # Se la sostituzione non avvenisse, il prossimo aggiornamento confronterebbe i dati
+        # con il file vecchio e riscriverebbe le stesse modifiche (upsert idempotenti)
+        if not changeset.is_empty():
+            os.replace(STAGED_FILE, JSON_FILE)
+        changes.publish(changeset)
+
+def main():
+    # una riga ⏱️ per fase (scrape, parse, merge, diff, save, load, publish) e il totale;
+    # un solo aggiornamento alla volta, anche tra processi (RefreshInProgress altrimenti)
+    with refresh_lock(), span("total"):
+        _update()
     logger.info("🏁 Operazione completata!")
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except RefreshInProgress as e:
+        logger.warning(f"⏭️ {e}")
+        sys.exit(EXIT_IN_PROGRESS)
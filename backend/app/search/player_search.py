@@ -0,0 +1,194 @@
+# app/search/player_search.py
+import bisect
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+from app.refresh.changeset import CHANGES_FILE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# L'indice contiene solo id e nomi: ruolo, prezzo e il resto si rileggono dal database
+# per gli id trovati, così un aggiornamento in place non serve mai dati vecchi
+FINGERPRINT_QUERY = "SELECT COUNT(*), MAX(id) FROM players"
+ROWS_QUERY = "SELECT id, name FROM players"
+
+FUZZY_SCORE_CUTOFF = 75
+
+
+def normalize_name(name: str) -> str:
+    name = unicodedata.normalize('NFKD', name or "").encode('ASCII', 'ignore').decode('ASCII')
+    name = re.sub(r'\s+', ' ', name.lower().strip())
+    return name
+
+
+def dataset_version(path=CHANGES_FILE):
+    """
+    Versione del dataset pubblicata dall'aggiornamento dei giocatori (anche da un altro
+    processo): publish() sostituisce il file dei changeset a ogni generazione
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def index_fingerprint(count_and_max_id):
+    """Impronta dell'indice: (COUNT, MAX(id)) della tabella più la versione del dataset"""
+    return tuple(count_and_max_id) + (dataset_version(),)
+
+
+def fuzzy_score(query, name, **kwargs):
+    """
+    WRatio, tranne quando il nome è più corto della query: lì WRatio userebbe il
+    confronto parziale e un frammento ("rog" in "lautaro") sembrerebbe simile, quindi
+    si confrontano le stringhe intere
+    """
+    from rapidfuzz import fuzz
+    scorer = fuzz.ratio if len(name) < len(query) else fuzz.WRatio
+    return scorer(query, name, **kwargs)
+
+
+def _trigrams(text: str):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PlayerSearchIndex:
+    """
+    Indice di ricerca sui nomi dei giocatori, costruito una volta sola:
+    - nomi normalizzati (senza accenti, minuscoli) precalcolati
+    - indice ordinato dei suffissi di parola per la ricerca per prefisso
+    - indice a trigrammi per la ricerca per sottostringa
+    - ricerca fuzzy con rapidfuzz sui nomi normalizzati
+    """
+
+    def __init__(self, rows):
+        # rows: (id, name)
+        rows = list(rows)
+        self.ids = [r[0] for r in rows]
+        self.names = [normalize_name(r[1]) for r in rows]
+
+        prefix_entries = []
+        self.trigrams = {}
+        for i, name in enumerate(self.names):
+            # "manuel de luca" -> "manuel de luca", "de luca", "luca"
+            for m in re.finditer(r'\S+', name):
+                prefix_entries.append((name[m.start():], i))
+            for tri in _trigrams(name):
+                self.trigrams.setdefault(tri, set()).add(i)
+        prefix_entries.sort()
+        self._prefix_keys = [k for k, _ in prefix_entries]
+        self._prefix_rows = [i for _, i in prefix_entries]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def prefix(self, query: str):
+        """Indici dei giocatori con una parola del nome che inizia con query (nome completo prima)"""
+        start = bisect.bisect_left(self._prefix_keys, query)
+        full, partial = [], []
+        seen = set()
+        for j in range(start, len(self._prefix_keys)):
+            if not self._prefix_keys[j].startswith(query):
+                break
+            i = self._prefix_rows[j]
+            if i in seen:
+                continue
+            seen.add(i)
+            (full if self.names[i].startswith(query) else partial).append(i)
+        return full + partial
+
+    def substring(self, query: str):
+        """Indici dei giocatori il cui nome contiene query"""
+        if len(query) < 3:
+            return [i for i, name in enumerate(self.names) if query in name]
+        sets = sorted((self.trigrams.get(t, set()) for t in _trigrams(query)), key=len)
+        candidates = set.intersection(*sets) if sets else set()
+        return sorted(i for i in candidates if query in self.names[i])
+
+    def fuzzy(self, query: str, limit: int, score_cutoff=FUZZY_SCORE_CUTOFF):
+        """Indici dei giocatori più simili a query, ordinati per punteggio"""
+        from rapidfuzz import process  # importato alla prima ricerca fuzzy
+        matches = process.extract(query, self.names, scorer=fuzzy_score,
+                                  limit=limit, score_cutoff=score_cutoff)
+        return [i for _, _, i in matches]
+
+    def search(self, name: str, mode: str = "auto", limit: int = 20):
+        """
+        Restituisce gli id dei giocatori che corrispondono a name, in ordine di rilevanza.
+        mode: "prefix", "substring", "fuzzy" oppure "auto"
+        (prefisso, poi sottostringa, poi fuzzy fino a raggiungere limit)
+        """
+        query = normalize_name(name)
+        if not query:
+            return []
+
+        if mode == "prefix":
+            found = self.prefix(query)
+        elif mode == "substring":
+            found = self.substring(query)
+        elif mode == "fuzzy":
+            found = self.fuzzy(query, limit)
+        else:
+            found = self.prefix(query)
+            if len(found) < limit:
+                seen = set(found)
+                found += [i for i in self.substring(query) if i not in seen]
+            if len(found) < limit:
+                seen = set(found)
+                found += [i for i in self.fuzzy(query, limit) if i not in seen]
+
+        return [self.ids[i] for i in found[:limit]]
+
+
+class PlayerSearchIndexStore:
+    """
+    Mantiene l'indice di ricerca allineato alla tabella players.
+    L'indice viene ricostruito solo se cambia l'impronta (COUNT, MAX(id) e versione
+    del dataset, vedi index_fingerprint) oppure dopo invalidate().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._fingerprint = None
+
+    def get(self, execute):
+        """execute(sql) deve restituire la lista di righe della query"""
+        current = index_fingerprint(execute(FINGERPRINT_QUERY)[0])
+        return self.load(current, None if self.is_current(current) else execute(ROWS_QUERY))
+
+    def is_current(self, fingerprint):
+        return self._index is not None and fingerprint == self._fingerprint
+
+    def load(self, fingerprint, rows):
+        """
+        Indice per l'impronta letta dal database; rows (ROWS_QUERY) serve solo se l'indice
+        non è aggiornato. Separato dalle letture: la costruzione (CPU) gira nel threadpool,
+        le query sulla sessione.
+        """
+        index = self._index
+        if index is not None and (rows is None or fingerprint == self._fingerprint):
+            # rows None: l'indice era aggiornato al momento della lettura
+            return index
+
+        with self._lock:
+            if self._index is None or fingerprint != self._fingerprint:
+                self._index = PlayerSearchIndex(rows)
+                self._fingerprint = fingerprint
+                logger.info(f"🔎 Indice di ricerca ricostruito ({len(self._index)} giocatori)")
+            return self._index
+
+    def invalidate(self):
+        self._fingerprint = None
+
+
+player_search_index = PlayerSearchIndexStore()
+
+
+def invalidate_search_index():
+    player_search_index.invalidate()
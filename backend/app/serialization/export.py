@@ -0,0 +1,60 @@
+# app/serialization/export.py
+# Export in streaming (NDJSON o CSV) per i job di analisi: le righe arrivano da un
+# cursore lato server a blocchi di EXPORT_BATCH_SIZE e vengono inviate appena
+# serializzate, quindi la memoria non cresce con il numero di righe.
+import csv
+import io
+import os
+
+from fastapi.responses import StreamingResponse
+
+from app.db.database import AsyncSessionLocal
+from app.serialization import json_codec
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+FORMAT_PATTERN = "^(ndjson|csv)$"
+
+
+def _csv_value(value):
+    # dict/list (stats, fantacalcio_data) in una sola cella, come JSON
+    if isinstance(value, (dict, list)):
+        return json_codec.dumps(value).decode("utf-8")
+    return value
+
+
+def ndjson_chunk(rows, columns):
+    return b"".join(json_codec.dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def csv_chunk(rows, columns, header=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_rows(statement, fmt: str, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Esegue statement con un cursore lato server (sessione propria, chiusa a fine export
+    o se il client si disconnette) e produce i blocchi serializzati, uno per partizione
+    """
+    columns = [column.key for column in statement.selected_columns]
+    if fmt == "csv":
+        # l'intestazione esce subito, anche se il risultato è vuoto
+        yield csv_chunk([], columns, header=True)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(statement.execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            yield csv_chunk(partition, columns) if fmt == "csv" else ndjson_chunk(partition, columns)
+
+
+def export_response(statement, fmt: str, filename: str):
+    return StreamingResponse(
+        stream_rows(statement, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
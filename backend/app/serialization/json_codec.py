@@ -0,0 +1,85 @@
+# app/serialization/json_codec.py
+# Codec JSON unico per risposte HTTP e file dei giocatori: orjson se installato
+# (serializza direttamente in bytes UTF-8, numpy e datetime compresi), altrimenti la
+# libreria standard con lo stesso output. JSON_CODEC=json forza la libreria standard.
+import datetime
+import json
+import os
+from pathlib import Path
+
+from starlette.responses import JSONResponse as StarletteJSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson è opzionale: stesso formato, solo più lento
+    orjson = None
+
+if os.getenv("JSON_CODEC", "orjson").lower() == "json":
+    orjson = None
+
+# orjson.JSONDecodeError è sottoclasse di json.JSONDecodeError: un solo except basta
+JSONDecodeError = json.JSONDecodeError
+
+# Chiavi non stringa (es. id delle squadre in win_probability) e array numpy come il
+# vecchio percorso jsonable_encoder + json.dumps
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+
+def _default(obj):
+    """Tipi non nativi per la libreria standard (orjson li gestisce da solo)"""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):  # array e scalari numpy
+        return obj.tolist()
+    raise TypeError(f"Tipo {type(obj).__name__} non serializzabile in JSON")
+
+
+def dumps(obj, indent=False, sort_keys=False) -> bytes:
+    """obj in bytes UTF-8; compatto, oppure indentato di 2 spazi per i file leggibili"""
+    if orjson is not None:
+        options = _ORJSON_OPTIONS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=options)
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        sort_keys=sort_keys,
+        default=_default,
+    ).encode("utf-8")
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_file(obj, path, indent=True):
+    """
+    Scrittura atomica: file temporaneo nella stessa cartella, poi os.replace. Chi legge
+    (anche da un altro processo) vede il file precedente o quello nuovo, mai uno a metà.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_bytes(dumps(obj, indent=indent))
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def load_file(path):
+    return loads(Path(path).read_bytes())
+
+
+class JSONResponse(StarletteJSONResponse):
+    """Risposta JSON serializzata con il codec: usata per default dall'app"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -0,0 +1,133 @@
+# benchmarks/bench_json.py
+# Serializzazione JSON prima e dopo il codec orjson:
+#  - end-to-end: /api/players/ (query sugli indici), ricerca, rose e previsioni servite
+#    da uvicorn con JSON_CODEC=json (libreria standard) e con orjson, stesso database;
+#  - snapshot: lettura e scrittura di players_data.json e hash del changeset;
+#  - validazione: lista di rose rivalidata da Pydantic (response_model) contro i dict
+#    serializzati direttamente, come fanno ora gli endpoint di elenco.
+#
+#   cd backend && python -m benchmarks.bench_json [--requests 1000] [--concurrency 16]
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+import time
+from typing import List
+
+from benchmarks.bench_load import BACKEND_DIR, SEARCH_NAMES, _free_port, _load, _seed, _start
+
+CODECS = ("json", "orjson")
+
+
+def _requests(token, n, squads, seed):
+    rng = random.Random(seed)
+    plan = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.25:
+            plan.append(("players", "/api/players/", {"sort": "-mfv", "limit": 1000}))
+        elif kind < 0.4:
+            plan.append(("search", "/api/players/search", {"name": rng.choice(SEARCH_NAMES), "limit": 100, "token": token}))
+        elif kind < 0.65:
+            plan.append(("squads", "/api/squads/", {"all_users": "true", "include_players": "true", "limit": 200, "token": token}))
+        elif kind < 0.8:
+            plan.append(("squad", f"/api/squads/{rng.randint(1, squads)}", {"token": token}))
+        else:
+            plan.append(("predictions", "/api/predictions/1", {"limit": 1000, "token": token}))
+    return plan
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def _snapshot_codec(repeat):
+    """Millisecondi (migliore di repeat) per le operazioni sul file dei giocatori"""
+    from app.refresh.changeset import record_hash
+    from app.serialization import json_codec
+
+    raw = (BACKEND_DIR / "players_data.json").read_bytes()
+    results = {}
+    orjson = json_codec.orjson
+    for codec in CODECS:
+        if codec == "orjson" and orjson is None:
+            continue
+        json_codec.orjson = orjson if codec == "orjson" else None
+        players = json_codec.loads(raw)
+        results[codec] = {
+            "load_ms": _timed(lambda: json_codec.loads(raw), repeat),
+            "response_body_ms": _timed(lambda: json_codec.dumps({"players": players}), repeat),
+            "save_indented_ms": _timed(lambda: json_codec.dumps(players, indent=True), repeat),
+            "changeset_hash_ms": _timed(lambda: [record_hash(p) for p in players], repeat),
+        }
+    json_codec.orjson = orjson
+    return results
+
+
+def _validation(database_url, repeat):
+    """Millisecondi per serializzare 200 rose con giocatori: rivalidate o come dict"""
+    from pydantic import TypeAdapter
+
+    from app.crud import squads as crud_squads
+    from app.db.database import SessionLocal
+    from app.schemas.schemas import Squad as SquadOut
+    from app.serialization import json_codec
+
+    db = SessionLocal()
+    try:
+        rows = [crud_squads.squad_to_dict(s) for s in crud_squads.list_squads(db, None, limit=200, include_players=True)]
+    finally:
+        db.close()
+    adapter = TypeAdapter(List[SquadOut])
+    return {
+        "pydantic_validate_dump_ms": _timed(lambda: adapter.dump_json(adapter.validate_python(rows)), repeat),
+        "codec_dumps_ms": _timed(lambda: json_codec.dumps(rows), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serializzazione JSON: libreria standard contro orjson")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--squads", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        token = _seed(database_url, args.squads, args.seed)
+        plan = _requests(token, args.requests, args.squads, args.seed)
+        # senza compressione: si misura la serializzazione, non GZipMiddleware
+        headers = {"Accept-Encoding": "identity"}
+        endpoints = {}
+        for codec in CODECS:
+            port = _free_port()
+            proc = _start("main:app", port, database_url, extra_env={"JSON_CODEC": codec})
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(_load(base_url, plan[:100], args.concurrency, headers))  # riscaldamento
+                endpoints[codec] = asyncio.run(_load(base_url, plan, args.concurrency, headers))
+            finally:
+                proc.terminate()
+                proc.wait()
+        validation = _validation(database_url, args.repeat)
+
+    results = {
+        "concurrency": args.concurrency,
+        "endpoints": endpoints,
+        "rps_ratio": endpoints["orjson"]["rps"] / endpoints["json"]["rps"],
+        "snapshot": _snapshot_codec(args.repeat),
+        "list_validation": validation,
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
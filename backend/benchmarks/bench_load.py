@@ -0,0 +1,176 @@
+# benchmarks/bench_load.py
+# Test di carico: stessi endpoint di lettura serviti dall'app reale (router asincroni
+# su AsyncSession) e dal riferimento sincrono di benchmarks/sync_app.py, su un
+# database temporaneo identico. Stampa richieste/s e latenze (p50/p99) in JSON.
+#
+#   cd backend && python -m benchmarks.bench_load [--requests 3000] [--concurrency 64]
+#
+# Serve uvicorn; i server girano in processi separati, un worker ciascuno.
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+APPS = {"async": "main:app", "sync": "benchmarks.sync_app:app"}
+SEARCH_NAMES = ("de", "lau", "mart", "ros", "bar", "luk", "leao", "pulisic")
+
+
+def _seed(database_url, squads, seed):
+    """Utente del token, giocatori dallo snapshot, rose casuali da 25 e previsioni della giornata 1"""
+    os.environ["DATABASE_URL"] = database_url
+    from app.auth.auth import create_access_token
+    from app.crud import players as crud_players
+    from app.db.database import SessionLocal, engine
+    from app.db.migrations import init_db
+    from app.db.models import Player, Squad, SquadPlayer, User
+    from app.engine.predictor import predict_players
+
+    with open(BACKEND_DIR / "players_data.json", encoding="utf-8") as f:
+        data = json.load(f)
+    rng = random.Random(seed)
+    init_db(engine)  # tabelle e indici (nell'app li crea il lifespan)
+    db = SessionLocal()
+    try:
+        # get_current_user rilegge l'utente del token (poi resta in cache)
+        user = User(email="bench@example.com", hashed_password="-")
+        db.add(user)
+        db.add_all(Player(name=p["name"], team=p["team"], role=p["role"], price=rng.randint(1, 40)) for p in data)
+        db.commit()
+        user_id = user.id
+        ids = crud_players.player_ids_by_key(db)
+        known = [p for p in data if (p["name"], p["team"]) in ids]
+        fantamedia, media_voto = predict_players(known)
+        crud_players.replace_predictions(db, 1, [
+            {"player_id": ids[(p["name"], p["team"])], "matchday": 1,
+             "predicted_fantamedia": float(fm), "predicted_media_voto": float(mv)}
+            for p, fm, mv in zip(known, fantamedia, media_voto)
+        ])
+        player_ids = list(ids.values())
+        for i in range(squads):
+            squad = Squad(name=f"Squadra {i}", user_id=i % 50 + 1)
+            db.add(squad)
+            db.flush()
+            db.add_all(SquadPlayer(squad_id=squad.id, player_id=pid) for pid in rng.sample(player_ids, 25))
+        db.commit()
+    finally:
+        db.close()
+    return create_access_token({"user_id": user_id}, expires_delta=None)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start(app, port, database_url, extra_env=None):
+    env = {**os.environ, "DATABASE_URL": database_url, **(extra_env or {})}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    import httpx
+    for _ in range(100):
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server {app} terminato all'avvio")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/docs", timeout=0.5)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"Server {app} non avviato")
+
+
+def _requests(token, n, seed):
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.5:
+            paths.append(("search", "/api/players/search", {"name": rng.choice(SEARCH_NAMES), "token": token}))
+        elif kind < 0.8:
+            paths.append(("squads", "/api/squads/", {"all_users": "true", "limit": 50, "token": token}))
+        else:
+            paths.append(("predictions", "/api/predictions/1", {"limit": 100, "token": token}))
+    return paths
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+async def _load(base_url, plan, concurrency, headers=None):
+    import httpx
+    latencies = {}
+    errors = 0
+    queue = list(reversed(plan))
+
+    async def worker(client):
+        nonlocal errors
+        while queue:
+            kind, path, params = queue.pop()
+            start = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+            errors += response.status_code != 200
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, headers=headers, timeout=60) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    every = [v for values in latencies.values() for v in values]
+    return {
+        "requests": len(every),
+        "errors": errors,
+        "rps": len(every) / elapsed,
+        "p50_ms": _percentile(every, 50) * 1000,
+        "p99_ms": _percentile(every, 99) * 1000,
+        "by_endpoint": {
+            kind: {"p50_ms": _percentile(values, 50) * 1000, "p99_ms": _percentile(values, 99) * 1000}
+            for kind, values in sorted(latencies.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carico: router asincroni contro handler sincroni")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--squads", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        token = _seed(database_url, args.squads, args.seed)
+        plan = _requests(token, args.requests, args.seed)
+        results = {}
+        for name, app in APPS.items():
+            port = _free_port()
+            proc = _start(app, port, database_url)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(_load(base_url, plan[:100], args.concurrency))  # riscaldamento: cache e indici
+                results[name] = asyncio.run(_load(base_url, plan, args.concurrency))
+            finally:
+                proc.terminate()
+                proc.wait()
+
+    results["rps_ratio"] = results["async"]["rps"] / results["sync"]["rps"]
+    print(json.dumps({"concurrency": args.concurrency, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_parsers.py
+# Confronta il parser lxml e quello BeautifulSoup degli scraper:
+# verifica che l'output sia identico e misura tempo e picco di memoria.
+#
+#   cd backend && python -m benchmarks.bench_parsers [--fanta pagina.html] [--fbref pagina.html]
+#
+# Senza pagine salvate vengono generate dai file JSON degli scraper. In ogni caso verifica
+# anche le pagine ridotte di benchmarks/fixtures (markup del sito, tabella FBref dentro
+# un commento), che i template generati non riproducono.
+import argparse
+import json
+import logging
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from benchmarks.fixtures import load_saved_page, render_fantacalcio_page, render_fbref_page
+
+BACKEND_DIR = Path(__file__).parent.parent
+PARSERS = ("html.parser", "lxml")
+
+
+def _scraper(kind, parser):
+    if kind == "fantacalcio":
+        from app.scraping.fantacalcio_scraper import FantacalcioScraper
+        return FantacalcioScraper(parser=parser)
+    from app.scraping.fbref_scraper import FBrefScraper
+    return FBrefScraper(parser=parser)
+
+
+def _measure(kind, parser, html, repeat):
+    """Eseguito in un processo nuovo, così il picco di memoria (ru_maxrss) è solo del parser"""
+    logging.disable(logging.INFO)
+    scraper = _scraper(kind, parser)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    players = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        players = scraper.parse_players(html)
+        timings.append(time.perf_counter() - start)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "best_s": min(timings),
+        "mean_s": sum(timings) / len(timings),
+        "peak_rss_delta_kb": rss_after - rss_before,
+        "players": players,
+    }
+
+
+def _load_pages(args):
+    if args.fanta and args.fbref:
+        return Path(args.fanta).read_text(encoding="utf-8"), Path(args.fbref).read_text(encoding="utf-8")
+    with open(BACKEND_DIR / "fantacalcio_players.json", encoding="utf-8") as f:
+        fanta = json.load(f)
+    with open(BACKEND_DIR / "fbref_players.json", encoding="utf-8") as f:
+        fbref = json.load(f)
+    pages = (
+        Path(args.fanta).read_text(encoding="utf-8") if args.fanta else render_fantacalcio_page(fanta * args.scale),
+        Path(args.fbref).read_text(encoding="utf-8") if args.fbref else render_fbref_page(fbref * args.scale),
+    )
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser lxml vs html.parser")
+    parser.add_argument("--fanta", help="pagina Fantacalcio.it salvata")
+    parser.add_argument("--fbref", help="pagina FBref salvata")
+    parser.add_argument("--scale", type=int, default=1, help="moltiplicatore dei giocatori nelle pagine generate")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fanta_html, fbref_html = _load_pages(args)
+    results = {}
+    ctx = get_context("spawn")
+    for kind, html in (("fantacalcio", fanta_html), ("fbref", fbref_html)):
+        outputs = {}
+        for name in PARSERS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                outputs[name] = pool.submit(_measure, kind, name, html, args.repeat).result()
+        saved = load_saved_page(kind)
+        identical = outputs["lxml"]["players"] == outputs["html.parser"]["players"] and \
+            _scraper(kind, "lxml").parse_players(saved) == _scraper(kind, "html.parser").parse_players(saved)
+        results[kind] = {
+            "html_bytes": len(html.encode("utf-8")),
+            "players": len(outputs["lxml"]["players"]),
+            "identical_output": identical,
+            "parsers": {name: {k: v for k, v in out.items() if k != "players"} for name, out in outputs.items()},
+            "speedup": outputs["html.parser"]["best_s"] / outputs["lxml"]["best_s"],
+        }
+
+    print(json.dumps(results, indent=2))
+    if not all(r["identical_output"] for r in results.values()):
+        raise SystemExit("❌ I due parser producono risultati diversi")
+
+
+if __name__ == "__main__":
+    main()
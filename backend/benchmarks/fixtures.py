@@ -0,0 +1,126 @@
+# benchmarks/fixtures.py
+# Pagine HTML con la stessa struttura di Fantacalcio.it e FBref,
+# generate a partire da liste di giocatori nel formato degli scraper.
+# In benchmarks/fixtures/ ci sono invece le pagine delle due fonti ridotte a poche righe
+# (SAVED_PAGES), con il markup del sito: tabella FBref dentro un commento HTML, righe di
+# intestazione ripetute, tabelle estranee nella pagina. Si aggiornano con
+#
+#   cd backend && python -m benchmarks.fixtures [--rows 30]
+import argparse
+import re
+from html import escape
+from pathlib import Path
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+# sorgente -> file in FIXTURES_DIR
+SAVED_PAGES = {
+    "fantacalcio": "fantacalcio_statistiche.html",
+    "fbref": "fbref_serie_a_stats.html",
+}
+
+FANTA_ROLE_CODES = {"GK": "p", "DEF": "d", "MID": "c", "FWD": "a"}
+FANTA_STAT_KEYS = ("pg", "mv", "mfv", "gol", "ass", "gs", "rig", "rp", "amm", "esp")
+
+
+def _fanta_value(value):
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".").replace(".", ",")
+    return escape(str(value))
+
+
+def render_fantacalcio_page(players):
+    rows = []
+    for p in players:
+        stats = p.get("stats") or {}
+        cells = "".join(
+            f'<td data-col-key="{key}">{_fanta_value(stats.get(key, 0))}</td>'
+            for key in FANTA_STAT_KEYS
+        )
+        rows.append(
+            "<tr>"
+            f'<th class="player-name"><a href="{escape(p.get("url") or "#")}"><span>{escape(p["name"])}</span></a></th>'
+            f'<th class="player-role-classic"><span class="role" data-value="{FANTA_ROLE_CODES.get(p["role"], "c")}">'
+            f'{FANTA_ROLE_CODES.get(p["role"], "c").upper()}</span></th>'
+            f'<td class="player-team">{escape(p["team"])}</td>'
+            f"{cells}</tr>"
+        )
+    return (
+        "<!DOCTYPE html><html><head><title>Statistiche Serie A</title></head><body>"
+        '<nav><ul><li><a href="/">Home</a></li></ul></nav>'
+        '<table class="stats"><thead><tr><th>Nome</th><th>R</th><th>Sq</th></tr></thead><tbody>'
+        + "\n".join(rows)
+        + "</tbody></table></body></html>"
+    )
+
+
+def render_fbref_page(players, commented=True):
+    columns = []
+    for p in players:
+        for key in p.get("stats") or {}:
+            if key not in columns:
+                columns.append(key)
+
+    head = '<th data-stat="ranker">Rk</th>' + "".join(f'<th data-stat="{c}">{c}</th>' for c in columns)
+    rows = []
+    for i, p in enumerate(players, start=1):
+        stats = p.get("stats") or {}
+        cells = []
+        for c in columns:
+            value = stats.get(c, "")
+            if c == "player":
+                href = (p.get("url") or "").replace("https://fbref.com", "")
+                cells.append(f'<td data-stat="player"><a href="{escape(href)}">{escape(str(value))}</a></td>')
+            elif c == "minutes" and isinstance(value, int):
+                cells.append(f'<td data-stat="minutes">{value:,}</td>')
+            else:
+                cells.append(f'<td data-stat="{c}">{escape(str(value))}</td>')
+        rows.append(f'<tr><th data-stat="ranker">{i}</th>{"".join(cells)}</tr>')
+        if i % 25 == 0:
+            rows.append(f'<tr class="thead">{head}</tr>')
+
+    table = (
+        f'<table id="stats_standard"><thead><tr>{head}</tr></thead><tbody>'
+        + "\n".join(rows)
+        + "</tbody></table>"
+    )
+    if commented:
+        table = f'<div class="placeholder"></div><!--\n{table}\n-->'
+    return (
+        "<!DOCTYPE html><html><head><title>Serie A Stats</title></head><body>"
+        '<table id="stats_squads_standard_for"><tbody><tr><td>Squad</td></tr></tbody></table>'
+        f'<div id="all_stats_standard">{table}</div></body></html>'
+    )
+
+
+def load_saved_page(kind):
+    return (FIXTURES_DIR / SAVED_PAGES[kind]).read_text(encoding="utf-8")
+
+
+_TBODY = re.compile(r"(<tbody[^>]*>)(.*?)(</tbody>)", re.S | re.I)
+_ROW = re.compile(r"<tr\b.*?</tr>\s*", re.S | re.I)
+
+
+def trim_rows(html, rows):
+    """Tiene solo le prime rows righe di ogni tbody, anche dentro i commenti; il resto della pagina resta com'è"""
+    def keep(match):
+        kept = [m.group(0) for m in _ROW.finditer(match.group(2))][:rows]
+        return match.group(1) + "\n" + "".join(kept) + match.group(3)
+    return _TBODY.sub(keep, html)
+
+
+def main():
+    from app.scraping.fantacalcio_scraper import FantacalcioScraper
+    from app.scraping.fbref_scraper import FBrefScraper
+
+    parser = argparse.ArgumentParser(description="Scarica e riduce le pagine salvate in benchmarks/fixtures")
+    parser.add_argument("--rows", type=int, default=30, help="righe tenute per ogni tabella")
+    args = parser.parse_args()
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    for kind, scraper in (("fantacalcio", FantacalcioScraper()), ("fbref", FBrefScraper())):
+        path = FIXTURES_DIR / SAVED_PAGES[kind]
+        path.write_text(trim_rows(scraper.fetch().text, args.rows), encoding="utf-8")
+        print(f"{path}: {path.stat().st_size} byte")
+
+
+if __name__ == "__main__":
+    main()
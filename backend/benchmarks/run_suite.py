@@ -0,0 +1,328 @@
+# benchmarks/run_suite.py
+# Suite di benchmark dei percorsi critici su dati sintetici (benchmarks/synthetic.py)
+# a più scale: merge_data (parsing delle pagine + fuzzy matching), insert_data, le due
+# ricerche giocatori, get_all_players e gli endpoint delle rose, questi ultimi con un
+# client ASGI in-process (httpx.ASGITransport, senza rete). Il risultato è un JSON
+# confrontabile tra esecuzioni: con --baseline aggiunge i rapporti rispetto a un
+# risultato precedente (< 1 = più veloce) ed esce con codice 1 se una misura è più lenta
+# del precedente oltre --tolerance (es. 0.25 = +25%): in CI è il controllo di regressione.
+#
+#   cd backend && python -m benchmarks.run_suite [--scales 1,10,100] [--repeat 20] \
+#       [--output risultati.json] [--baseline precedente.json] [--tolerance 0.25]
+#
+# Ogni scala gira in un processo separato, con database e file dei giocatori propri
+# (DATABASE_URL e PLAYERS_DATA_FILE vanno impostati prima di importare l'app).
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+SQUADS_PER_SCALE = 50  # rose nel database per ogni unità di scala
+ROSTER_QUOTAS = {"GK": 3, "DEF": 8, "MID": 8, "FWD": 6}
+# Rallentamento massimo rispetto al baseline prima di segnalare una regressione
+DEFAULT_TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))
+
+
+def _stats(timings):
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "min_ms": ordered[0] * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+    }
+
+
+def _time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return _stats(timings)
+
+
+class _PageClient:
+    """Al posto di ScraperHttpClient: restituisce le pagine generate, senza rete"""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch_many(self, requests_list):
+        from app.scraping.http_client import FetchResult
+        return [FetchResult(url, 200, self.pages[url]) for url, _ in requests_list]
+
+
+def _bench_merge(fanta, fbref, repeat):
+    from app.scripts.update_and_save_players import UnifiedPlayerScraper
+    from benchmarks.fixtures import render_fantacalcio_page, render_fbref_page
+
+    probe = UnifiedPlayerScraper(http=_PageClient({}))
+    pages = {
+        probe.fanta_scraper.url: render_fantacalcio_page(fanta),
+        probe.fbref_scraper.url: render_fbref_page(fbref),
+    }
+    scraper = UnifiedPlayerScraper(http=_PageClient(pages))
+    merged = scraper.merge_data()
+    fanta_parsed = scraper.fanta_scraper.parse_players(pages[probe.fanta_scraper.url])
+    fbref_parsed = scraper.fbref_scraper.parse_players(pages[probe.fbref_scraper.url])
+    return merged, {
+        "merge_data": _time(scraper.merge_data, repeat),
+        # solo il fuzzy matching, senza parsing (merge_players modifica il ruolo FBref: copie)
+        "merge_players": _time(lambda: scraper.merge_players(fanta_parsed, [dict(p) for p in fbref_parsed]), repeat),
+    }
+
+
+def _bench_insert(merged):
+    from app.db.database import engine
+    from app.scripts import update_and_save_players as script
+
+    results = {}
+    with engine.connect() as conn:
+        script.apply_bulk_pragmas(conn)
+        script.create_tables(conn)
+        for phase in ("initial", "unchanged"):
+            start = time.perf_counter()
+            script.insert_data(conn, merged)
+            results[phase] = (time.perf_counter() - start) * 1000
+    return results
+
+
+def _roster(by_role, rng):
+    """Rosa casuale con le quote predefinite per ruolo: valida per best-xi e PUT /players"""
+    return [pid for role, count in ROSTER_QUOTAS.items() for pid in rng.sample(by_role.get(role, []), count)]
+
+
+def _seed_app(merged, scale, rng):
+    """Utente, rose casuali e previsioni della giornata 1; restituisce (token, id rose, ruoli)"""
+    from sqlalchemy import insert
+
+    from app.auth.auth import create_access_token
+    from app.crud import players as crud_players
+    from app.crud.squads import refresh_squad_summaries
+    from app.db.database import SessionLocal
+    from app.db.models import Player, Squad, SquadPlayer, User
+    from app.engine.predictor import predict_players
+
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", hashed_password="-")
+        db.add(user)
+        db.commit()
+        ids = crud_players.player_ids_by_key(db)
+        known = [p for p in merged if (p["name"], p["team"]) in ids]
+        fantamedia, media_voto = predict_players(known)
+        crud_players.replace_predictions(db, 1, [
+            {"player_id": ids[(p["name"], p["team"])], "matchday": 1,
+             "predicted_fantamedia": float(fm), "predicted_media_voto": float(mv)}
+            for p, fm, mv in zip(known, fantamedia, media_voto)
+        ])
+        by_role = {}
+        for pid, role in db.query(Player.id, Player.role):
+            by_role.setdefault(role, []).append(pid)
+        squads = [Squad(name=f"Squadra {i}", user_id=user.id) for i in range(max(2, round(SQUADS_PER_SCALE * scale)))]
+        db.add_all(squads)
+        db.flush()
+        squad_ids = [s.id for s in squads]
+        db.execute(insert(SquadPlayer), [
+            {"squad_id": sid, "player_id": pid} for sid in squad_ids for pid in _roster(by_role, rng)
+        ])
+        refresh_squad_summaries(db)
+        db.commit()
+        return create_access_token({"user_id": user.id}, expires_delta=None), squad_ids, by_role
+    finally:
+        db.close()
+
+
+async def _bench_endpoints(merged, token, squad_ids, by_role, rng, repeat):
+    import httpx
+    from fastapi import FastAPI
+
+    import main
+    from app.api import players as legacy_players
+    from app.cache.player_snapshot import player_snapshot
+
+    # la vecchia ricerca (app/api/players.py) non è montata nell'app: app ASGI a parte
+    legacy = FastAPI()
+    legacy.include_router(legacy_players.router, prefix="/api/players")
+    headers = {"Authorization": f"Bearer {token}"}
+    names = [p["name"][:4] for p in rng.sample(merged, 20)]
+    results = {}
+
+    async def measure(client, key, method, path, runs=repeat, before=None, **kwargs):
+        """kwargs della richiesta; un valore callable riceve il numero della ripetizione"""
+        timings, errors = [], 0
+        for i in range(runs):
+            if before:
+                before()
+            request = {name: value(i) if callable(value) else value for name, value in kwargs.items()}
+            start = time.perf_counter()
+            response = await client.request(method, path, **request)
+            timings.append(time.perf_counter() - start)
+            errors += response.status_code != 200
+        # byte trasferiti (compressi), non quelli decodificati da httpx
+        results[key] = {**_stats(timings), "errors": errors, "bytes": response.num_bytes_downloaded}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=600) as client:
+        # get_all_players: primo caricamento (lettura, parsing e serializzazione del file)...
+        await measure(client, "players_all_cold", "GET", "/api/players/", runs=min(repeat, 3),
+                      before=player_snapshot.invalidate, headers={"Accept-Encoding": "identity"})
+        # ...poi si attende la compressione br/gzip che ogni caricamento avvia in background,
+        # così non ruba CPU alle misure successive
+        start = time.perf_counter()
+        await asyncio.to_thread(player_snapshot.get().precompress)
+        results["players_all_precompress_wait"] = {"ms": (time.perf_counter() - start) * 1000}
+        for encoding in ("identity", "gzip", "br"):
+            await measure(client, f"players_all_{encoding}", "GET", "/api/players/", headers={"Accept-Encoding": encoding})
+        await measure(client, "players_query", "GET", "/api/players/",
+                      params={"role": "DEF", "sort": "-mfv", "limit": 50}, headers={"Accept-Encoding": "identity"})
+        await measure(client, "players_fields", "GET", "/api/players/",
+                      params={"fields": "name,team,role,mfv", "limit": 1000}, headers={"Accept-Encoding": "identity"})
+
+        await measure(client, "search", "GET", "/api/players/search", params=lambda i: {"name": names[i % len(names)]})
+        await measure(client, "search_fuzzy", "GET", "/api/players/search",
+                      params=lambda i: {"name": names[i % len(names)], "mode": "fuzzy"})
+
+        await measure(client, "squads_list", "GET", "/api/squads/", params={"limit": 100})
+        await measure(client, "squads_list_players", "GET", "/api/squads/", params={"limit": 100, "include_players": "true"})
+        await measure(client, "squad_get", "GET", f"/api/squads/{squad_ids[0]}")
+        await measure(client, "squad_best_xi", "GET", f"/api/squads/{squad_ids[0]}/best-xi")
+        rosters = [_roster(by_role, rng), _roster(by_role, rng)]
+        # due rose alternate: ogni PUT scrive davvero delle differenze
+        await measure(client, "squad_replace_players", "PUT", f"/api/squads/{squad_ids[1]}/players",
+                      json=lambda i: {"player_ids": rosters[i % 2]})
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy), base_url="http://bench", timeout=600) as client:
+        await measure(client, "search_legacy", "GET", "/api/players/search", params=lambda i: {"name": names[i % len(names)]})
+    return results
+
+
+def _run_scale(scale, seed, repeat, workdir):
+    """Eseguito in un processo nuovo: l'app legge DATABASE_URL e PLAYERS_DATA_FILE all'import"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir}/bench.db"
+    os.environ["PLAYERS_DATA_FILE"] = str(Path(workdir) / "players_data.json")
+    logging.disable(logging.INFO)
+
+    from app.serialization import json_codec
+    from benchmarks.synthetic import generate
+
+    rng = random.Random(seed)
+    fanta, fbref = generate(scale, seed)
+    merged, merge_results = _bench_merge(fanta, fbref, repeat)
+    json_codec.dump_file(merged, os.environ["PLAYERS_DATA_FILE"])
+
+    from app.db.database import engine
+    from app.db.migrations import init_db
+    init_db(engine)  # tabelle e indici (nell'app li crea il lifespan)
+    insert_results = _bench_insert(merged)
+    token, squad_ids, by_role = _seed_app(merged, scale, rng)
+    endpoints = asyncio.run(_bench_endpoints(merged, token, squad_ids, by_role, rng, repeat))
+    return {
+        "players": {"fantacalcio": len(fanta), "fbref": len(fbref), "merged": len(merged)},
+        "squads": len(squad_ids),
+        **merge_results,
+        "insert_data_ms": insert_results,
+        "endpoints": endpoints,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _timings(node, prefix=()):
+    """Valori confrontabili: p50 dei tempi ripetuti e millisecondi delle misure singole"""
+    if isinstance(node, dict):
+        if "p50_ms" in node:
+            yield prefix, node["p50_ms"]
+            return
+        for key, value in node.items():
+            yield from _timings(value, prefix + (key,))
+    elif prefix and (prefix[-1] == "ms" or prefix[-2:-1] == ("insert_data_ms",)):
+        yield prefix, node
+
+
+def compare(results, baseline):
+    """Rapporto nuovo/precedente per ogni misura presente in entrambi (< 1 = più veloce)"""
+    old = dict(_timings(baseline.get("scales", {})))
+    return {
+        "/".join(key): round(value / old[key], 3)
+        for key, value in _timings(results["scales"])
+        if old.get(key)
+    }
+
+
+def regressions(comparison, tolerance):
+    """Misure più lente del baseline oltre la tolleranza (rapporto > 1 + tolerance)"""
+    return {key: ratio for key, ratio in comparison.items() if ratio > 1 + tolerance}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dei percorsi critici su dati sintetici")
+    parser.add_argument("--scales", default="1,10", help="Scale separate da virgola, es. 1,10,100")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="File JSON dei risultati (default: stdout)")
+    parser.add_argument("--baseline", help="Risultato precedente da confrontare")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Rallentamento ammesso rispetto al baseline, es. 0.25 = +25%% (BENCH_TOLERANCE)")
+    args = parser.parse_args()
+    scales = [float(s) if "." in s else int(s) for s in args.scales.split(",")]
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "scales": {},
+    }
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as workdir, \
+                ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+            print(f"scala {scale}x...", file=sys.stderr)
+            results["scales"][str(scale)] = pool.submit(_run_scale, scale, args.seed, args.repeat, workdir).result()
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            results["comparison"] = compare(results, json.load(f))
+        results["regressions"] = regressions(results["comparison"], args.tolerance)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+    if results.get("regressions"):
+        for key, ratio in sorted(results["regressions"].items()):
+            print(f"regressione: {key} {ratio:g}x rispetto al baseline (tolleranza +{args.tolerance:.0%})", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# benchmarks/scraper_standin.py
+# Server HTTP locale al posto di Fantacalcio.it e FBref: serve le pagine generate da
+# benchmarks/fixtures.py (dati di benchmarks/synthetic.py) con ETag, risposte 304 alle
+# richieste condizionali, errori 503 iniziali e un ritardo per pagina configurabili.
+# Eseguito come modulo verifica offline il percorso di scraping completo,
+# UnifiedPlayerScraper.merge_data con il vero ScraperHttpClient:
+#
+#   cd backend && python -m benchmarks.scraper_standin [--scale 1] [--delay 0.5]
+#
+# - retry con backoff: le prime richieste di ogni pagina ricevono 503
+# - download in parallelo: il tempo dello scraping è quello di una pagina, non la somma
+# - richieste condizionali: la seconda esecuzione riceve 304 e usa la cache su disco
+# Esce con codice 1 se una verifica fallisce.
+import argparse
+import hashlib
+import json
+import logging
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.fixtures import render_fantacalcio_page, render_fbref_page
+from benchmarks.synthetic import generate
+
+FANTA_PATH = "/statistiche-serie-a"
+FBREF_PATH = "/en/comps/11/stats/Serie-A-Stats"
+
+
+class StandInServer:
+    """
+    pages: percorso -> HTML. failures: percorso -> numero di 503 prima della pagina.
+    delay: secondi di attesa prima di ogni risposta (per misurare il parallelismo).
+    """
+
+    def __init__(self, pages, failures=None, delay=0.0):
+        self.pages = {path: html.encode("utf-8") for path, html in pages.items()}
+        self.etags = {path: f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"' for path, body in self.pages.items()}
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.hits = {}  # percorso -> lista degli status restituiti
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def _respond(self, path, headers):
+        """(status, header, body) per una richiesta GET"""
+        if path not in self.pages:
+            return 404, {}, b"not found"
+        with self._lock:
+            if self.failures.get(path, 0) > 0:
+                self.failures[path] -= 1
+                return 503, {}, b"unavailable"  # senza Retry-After: backoff esponenziale del client
+        etag = self.etags[path]
+        if headers.get("If-None-Match") == etag:
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "text/html; charset=utf-8"}, self.pages[path]
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if standin.delay:
+                    time.sleep(standin.delay)
+                status, headers, body = standin._respond(self.path, self.headers)
+                with standin._lock:
+                    standin.hits.setdefault(self.path, []).append(status)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="scraper-standin", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def run_checks(scale=1, delay=0.5, failures=2, seed=0):
+    """Verifiche sul percorso di scraping; restituisce (risultati, errori)"""
+    from app.scraping.http_client import ConditionalCache, HostRateLimiter, ScraperHttpClient
+    from app.scripts.update_and_save_players import UnifiedPlayerScraper
+
+    fanta, fbref = generate(scale, seed)
+    pages = {FANTA_PATH: render_fantacalcio_page(fanta), FBREF_PATH: render_fbref_page(fbref)}
+    results, errors = {}, []
+
+    with tempfile.TemporaryDirectory() as cache_dir, \
+            StandInServer(pages, {path: failures for path in pages}, delay) as server:
+        http = ScraperHttpClient(
+            max_retries=failures + 1, backoff_base=0.05,
+            rate_limiter=HostRateLimiter(default_interval=0.0), cache=ConditionalCache(cache_dir),
+        )
+        scraper = UnifiedPlayerScraper(fanta_url=server.url(FANTA_PATH), fbref_url=server.url(FBREF_PATH), http=http)
+        try:
+            start = time.perf_counter()
+            first = scraper.merge_data()
+            results["first_run_s"] = round(time.perf_counter() - start, 3)
+            hits_first = {path: list(statuses) for path, statuses in server.hits.items()}
+
+            start = time.perf_counter()
+            second = scraper.merge_data()
+            results["second_run_s"] = round(time.perf_counter() - start, 3)
+        finally:
+            http.close()
+        results["hits"] = server.hits
+        results["players"] = len(first)
+
+    if not first:
+        errors.append("nessun giocatore unito dalle pagine del server locale")
+    for path in pages:
+        expected = [503] * failures + [200]
+        if hits_first.get(path) != expected:
+            errors.append(f"{path}: status {hits_first.get(path)}, attesi {expected} (retry)")
+        if results["hits"][path][len(expected):] != [304]:
+            errors.append(f"{path}: la seconda esecuzione non ha ricevuto 304")
+    # in parallelo le due pagine costano un solo ritardo per tentativo, in serie il doppio
+    serial = 2 * (failures + 1) * delay
+    if delay and results["first_run_s"] >= serial * 0.75:
+        errors.append(f"scraping di {results['first_run_s']}s: le pagine non sono scaricate in parallelo ({serial:.1f}s in serie)")
+    if second != first:
+        errors.append("i dati ricavati dalla cache dopo il 304 differiscono dalla prima esecuzione")
+    return results, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraping offline contro un server HTTP locale con le pagine di prova")
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--delay", type=float, default=0.5, help="Ritardo di ogni risposta (secondi)")
+    parser.add_argument("--failures", type=int, default=2, help="503 iniziali per pagina")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results, errors = run_checks(args.scale, args.delay, args.failures, args.seed)
+    results["errors"] = errors
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
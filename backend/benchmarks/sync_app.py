@@ -0,0 +1,62 @@
+# benchmarks/sync_app.py
+# Riferimento per bench_load: gli stessi endpoint di lettura dei router, scritti come
+# prima del passaggio ad AsyncSession (def sincrone sul threadpool e Session sincrona).
+from typing import Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.auth.auth import verify_token
+from app.crud import players as crud_players
+from app.crud import squads as crud_squads
+from app.db.database import get_db
+
+app = FastAPI(title="Fantacalcio API (sync)")
+
+
+def get_current_user(token: str):
+    user_data = verify_token(token)
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Token non valido")
+    return user_data
+
+
+@app.get("/api/players/search")
+def search_players(
+    name: str = Query(..., min_length=2),
+    mode: str = "auto",
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    token: str = Depends(get_current_user),
+):
+    return [
+        {"id": p["id"], "name": p["name"], "team": p["team"], "role": p["role"], "price": p["price"]}
+        for p in crud_players.search_players(db, name, mode=mode, limit=limit)
+    ]
+
+
+@app.get("/api/squads/")
+def list_squads(
+    all_users: bool = False,
+    include_players: bool = False,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    token: str = Depends(get_current_user),
+):
+    squads = crud_squads.list_squads(
+        db, user_id=None if all_users else token.user_id,
+        limit=limit, offset=offset, include_players=include_players,
+    )
+    return [crud_squads.squad_to_dict(s, include_players=include_players) for s in squads]
+
+
+@app.get("/api/predictions/{matchday}")
+def get_predictions(
+    matchday: int,
+    role: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db),
+    token: str = Depends(get_current_user),
+):
+    return crud_players.get_predictions(db, matchday, role=role, limit=limit)
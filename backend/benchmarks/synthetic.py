@@ -0,0 +1,147 @@
+# benchmarks/synthetic.py
+# Dataset sintetici di Serie A nello stesso formato degli scraper: giocatori
+# Fantacalcio.it (nome breve, codice squadra, statistiche "sq/pg/mv/mfv/...") e FBref
+# (nome completo, nome squadra, posizione e statistiche standard). scale=1 è una
+# stagione (~31 giocatori Fantacalcio per squadra), scale=10 o 100 la moltiplica.
+# Con lo stesso seed il risultato è identico.
+import random
+import unicodedata
+
+# (codice Fantacalcio.it, slug Fantacalcio.it, nome FBref)
+TEAMS = (
+    ("ATA", "atalanta", "Atalanta"), ("BOL", "bologna", "Bologna"), ("CAG", "cagliari", "Cagliari"),
+    ("COM", "como", "Como"), ("CRE", "cremonese", "Cremonese"), ("FIO", "fiorentina", "Fiorentina"),
+    ("GEN", "genoa", "Genoa"), ("INT", "inter", "Inter"), ("JUV", "juventus", "Juventus"),
+    ("LAZ", "lazio", "Lazio"), ("LEC", "lecce", "Lecce"), ("MIL", "milan", "Milan"),
+    ("NAP", "napoli", "Napoli"), ("PAR", "parma", "Parma"), ("PIS", "pisa", "Pisa"),
+    ("ROM", "roma", "Roma"), ("SAS", "sassuolo", "Sassuolo"), ("TOR", "torino", "Torino"),
+    ("UDI", "udinese", "Udinese"), ("VER", "verona", "Hellas Verona"),
+)
+PLAYERS_PER_TEAM = 31   # giocatori Fantacalcio.it per squadra in una stagione
+FBREF_COVERAGE = 0.75   # quota dei giocatori Fantacalcio.it presenti anche su FBref
+FBREF_ONLY = 0.05       # giocatori solo su FBref, in proporzione
+MISSPELLED = 0.05       # nomi FBref scritti diversamente (tocca al fuzzy matching)
+
+ROLES = (("GK", 0.10), ("DEF", 0.33), ("MID", 0.35), ("FWD", 0.22))
+FBREF_POSITIONS = {
+    "GK": ("GK",),
+    "DEF": ("DF", "DF", "DF", "DF,MF"),
+    "MID": ("MF", "MF", "MF,FW", "MF,DF"),
+    "FWD": ("FW", "FW", "FW,MF"),
+}
+FIRST_NAMES = (
+    "Alessandro", "Andrea", "Davide", "Federico", "Francesco", "Giacomo", "Giorgio", "Lorenzo",
+    "Luca", "Marco", "Matteo", "Nicolò", "Riccardo", "Simone", "Stefano", "Tommaso", "Mattia",
+    "Kevin", "Lucas", "Mateo", "Rafael", "Nikola", "Mohamed", "Youssef", "Emil", "Jonas",
+)
+SYLLABLES = (
+    "ba", "be", "bo", "ca", "ce", "ci", "co", "da", "de", "di", "fa", "fe", "ga", "gi", "la", "le",
+    "li", "lo", "lu", "ma", "me", "mi", "na", "ne", "ni", "no", "pa", "pe", "ra", "re", "ri", "ro",
+    "sa", "se", "si", "ta", "te", "ti", "to", "va", "ve", "vi", "za", "zo", "rè", "lò", "kić", "vić",
+)
+NATIONALITIES = ("it ITA", "fr FRA", "es ESP", "br BRA", "ar ARG", "rs SRB", "ma MAR", "nl NED", "dk DEN")
+
+
+def _slug(name):
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return "-".join(ascii_name.lower().replace(".", "").split())
+
+
+def _surname(rng):
+    syllables = rng.choices(SYLLABLES, k=rng.choice((2, 3, 3, 4)))
+    if rng.random() < 0.25:  # cognomi composti, es. "De Luca"
+        return f"{rng.choice(('De', 'Di', 'Da', 'Van'))} {''.join(syllables).capitalize()}"
+    return "".join(syllables).capitalize()
+
+
+def _misspell(name, rng):
+    i = rng.randrange(1, len(name))
+    return name[:i] + rng.choice("aeiou") + name[i + 1:]
+
+
+def _fanta_stats(rng, code, role):
+    pg = rng.randint(0, 38)
+    mv = round(rng.uniform(5.5, 7.0), 2) if pg else 0.0
+    gol = 0 if role == "GK" else rng.randint(0, {"DEF": 4, "MID": 8, "FWD": 25}[role] * pg // 38 + 1)
+    return {
+        "sq": code, "pg": pg, "mv": mv, "mfv": round(mv + gol * 3 / max(pg, 1), 2) if pg else 0.0,
+        "gol": gol, "gs": rng.randint(0, pg * 2) if role == "GK" else 0,
+        "rig": float(rng.randint(0, 3)) if role == "FWD" else 0.0, "rp": rng.randint(0, 2) if role == "GK" else 0,
+        "ass": rng.randint(0, 8) if pg else 0, "amm": rng.randint(0, 9), "esp": int(rng.random() < 0.1),
+    }
+
+
+def _fbref_stats(rng, full_name, team, position):
+    games = rng.randint(1, 38)
+    starts = rng.randint(0, games)
+    minutes = starts * rng.randint(60, 90) + (games - starts) * rng.randint(1, 30)
+    minutes_90s = round(minutes / 90, 1)
+    per90 = lambda v: round(v / minutes_90s, 2) if minutes_90s else 0.0
+    goals, assists = rng.randint(0, 15), rng.randint(0, 10)
+    pens_att = rng.randint(0, 4)
+    pens_made = rng.randint(0, pens_att)
+    xg = round(rng.uniform(0, 15), 1)
+    npxg = round(max(0.0, xg - pens_att * 0.76), 1)
+    xg_assist = round(rng.uniform(0, 8), 1)
+    return {
+        "player": full_name, "nationality": rng.choice(NATIONALITIES), "position": position.replace(",", ""),
+        "team": team, "age": f"{rng.randint(17, 37)}-{rng.randint(0, 364):03d}", "birth_year": rng.randint(1988, 2008),
+        "games": games, "games_starts": starts, "minutes": minutes, "minutes_90s": minutes_90s,
+        "goals": goals, "assists": assists, "goals_assists": goals + assists, "goals_pens": goals - pens_made,
+        "pens_made": pens_made, "pens_att": pens_att, "cards_yellow": rng.randint(0, 10), "cards_red": int(rng.random() < 0.1),
+        "xg": xg, "npxg": npxg, "xg_assist": xg_assist, "npxg_xg_assist": round(npxg + xg_assist, 1),
+        "progressive_carries": rng.randint(0, 120), "progressive_passes": rng.randint(0, 200),
+        "progressive_passes_received": rng.randint(0, 250),
+        "goals_per90": per90(goals), "assists_per90": per90(assists), "goals_assists_per90": per90(goals + assists),
+        "goals_pens_per90": per90(goals - pens_made), "goals_assists_pens_per90": per90(goals + assists - pens_made),
+        "xg_per90": per90(xg), "xg_assist_per90": per90(xg_assist), "xg_xg_assist_per90": per90(xg + xg_assist),
+        "npxg_per90": per90(npxg), "npxg_xg_assist_per90": per90(npxg + xg_assist), "matches": "Matches",
+    }
+
+
+def generate(scale=1.0, seed=0):
+    """(giocatori Fantacalcio.it, giocatori FBref) come li restituiscono i due scraper"""
+    rng = random.Random(seed)
+    roles, weights = zip(*ROLES)
+    per_team = max(1, round(PLAYERS_PER_TEAM * scale))
+    fanta, fbref = [], []
+    fbref_id = 0
+    for code, slug, fbref_team in TEAMS:
+        seen_full, seen_short = set(), set()
+        for i in range(per_team + round(per_team * FBREF_ONLY)):
+            surname = _surname(rng)
+            first = rng.choice(FIRST_NAMES)
+            while (first, surname) in seen_full:
+                surname = _surname(rng)
+            seen_full.add((first, surname))
+            role = rng.choices(roles, weights)[0]
+            position = rng.choice(FBREF_POSITIONS[role])
+            only_fbref = i >= per_team
+
+            if not only_fbref:
+                # Fantacalcio.it usa il cognome, con l'iniziale se ce n'è già uno uguale
+                short = surname if surname not in seen_short else f"{surname} {first[0]}."
+                seen_short.add(short)
+                fanta.append({
+                    "name": short,
+                    "team": code,
+                    "role": role,
+                    "url": f"https://www.fantacalcio.it/serie-a/squadre/{slug}/{_slug(short)}/{len(fanta) + 1}",
+                    "stats": _fanta_stats(rng, code, role),
+                })
+                if rng.random() >= FBREF_COVERAGE:
+                    continue
+
+            full_name = f"{first} {surname}"
+            if not only_fbref and rng.random() < MISSPELLED:
+                full_name = f"{first} {_misspell(surname, rng)}"
+            fbref_id += 1
+            fbref.append({
+                "name": full_name,
+                "team": fbref_team,
+                "role": {"GK": "GK", "DF": "DEF", "MF": "MID", "FW": "FWD"}[position.split(",")[0]],
+                "position": position,
+                "url": f"https://fbref.com/en/players/{fbref_id:08x}/{_slug(full_name).title()}",
+                "stats": _fbref_stats(rng, full_name, fbref_team, position),
+            })
+    return fanta, fbref
@@ -1,12 +1,45 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.database import Base, engine
-from app.routers import auth, players, predictions, squads
+from fastapi.middleware.gzip import GZipMiddleware
+from app.db.database import async_engine, engine
+from app.db.migrations import init_db
+from app.monitoring.middleware import PROFILING_ENABLED, MetricsMiddleware, ProfilingMiddleware
+from app.monitoring.sql import instrument_engine
+from app.refresh.scheduler import REFRESH_ENABLED, RefreshScheduler
+from app.routers import auth, monitoring, players, predictions, squads
+from app.serialization.json_codec import JSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Avvio: schema e migrazioni nel threadpool (non all'import del modulo, così importare
+    main resta veloce), poi query contate e cronometrate, in totale e per richiesta (vedi
+    /metrics). NumPy, passlib/argon2, jose e rapidfuzz vengono importati al primo uso.
+    Con REFRESH_ENABLED=1 parte anche l'aggiornamento periodico dei dati.
+    """
+    await run_in_threadpool(init_db, engine)
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    scheduler = RefreshScheduler() if REFRESH_ENABLED else None
+    if scheduler is not None:
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        await scheduler.stop()
+    await async_engine.dispose()
+    engine.dispose()
 
-# Crea tabelle
-Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Fantacalcio API")
+# Risposte JSON con il codec orjson. Come Default(...) gli endpoint con response_model
+# mantengono la serializzazione diretta di Pydantic; gli altri (dict, liste già pronte)
+# passano da JSONResponse invece che da json.dumps.
+app = FastAPI(title="Fantacalcio API", default_response_class=Default(JSONResponse), lifespan=lifespan)
 
 # 🔥 CONFIGURA CORS - AGGIUNGI QUESTO
 app.add_middleware(
@@ -17,12 +50,25 @@ app.add_middleware(
     allow_headers=["*"],  # Permetti tutti gli headers
 )
 
+# Compressione delle altre risposte; lo snapshot dei giocatori arriva già compresso
+# (Content-Encoding impostato) e il middleware lo lascia passare
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Profilazione su richiesta (header X-Profile), solo se abilitata
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Ultimo aggiunto = più esterno: misura anche CORS e compressione (byte effettivi)
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(players.router, prefix="/api/players", tags=["Players"])
 app.include_router(predictions.router, prefix="/api/predictions", tags=["Predictions"])
 app.include_router(squads.router, prefix="/api/squads", tags=["Squads"])
+app.include_router(monitoring.router, tags=["Monitoring"])
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # reload solo in sviluppo (UVICORN_RELOAD=1): ogni riavvio rifà l'avvio completo
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=os.getenv("UVICORN_RELOAD", "0") == "1")
\ No newline at end of file
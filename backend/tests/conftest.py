@@ -0,0 +1,9 @@
+# tests/conftest.py
+# Database e file dei giocatori in una cartella temporanea: vanno impostati prima che
+# i moduli dell'app leggano le variabili d'ambiente all'import
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="fantacalcio-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_workdir}/fantacalcio.db")
+os.environ.setdefault("PLAYERS_DATA_FILE", os.path.join(_workdir, "players_data.json"))
@@ -0,0 +1,47 @@
+# tests/test_changeset.py
+from app.refresh import changeset as changes
+
+
+def _player(name, team="INT", price=10.0):
+    return {"name": name, "team": team, "role": "MID", "price": price, "stats": {"mv": 6.0}}
+
+
+def test_diff_players():
+    previous = [_player("Barella"), _player("Dimarco"), _player("Thuram", price=30.0)]
+    current = [_player("Barella"), _player("Thuram", price=32.0), _player("Bastoni")]
+    diff = changes.diff_players(previous, current)
+    assert [p["name"] for p in diff.added] == ["Bastoni"]
+    assert [p["name"] for p in diff.changed] == ["Thuram"]
+    assert diff.removed == [("Dimarco", "INT")]
+    assert diff.unchanged == 1
+    assert [p["name"] for p in diff.upserts] == ["Bastoni", "Thuram"]
+
+
+def test_diff_of_identical_snapshots_is_empty():
+    players = [_player("Barella"), _player("Barella", team="CAG")]
+    diff = changes.diff_players(players, [dict(p) for p in players])
+    assert diff.is_empty()
+    assert diff.unchanged == 2
+
+
+def test_same_name_on_two_teams_are_different_players():
+    diff = changes.diff_players([_player("Rog", team="CAG")], [_player("Rog", team="TOR")])
+    assert [changes.player_key(p) for p in diff.added] == [("Rog", "TOR")]
+    assert diff.removed == [("Rog", "CAG")]
+
+
+def test_duplicates_keep_the_first_record():
+    current = [_player("Barella", price=10.0), _player("Barella", price=99.0)]
+    assert changes.unique_players(current) == [current[0]]
+    diff = changes.diff_players([], current)
+    assert diff.added == [current[0]]
+
+
+def test_publish_increments_generation_only_on_changes(tmp_path):
+    path = tmp_path / "players_changes.json"
+    assert changes.current_generation(path) == 0
+    changes.publish(changes.diff_players([], [_player("Barella")]), path)
+    changes.publish(changes.diff_players([_player("Barella")], [_player("Barella")]), path)
+    assert changes.current_generation(path) == 1
+    changes.publish(changes.diff_players([_player("Barella")], []), path)
+    assert changes.current_generation(path) == 2
@@ -0,0 +1,40 @@
+# tests/test_fbref_stats.py
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.db import fbref_stats
+from app.db.database import Base
+from app.db.models import Player
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Player.__table__.insert(), [{"id": 1, "name": "Rog", "team": "CAG", "role": "MID", "price": 5.0}])
+        fbref_stats.upsert_stats(conn, [(1, {"goals": 2, "minutes": 900})])
+        yield conn
+    engine.dispose()
+
+
+def test_columns_are_cached(conn, monkeypatch):
+    fbref_stats.get_columns(conn)
+    monkeypatch.setattr(fbref_stats, "inspect", None)  # nessuna riflessione dopo la prima lettura
+    assert fbref_stats.leaderboard(conn, "goals")[0]["goals"] == 2
+    assert fbref_stats.compare(conn, [1], stats=["minutes"])[0]["fbref_data"] == {"minutes": 900}
+
+
+def test_new_columns_invalidate_the_cache(conn):
+    fbref_stats.upsert_stats(conn, [(1, {"goals": 2, "minutes": 900, "xg_chain": 1.5})])
+    assert fbref_stats.get_columns(conn)["xg_chain"] == "REAL"
+    assert fbref_stats.leaderboard(conn, "xg_chain")[0]["xg_chain"] == 1.5
+
+
+def test_columns_added_elsewhere_are_read_on_miss(conn):
+    fbref_stats.get_columns(conn)
+    # come lo script di aggiornamento in un altro processo
+    conn.execute(text(f"ALTER TABLE {fbref_stats.FBREF_TABLE} ADD COLUMN touches INTEGER"))
+    assert fbref_stats.leaderboard(conn, "touches") == []
+    with pytest.raises(fbref_stats.UnknownStat):
+        fbref_stats.leaderboard(conn, "unknown_stat")
@@ -0,0 +1,62 @@
+# tests/test_optimizer.py
+import itertools
+import random
+from collections import Counter
+
+import pytest
+
+from app.engine.optimizer import Candidate, OptimizerError, optimize_squad
+
+QUOTAS = {"GK": 1, "DEF": 2, "MID": 2, "FWD": 1}
+TEAMS = ("A", "B", "C")
+
+
+def _candidates(seed, per_role=5):
+    rng = random.Random(seed)
+    return [
+        Candidate(role_index * per_role + i, f"{role}{i}", rng.choice(TEAMS), role, rng.randint(1, 30), rng.uniform(4, 9))
+        for role_index, role in enumerate(QUOTAS) for i in range(per_role)
+    ]
+
+
+def _brute_force(candidates, budget, max_per_team=None):
+    """Miglior punteggio tra tutte le rose possibili (None se non ce n'è nessuna)"""
+    by_role = {role: [c for c in candidates if c.role == role] for role in QUOTAS}
+    best = None
+    for parts in itertools.product(*(itertools.combinations(by_role[r], k) for r, k in QUOTAS.items())):
+        squad = [c for part in parts for c in part]
+        if sum(c.cost for c in squad) > budget:
+            continue
+        if max_per_team is not None and max(Counter(c.team for c in squad).values()) > max_per_team:
+            continue
+        score = sum(c.score for c in squad)
+        best = score if best is None else max(best, score)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(8))
+@pytest.mark.parametrize("budget,max_per_team", [(60, None), (90, None), (60, 2), (90, 2), (120, 3)])
+def test_matches_brute_force(seed, budget, max_per_team):
+    candidates = _candidates(seed)
+    expected = _brute_force(candidates, budget, max_per_team)
+    if expected is None:
+        with pytest.raises(OptimizerError):
+            optimize_squad(candidates, budget=budget, quotas=QUOTAS, max_per_team=max_per_team)
+        return
+    result = optimize_squad(candidates, budget=budget, quotas=QUOTAS, max_per_team=max_per_team)
+    players = result["players"]
+    assert result["optimal"]
+    assert result["total_score"] == pytest.approx(expected, abs=0.01)
+    assert result["total_price"] <= budget
+    assert Counter(p["role"] for p in players) == Counter(QUOTAS)
+    if max_per_team is not None:
+        assert max(Counter(p["team"] for p in players).values()) <= max_per_team
+
+
+def test_locked_and_excluded():
+    candidates = _candidates(0)
+    result = optimize_squad(candidates, budget=120, quotas=QUOTAS, locked=[0], excluded=[5, 6])
+    ids = {p["id"] for p in result["players"]}
+    assert 0 in ids and not ids & {5, 6}
+    with pytest.raises(OptimizerError):
+        optimize_squad(candidates, budget=120, quotas=QUOTAS, locked=[0], excluded=[0])
@@ -0,0 +1,59 @@
+# tests/test_player_search.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import players as crud_players
+from app.db.database import Base
+from app.db.models import Player
+from app.search.player_search import PlayerSearchIndex, dataset_version, player_search_index
+
+NAMES = ["Lautaro Martinez", "Rog", "Dusan Vlahovic", "Paulo Dybala", "Marko Arnautovic"]
+
+
+@pytest.fixture
+def index():
+    return PlayerSearchIndex(enumerate(NAMES, start=1))
+
+
+def test_fuzzy_ignores_short_fragments(index):
+    # "rog" è contenuto in "lautaro" per il confronto parziale di WRatio
+    assert index.search("lautaro", mode="fuzzy", limit=5) == [1]
+
+
+def test_fuzzy_keeps_typos(index):
+    assert index.search("vlahovich", mode="fuzzy", limit=5)[0] == 3
+    assert index.search("lautaro", limit=5) == [1]
+
+
+def test_dataset_version_changes_on_publish(tmp_path):
+    path = tmp_path / "players_changes.json"
+    assert dataset_version(path) is None
+    path.write_text('{"generation": 1}')
+    first = dataset_version(path)
+    replacement = tmp_path / "next.json"
+    replacement.write_text('{"generation": 2}')
+    replacement.replace(path)
+    assert dataset_version(path) not in (None, first)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all(Player(name=name, team="Team", role="MID", price=10.0) for name in NAMES)
+    session.commit()
+    player_search_index.invalidate()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def test_search_reads_updated_rows(db):
+    assert crud_players.search_players(db, "lautaro")[0]["price"] == 10.0
+    # aggiornamento in place: stesso COUNT e MAX(id), l'indice resta valido
+    db.query(Player).filter(Player.name == "Lautaro Martinez").update({"role": "FWD", "price": 42.0})
+    db.commit()
+    found = crud_players.search_players(db, "lautaro")
+    assert [(p["name"], p["role"], p["price"]) for p in found] == [("Lautaro Martinez", "FWD", 42.0)]
@@ -0,0 +1,49 @@
+# tests/test_players_api.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app.cache.player_snapshot import DATA_FILE
+from app.serialization import json_codec
+
+PLAYERS = [
+    {"name": f"Player {i:02d}", "team": ("INT", "MIL", "JUV")[i % 3], "role": ("GK", "DEF", "MID", "FWD")[i % 4],
+     "price": float(i + 1), "stats": {"mv": 6.0, "mfv": 6.0 + i / 10}, "fantacalcio_data": {}, "fbref_data": {}}
+    for i in range(25)
+]
+
+
+@pytest.fixture(scope="module")
+def client():
+    json_codec.dump_file(PLAYERS, DATA_FILE)
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_cursor_pagination_visits_every_player_once(client):
+    seen, cursor = [], None
+    while True:
+        params = {"sort": "-price", "limit": 7, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/players/", params=params).json()
+        assert page["total"] == len(PLAYERS)
+        seen += [p["price"] for p in page["players"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted((p["price"] for p in PLAYERS), reverse=True)
+
+
+def test_invalid_cursor(client):
+    assert client.get("/api/players/", params={"cursor": "not-a-cursor", "limit": 5}).status_code == 400
+
+
+@pytest.mark.parametrize("params", [{}, {"role": "DEF", "limit": 3}])
+def test_etag_revalidation(client, params):
+    first = client.get("/api/players/", params=params)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    again = client.get("/api/players/", params=params, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    other = client.get("/api/players/", params={**params, "team": "INT"}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
@@ -0,0 +1,17 @@
+# tests/test_run_suite.py
+from benchmarks.run_suite import compare, regressions
+
+
+def _results(search_ms, insert_ms):
+    return {"scales": {"1": {"search": {"p50_ms": search_ms, "p95_ms": 9.0}, "insert_data_ms": {"initial": insert_ms}}}}
+
+
+def test_compare_uses_p50_and_single_timings():
+    comparison = compare(_results(2.0, 150.0), _results(4.0, 100.0))
+    assert comparison == {"1/search": 0.5, "1/insert_data_ms/initial": 1.5}
+
+
+def test_regressions_over_tolerance():
+    comparison = {"1/search": 0.5, "1/insert_data_ms/initial": 1.5, "1/get": 1.2}
+    assert regressions(comparison, 0.25) == {"1/insert_data_ms/initial": 1.5}
+    assert regressions(comparison, 0.5) == {}
@@ -0,0 +1,54 @@
+# tests/test_scrapers.py
+# Parser lxml e BeautifulSoup sulle pagine ridotte di benchmarks/fixtures
+import pytest
+
+from app.scraping.fantacalcio_scraper import FantacalcioScraper
+from app.scraping.fbref_scraper import FBrefScraper
+from benchmarks.fixtures import load_saved_page
+
+pytest.importorskip("lxml")
+
+
+@pytest.mark.parametrize("kind,scraper", [("fantacalcio", FantacalcioScraper), ("fbref", FBrefScraper)])
+def test_parsers_agree_on_saved_pages(kind, scraper):
+    html = load_saved_page(kind)
+    players = scraper(parser="lxml").parse_players(html)
+    assert players
+    assert players == scraper(parser="html.parser").parse_players(html)
+
+
+def test_fbref_table_inside_comment():
+    html = load_saved_page("fbref")
+    scraper = FBrefScraper(parser="lxml")
+    fragment = scraper._table_fragment(html)
+    assert fragment.startswith("<table") and 'id="stats_standard"' in fragment
+    assert html.rfind("<!--", 0, html.find(fragment)) > html.rfind("-->", 0, html.find(fragment))
+
+    players = scraper.parse_players(html)
+    # righe di intestazione ripetute e tabella delle squadre esclusi
+    assert len(players) == 31
+    assert all(p["name"] and p["url"].startswith("https://fbref.com/en/players/") for p in players)
+    first = players[0]
+    assert (first["name"], first["team"], first["role"], first["position"]) == ("Zakaria Aboukhlal", "Torino", "FWD", "FW,MF")
+    assert first["stats"]["nationality"] == "ma MAR"
+    assert players[3]["stats"]["minutes"] == 1234  # "1,234"
+    assert players[-1]["stats"]["age"] == 0  # cella vuota
+
+
+def test_fantacalcio_rows_outside_the_stats_table():
+    players = FantacalcioScraper(parser="lxml").parse_players(load_saved_page("fantacalcio"))
+    named = [p for p in players if p["name"]]
+    # la tabella delle squadre della pagina produce righe senza nome (scartate dal merge)
+    assert len(players) - len(named) == 20
+    assert named[0]["name"] == "De Luca" and named[0]["team"] == "CRE"
+    assert named[0]["stats"]["mv"] == 7.0 and named[0]["stats"]["rig"] == 1.0
+
+
+def test_merge_of_saved_pages_has_one_record_per_key():
+    from app.scripts.update_and_save_players import UnifiedPlayerScraper
+    fanta = FantacalcioScraper(parser="lxml").parse_players(load_saved_page("fantacalcio"))
+    fbref = FBrefScraper(parser="lxml").parse_players(load_saved_page("fbref"))
+    merged = UnifiedPlayerScraper().merge_players(fanta, fbref)
+    keys = [(p["name"], p["team"]) for p in merged]
+    assert all(name for name, _ in keys)
+    assert len(keys) == len(set(keys))